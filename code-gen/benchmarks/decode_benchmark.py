@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Benchmark the generated decoders against pydantic validation on the integration test shapes.
+
+The Python code for `test/integration.webidl` is generated with codecs.
+An `IntegrationTest` with many polymorphic entries is decoded from parsed JSON with `model_validate`
+and with the generated decoder, and loaded from a CBOR file with and without validation.
+Loading JSON, which is always validated, is listed for comparison.
+
+Usage: python benchmarks/decode_benchmark.py [--entries N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from poly_scribe_code_gen.parse_idl import parse_idl_files
+from poly_scribe_code_gen.py_gen import generate_python
+
+INTEGRATION_IDL = Path(__file__).resolve().parents[2] / "test" / "integration.webidl"
+
+
+def generate_data(entries: int) -> dict[str, Any]:
+    """Generate the parsed JSON of an `IntegrationTest` with the given number of map and sequence entries."""
+
+    def _derived(i: int) -> dict[str, Any]:
+        base = {"vec_3d": [i, i + 0.5, i + 1.5], "union_member": i if i % 2 else i + 0.25, "str_vec": ["a", str(i)]}
+        if i % 2:
+            return {**base, "type": "DerivedOne", "string_map": {str(i): "value", "key": str(i)}}
+        return {**base, "type": "DerivedTwo", "optional_value": i / 3}
+
+    return {
+        "object_map": {f"key{i}": _derived(i) for i in range(entries)},
+        "object_vec": [_derived(i) for i in range(entries)],
+        "opt_vec": list(range(entries)),
+        "object_array": [_derived(0), _derived(1)],
+        "enum_value": "value2",
+        "non_poly_derived": {"type": "NonPolyDerived", "value": 3},
+        "string_value_with_default": "benchmark",
+    }
+
+
+def _time(function: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20_000, help="Number of map and sequence entries")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        module_file = tmp_dir / "integration_codecs.py"
+        generate_python(parse_idl_files([INTEGRATION_IDL]), {"package": "integration"}, module_file, codecs=True)
+
+        spec = importlib.util.spec_from_file_location("integration_codecs", module_file)
+        assert spec is not None and spec.loader is not None  # noqa: PT018
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+
+        data = generate_data(args.entries)
+        model = module.IntegrationTest
+        decode = module._DECODERS["IntegrationTest"]
+        assert decode(data) == model.model_validate(data), "decoder and validation disagree"
+
+        instance = model.model_validate(data)
+        json_file = tmp_dir / "data.json"
+        cbor_file = tmp_dir / "data.cbor"
+        module.save(json_file, instance)
+        module.save(cbor_file, instance)
+
+        benchmarks = {
+            "model_validate(dict)": lambda: model.model_validate(data),
+            "decoder(dict)": lambda: decode(data),
+            "load json": lambda: module.load(model, json_file),
+            "load cbor": lambda: module.load(model, cbor_file),
+            "load cbor, validate=False": lambda: module.load(model, cbor_file, validate=False),
+        }
+
+        print(f"{args.entries} entries, {json_file.stat().st_size / 1e6:.2f} MB JSON")
+        for name, function in benchmarks.items():
+            print(f"{name:28} {_time(function, args.repeat):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
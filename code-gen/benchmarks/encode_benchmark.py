@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Benchmark the generated encoders against pydantic serialization on the integration test shapes.
+
+The Python code for `test/integration.webidl` is generated with codecs.
+An `IntegrationTest` with many polymorphic entries is saved to a CBOR file through `model_dump`,
+like `save` without codecs, and through the generated encoders.
+The time and the peak of the memory traced by `tracemalloc` are reported for each.
+Saving JSON with `model_dump_json` is listed for comparison, `save` uses it with and without codecs.
+
+Usage: python benchmarks/encode_benchmark.py [--entries N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import cbor2
+
+from poly_scribe_code_gen.parse_idl import parse_idl_files
+from poly_scribe_code_gen.py_gen import generate_python
+
+INTEGRATION_IDL = Path(__file__).resolve().parents[2] / "test" / "integration.webidl"
+
+
+def generate_data(entries: int) -> dict[str, Any]:
+    """Generate the parsed JSON of an `IntegrationTest` with the given number of map and sequence entries."""
+
+    def _derived(i: int) -> dict[str, Any]:
+        base = {"vec_3d": [i, i + 0.5, i + 1.5], "union_member": i if i % 2 else i + 0.25, "str_vec": ["a", str(i)]}
+        if i % 2:
+            return {**base, "type": "DerivedOne", "string_map": {str(i): "value", "key": str(i)}}
+        return {**base, "type": "DerivedTwo", "optional_value": i / 3}
+
+    return {
+        "object_map": {f"key{i}": _derived(i) for i in range(entries)},
+        "object_vec": [_derived(i) for i in range(entries)],
+        "opt_vec": list(range(entries)),
+        "object_array": [_derived(0), _derived(1)],
+        "enum_value": "value2",
+        "non_poly_derived": {"type": "NonPolyDerived", "value": 3},
+        "string_value_with_default": "benchmark",
+    }
+
+
+def _time(function: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20_000, help="Number of map and sequence entries")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        module_file = tmp_dir / "integration_codecs.py"
+        generate_python(parse_idl_files([INTEGRATION_IDL]), {"package": "integration"}, module_file, codecs=True)
+
+        spec = importlib.util.spec_from_file_location("integration_codecs", module_file)
+        assert spec is not None and spec.loader is not None  # noqa: PT018
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+
+        instance: Any = module.IntegrationTest.model_validate(generate_data(args.entries))
+        json_file = tmp_dir / "data.json"
+        cbor_file = tmp_dir / "data.cbor"
+
+        def _pydantic_json() -> None:
+            json_file.write_text(instance.model_dump_json(indent=4))
+
+        def _pydantic_cbor() -> None:
+            with cbor_file.open("wb") as f:
+                cbor2.dump(instance.model_dump(), f)
+
+        benchmarks = {
+            "model_dump_json": _pydantic_json,
+            "model_dump cbor": _pydantic_cbor,
+            "encoders cbor": lambda: module.save(cbor_file, instance),
+        }
+
+        print(f"{args.entries} entries")
+        for name, function in benchmarks.items():
+            seconds = _time(function, args.repeat)
+            peak = _peak_memory(function)
+            print(f"{name:16} {seconds:8.3f} s {peak / 1e6:8.2f} MB peak")
+
+
+if __name__ == "__main__":
+    main()
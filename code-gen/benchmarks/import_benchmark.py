@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Benchmark the import of generated Python code for a wide IDL.
+
+The generated models defer building their pydantic schemas to their first use.
+For comparison, the same code is also imported with the schemas built eagerly on import,
+like the generator did before.
+
+Usage: python benchmarks/import_benchmark.py [--dictionaries N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from poly_scribe_code_gen.parse_idl import _validate_and_parse_ir
+from poly_scribe_code_gen.py_gen import generate_python
+
+
+def generate_idl(dictionaries: int) -> str:
+    """Generate an IDL string with the given number of dictionaries.
+
+    Every tenth dictionary starts a new polymorphic hierarchy, the others derive from their predecessor.
+    """
+    parts = [
+        'enum Kind { "A", "B", "C" };',
+        "typedef [Size=3] sequence<double> Vec3;",
+    ]
+    for i in range(dictionaries):
+        parent = f" : Dict{i - 1}" if i % 10 else ""
+        parts.append(
+            f"""
+/// Dictionary number {i}
+dictionary Dict{i}{parent} {{
+    required int value{i};
+    double ratio{i} = 0.5;
+    sequence<float> vector{i};
+    record<ByteString, double> lookup{i};
+    (int or ByteString) variant{i};
+    Kind kind{i};
+    Vec3 position{i};
+}};"""
+        )
+    return "\n".join(parts)
+
+
+def eager_variant(code: str, structs: list[str]) -> str:
+    """Build all schemas on import, as the generated code did before deferring them."""
+    code = code.replace("ConfigDict(defer_build=True)", "ConfigDict(defer_build=False)")
+    # the schemas referencing later definitions are completed by the rebuilds
+    rebuilds = "".join(f"{struct}.model_rebuild()\n" for struct in structs)
+    return code.replace("\n\ndef load(", f"\n\n{rebuilds}\n\ndef load(", 1)
+
+
+def _time_import(module_dir: Path, module: str, statement: str, repeat: int) -> float:
+    script = f"""
+import time
+start = time.perf_counter()
+import {module}
+{statement}
+print(time.perf_counter() - start)
+"""
+    best = float("inf")
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=module_dir, capture_output=True, text=True, check=True
+        )
+        best = min(best, float(result.stdout))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dictionaries", type=int, default=3_000, help="Number of dictionaries to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    idl = _validate_and_parse_ir(generate_idl(args.dictionaries))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module_dir = Path(tmp)
+        generate_python(idl, {"package": "deferred"}, module_dir / "deferred.py", format_code=False)
+        code = (module_dir / "deferred.py").read_text()
+        (module_dir / "eager.py").write_text(eager_variant(code, list(idl.structs)))
+
+        # validating the last dictionary, which requires the values of its bases as well
+        index = args.dictionaries - 1
+        fields = ", ".join(f"'value{i}': 1" for i in range(index - index % 10, index + 1))
+        statement = f"Dict{index}.model_validate({{{fields}}})"
+
+        print(f"{args.dictionaries} dictionaries")
+        for module in ("eager", "deferred"):
+            import_seconds = _time_import(module_dir, module, "", args.repeat)
+            use_seconds = _time_import(module_dir, module, f"{module}.{statement}", args.repeat)
+            print(f"{module:10} import {import_seconds:8.3f} s   import + first validation {use_seconds:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
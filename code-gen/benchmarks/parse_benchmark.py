@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Benchmark the WebIDL parsers on a large generated IDL file.
+
+Usage: python benchmarks/parse_benchmark.py [--dictionaries N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from poly_scribe_code_gen import _fast_parser
+from poly_scribe_code_gen.parse_idl import _parse_webidl_single_pass, _validate_and_parse
+
+
+def generate_idl(dictionaries: int) -> str:
+    """Generate an IDL string with the given number of dictionaries.
+
+    The dictionaries use all the features of the supported subset: inheritance, comments,
+    extended attributes, defaults, sequences, records, unions, enums and typedefs.
+    """
+    parts = [
+        'enum Kind { "A", "B", "C" };',
+        "typedef [Size=3] sequence<double> Vec3;",
+    ]
+    for i in range(dictionaries):
+        parent = f" : Dict{i - 1}" if i % 10 else ""
+        parts.append(
+            f"""
+/// Dictionary number {i}
+///
+/// @param value The value.
+dictionary Dict{i}{parent} {{
+    required int value; ///< Inline comment
+    double ratio = 0.5;
+    [Size=3] sequence<float> vector;
+    record<ByteString, double> lookup;
+    (int or ByteString) variant;
+    Kind kind = "A";
+    Vec3 position;
+}};"""
+        )
+    return "\n".join(parts)
+
+
+def _time(function: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dictionaries", type=int, default=10_000, help="Number of dictionaries to generate")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    idl = generate_idl(args.dictionaries)
+    size = len(idl.encode()) / 1e6
+
+    assert _fast_parser.parse(idl) == _parse_webidl_single_pass(idl), "parsers disagree"
+
+    benchmarks = {
+        "pywebidl2 parse": lambda: _parse_webidl_single_pass(idl),
+        "fast parse": lambda: _fast_parser.parse(idl),
+        "pywebidl2 parse + flatten": lambda: _validate_and_parse(idl),
+        "fast parse + flatten": lambda: _validate_and_parse(idl, fast_parser=True),
+    }
+
+    print(f"{args.dictionaries} dictionaries, {size:.2f} MB")
+    for name, function in benchmarks.items():
+        seconds = _time(function, args.repeat)
+        print(f"{name:28} {seconds:8.3f} s {args.dictionaries / seconds:10.0f} dict/s {size / seconds:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
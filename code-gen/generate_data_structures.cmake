@@ -24,6 +24,10 @@ set (
     :type DEV_MODE: bool
     :param IDL_FILE: The path to the IDL file to be processed.
     :type IDL_FILE: str
+    :param IDL_FILES: The paths to multiple IDL files to be processed together.
+        The files may reference definitions in each other and are combined with IDL_FILE.
+        The output directory is named after the first file.
+    :type IDL_FILES: list
     :param AUTHOR_NAME: The name of the author of the IDL file.
     :type AUTHOR_NAME: str
     :param AUTHOR_MAIL: The email of the author of the IDL file.
@@ -111,10 +115,18 @@ function (generate_data_structures TARGET_LIBRARY)
 		OUTPUT_SCHEMA_CLASS
 		OUTPUT_SCHEMA_VAR
 	)
-	set (multiValueArgs)
+	set (multiValueArgs IDL_FILES)
 	cmake_parse_arguments (GEN_DATA "${options}" "${oneValueArgs}" "${multiValueArgs}" ${ARGN})
 
 	# further input parsing
+	set (GEN_DATA_ALL_IDL_FILES ${GEN_DATA_IDL_FILE} ${GEN_DATA_IDL_FILES})
+
+	if (NOT GEN_DATA_ALL_IDL_FILES)
+		message (FATAL_ERROR "IDL_FILE or IDL_FILES must be provided")
+	endif ()
+
+	list (GET GEN_DATA_ALL_IDL_FILES 0 GEN_DATA_IDL_FILE)
+
 	if (NOT GEN_DATA_USE_IN_SOURCE AND GEN_DATA_IN_SOURCE_PATH)
 		set (GEN_DATA_USE_IN_SOURCE ON)
 	endif ()
@@ -252,7 +264,19 @@ function (generate_data_structures TARGET_LIBRARY)
 			execute_process (COMMAND "${Python3_EXECUTABLE}" -m pip install "${CODE_GEN_BASE_DIR}/.")
 		endif ()
 
-		get_filename_component (GEN_DATA_IDL_FILE "${GEN_DATA_IDL_FILE}" REALPATH BASE_DIR "${CMAKE_CURRENT_LIST_DIR}")
+		set (GEN_DATA_IDL_FILE_PATHS)
+
+		foreach (idl_file IN LISTS GEN_DATA_ALL_IDL_FILES)
+			get_filename_component (idl_file "${idl_file}" REALPATH BASE_DIR "${CMAKE_CURRENT_LIST_DIR}")
+			list (APPEND GEN_DATA_IDL_FILE_PATHS ${idl_file})
+		endforeach ()
+
+		# re-run the generation when any of the IDL files is edited
+		set_property (
+			DIRECTORY
+			APPEND
+			PROPERTY CMAKE_CONFIGURE_DEPENDS ${GEN_DATA_IDL_FILE_PATHS}
+		)
 
 		if (GEN_DATA_OUTPUT_CPP)
 			set (GEN_DATA_CPP_ARG --cpp
@@ -280,9 +304,10 @@ function (generate_data_structures TARGET_LIBRARY)
 
 		execute_process (
 			COMMAND
-				"${Python3_EXECUTABLE}" -m poly_scribe_code_gen -a ${ADDITIONAL_DATA_FILE} ${GEN_DATA_CPP_ARG}
+				"${Python3_EXECUTABLE}" -m poly_scribe_code_gen -a ${ADDITIONAL_DATA_FILE} --cache-dir
+				${PROJECT_BINARY_DIR}/poly_gen/.cache ${GEN_DATA_CPP_ARG}
 				${GEN_DATA_MATLAB_ARG} ${GEN_DATA_PYTHON_ARG} ${GEN_DATA_PYTHON_PKG_ARG} ${GEN_DATA_SCHEMA_ARG}
-				${GEN_DATA_IDL_FILE}
+				${GEN_DATA_IDL_FILE_PATHS}
 			RESULT_VARIABLE result ERROR_VARIABLE error_output
 		)
 
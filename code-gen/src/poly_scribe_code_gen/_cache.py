@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""On-disk cache for the code generation.
+
+Entries are keyed by a hash of their inputs and the generator version, so a new release never reads stale data.
+Each entry is stored as a single file in a cache directory.
+Entries that are older than `max_age` are removed, and the oldest entries are removed once the cache
+exceeds `max_size` bytes.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from poly_scribe_code_gen.__about__ import __version__
+
+CACHE_DIR_ENV = "POLY_SCRIBE_CACHE_DIR"
+"""Environment variable that sets the default cache directory."""
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+"""Default maximum size of a cache directory in bytes."""
+
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+"""Default maximum age of a cache entry in seconds."""
+
+_ENTRY_SUFFIX = ".pickle"
+
+
+def default_cache_dir() -> Path | None:
+    """Get the default cache directory.
+
+    Returns:
+        The directory given by the `POLY_SCRIBE_CACHE_DIR` environment variable, or `None` if it is not set.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    return Path(cache_dir) if cache_dir else None
+
+
+def cache_key(*parts: str | bytes) -> str:
+    """Compute a cache key from the given parts and the generator version.
+
+    Args:
+        parts: The inputs that the cached value depends on.
+
+    Returns:
+        A hex digest identifying the inputs.
+    """
+    digest = hashlib.sha256(__version__.encode())
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def load(cache_dir: Path, key: str) -> Any | None:
+    """Load an entry from the cache.
+
+    A hit refreshes the modification time of the entry, so frequently used entries survive eviction.
+    Entries that cannot be read are removed.
+
+    Args:
+        cache_dir: The cache directory.
+        key: The key of the entry.
+
+    Returns:
+        The cached value, or `None` if there is no usable entry.
+    """
+    entry = cache_dir / f"{key}{_ENTRY_SUFFIX}"
+
+    try:
+        with open(entry, "rb") as f:
+            value = pickle.load(f)  # noqa: S301
+    except FileNotFoundError:
+        return None
+    except Exception:  # noqa: BLE001
+        entry.unlink(missing_ok=True)
+        return None
+
+    with contextlib.suppress(OSError):
+        os.utime(entry)
+
+    return value
+
+
+def store(
+    cache_dir: Path,
+    key: str,
+    value: Any,
+    *,
+    max_size: int = DEFAULT_MAX_SIZE,
+    max_age: float = DEFAULT_MAX_AGE,
+) -> None:
+    """Store an entry in the cache and evict stale entries.
+
+    The entry is written to a temporary file first and then moved into place,
+    so concurrent readers never see a partially written entry.
+
+    Args:
+        cache_dir: The cache directory.
+        key: The key of the entry.
+        value: The value to store, must be picklable.
+        max_size: Maximum size of the cache directory in bytes.
+        max_age: Maximum age of an entry in seconds.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_dir / f"{key}{_ENTRY_SUFFIX}")
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    evict(cache_dir, max_size=max_size, max_age=max_age)
+
+
+def evict(cache_dir: Path, *, max_size: int = DEFAULT_MAX_SIZE, max_age: float = DEFAULT_MAX_AGE) -> None:
+    """Remove stale entries from the cache.
+
+    First, all entries older than `max_age` are removed.
+    Then the least recently used entries are removed until the cache is no larger than `max_size`.
+
+    Args:
+        cache_dir: The cache directory.
+        max_size: Maximum size of the cache directory in bytes.
+        max_age: Maximum age of an entry in seconds.
+    """
+    now = time.time()
+    entries = []
+
+    for entry in cache_dir.glob(f"*{_ENTRY_SUFFIX}"):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+
+        if now - stat.st_mtime > max_age:
+            entry.unlink(missing_ok=True)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+    total_size = sum(size for _, size, _ in entries)
+
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total_size <= max_size:
+            break
+        entry.unlink(missing_ok=True)
+        total_size -= size
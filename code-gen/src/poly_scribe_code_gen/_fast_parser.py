@@ -0,0 +1,452 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Recursive descent parser for the WebIDL subset supported by poly-scribe.
+
+poly-scribe only uses `dictionary`, `enum` and `typedef` definitions, which makes the general
+WebIDL grammar of pywebidl2 much more expensive than necessary.
+This parser only understands that subset and produces the same definition dictionaries as
+`pywebidl2.parse`, so the result can be flattened by the same code.
+
+Anything outside of the subset raises an `UnsupportedSyntaxError`.
+In that case, callers are expected to fall back to pywebidl2, which also provides the diagnostics for invalid input.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<ws>\s+|//[^\n]*|/\*.*?\*/)
+    |(?P<decimal>-?(?:(?:[0-9]+\.[0-9]*|[0-9]*\.[0-9]+)(?:[Ee][+-]?[0-9]+)?|[0-9]+[Ee][+-]?[0-9]+))
+    |(?P<integer>-?(?:[1-9][0-9]*|0[Xx][0-9A-Fa-f]+|0[0-7]*))
+    |(?P<identifier>[_-]?[A-Za-z][0-9A-Z_a-z-]*)
+    |(?P<string>"[^"]*")
+    |(?P<other>[^\t\n\r 0-9A-Za-z])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_KEYWORDS = frozenset(
+    [
+        "any",
+        "async_iterable",
+        "async",
+        "attribute",
+        "bigint",
+        "boolean",
+        "byte",
+        "ByteString",
+        "callback",
+        "const",
+        "constructor",
+        "deleter",
+        "dictionary",
+        "DOMString",
+        "double",
+        "enum",
+        "false",
+        "float",
+        "FrozenArray",
+        "getter",
+        "Infinity",
+        "includes",
+        "inherit",
+        "interface",
+        "iterable",
+        "legacycaller",
+        "long",
+        "maplike",
+        "mixin",
+        "namespace",
+        "NaN",
+        "null",
+        "object",
+        "ObservableArray",
+        "octet",
+        "optional",
+        "or",
+        "partial",
+        "Promise",
+        "readonly",
+        "record",
+        "required",
+        "sequence",
+        "setlike",
+        "setter",
+        "short",
+        "static",
+        "stringifier",
+        "symbol",
+        "true",
+        "typedef",
+        "undefined",
+        "unrestricted",
+        "unsigned",
+        "USVString",
+        "UTF8String",
+        "void",
+        "ArrayBuffer",
+        "DataView",
+        "Int8Array",
+        "Int16Array",
+        "Int32Array",
+        "Uint8Array",
+        "Uint16Array",
+        "Uint32Array",
+        "Uint8ClampedArray",
+        "Float16Array",
+        "Float32Array",
+        "Float64Array",
+        "SharedArrayBuffer",
+        "BigInt64Array",
+        "BigUint64Array",
+    ]
+)
+"""Reserved words of WebIDL, these can not be used as identifiers."""
+
+_SIMPLE_TYPES = frozenset(("boolean", "byte", "octet", "bigint", "ByteString", "DOMString", "USVString", "UTF8String"))
+
+
+class UnsupportedSyntaxError(Exception):
+    """Raised if the input is not part of the supported WebIDL subset."""
+
+
+def _unescape(identifier: str) -> str:
+    # like pywebidl2, the escaping underscore is removed from the names of dictionaries, typedefs and referenced types,
+    # but kept for enums, inheritance, members and extended attribute names
+    return identifier.removeprefix("_")
+
+
+class _Parser:
+    __slots__ = ("_kinds", "_pos", "_values")
+
+    def __init__(self, idl: str) -> None:
+        kinds: list[str] = []
+        values: list[str] = []
+
+        pos = 0
+        for match in _TOKEN_REGEX.finditer(idl):
+            if match.start() != pos:
+                break
+            pos = match.end()
+
+            kind = match.lastgroup
+            if kind == "ws":
+                continue
+
+            kinds.append(kind)  # type: ignore[arg-type]
+            values.append(match.group())
+
+        if pos != len(idl):
+            msg = f"Unexpected character at offset {pos}"
+            raise UnsupportedSyntaxError(msg)
+
+        kinds.append("eof")
+        values.append("")
+
+        self._kinds = kinds
+        self._values = values
+        self._pos = 0
+
+    def _peek(self) -> str:
+        return self._values[self._pos]
+
+    def _next(self) -> str:
+        value = self._values[self._pos]
+        self._pos += 1
+        return value
+
+    def _accept(self, value: str) -> bool:
+        if self._values[self._pos] == value:
+            self._pos += 1
+            return True
+        return False
+
+    def _expect(self, value: str) -> None:
+        if not self._accept(value):
+            msg = f"Expected '{value}' but got '{self._peek()}'"
+            raise UnsupportedSyntaxError(msg)
+
+    def _identifier(self) -> str:
+        value = self._values[self._pos]
+        if self._kinds[self._pos] != "identifier" or value in _KEYWORDS:
+            msg = f"Expected identifier but got '{value}'"
+            raise UnsupportedSyntaxError(msg)
+        self._pos += 1
+        return value
+
+    def parse(self) -> dict[str, Any]:
+        definitions = []
+
+        while self._kinds[self._pos] != "eof":
+            ext_attrs = self._ext_attrs()
+            keyword = self._next()
+
+            if keyword == "dictionary":
+                definition = self._dictionary()
+            elif keyword == "enum":
+                definition = self._enum()
+            elif keyword == "typedef":
+                definition = self._typedef()
+            else:
+                msg = f"Unsupported definition '{keyword}'"
+                raise UnsupportedSyntaxError(msg)
+
+            definition["ext_attrs"] = ext_attrs
+            definitions.append(definition)
+
+        return {"definitions": definitions}
+
+    def _dictionary(self) -> dict[str, Any]:
+        name = _unescape(self._identifier())
+        inheritance = self._identifier() if self._accept(":") else None
+
+        self._expect("{")
+        members = []
+        while not self._accept("}"):
+            members.append(self._member())
+        self._expect(";")
+
+        return {"type": "dictionary", "name": name, "inheritance": inheritance, "members": members, "partial": False}
+
+    def _member(self) -> dict[str, Any]:
+        ext_attrs = self._ext_attrs()
+
+        if self._accept("required"):
+            idl_type = self._type_with_ext_attrs("dictionary-type")
+            name = self._identifier()
+            default = None
+            required = True
+        else:
+            idl_type = self._type("dictionary-type")
+            name = self._identifier()
+            default = self._default() if self._accept("=") else None
+            required = False
+
+        self._expect(";")
+
+        return {
+            "idl_type": idl_type,
+            "name": name,
+            "default": default,
+            "required": required,
+            "type": "field",
+            "ext_attrs": ext_attrs,
+        }
+
+    def _default(self) -> dict[str, Any]:
+        kind = self._kinds[self._pos]
+        value = self._next()
+
+        if kind == "string":
+            return {"type": "string", "value": value[1:-1]}
+        if kind in ("integer", "decimal"):
+            return {"type": "number", "value": value}
+        if value in ("true", "false"):
+            return {"type": "boolean", "value": value == "true"}
+        if value == "{":
+            self._expect("}")
+            return {"type": "dictionary", "value": {}}
+        if value == "[":
+            self._expect("]")
+            return {"type": "sequence", "value": []}
+
+        msg = f"Unsupported default value '{value}'"
+        raise UnsupportedSyntaxError(msg)
+
+    def _enum(self) -> dict[str, Any]:
+        name = self._identifier()
+
+        self._expect("{")
+        values = []
+        while True:
+            if self._kinds[self._pos] != "string":
+                msg = f"Expected enum value but got '{self._peek()}'"
+                raise UnsupportedSyntaxError(msg)
+            values.append({"type": "enum-value", "value": self._next()[1:-1]})
+
+            if not self._accept(","):
+                break
+            if self._peek() == "}":
+                break
+        self._expect("}")
+        self._expect(";")
+
+        return {"type": "enum", "name": name, "values": values}
+
+    def _typedef(self) -> dict[str, Any]:
+        idl_type = self._type_with_ext_attrs("typedef-type")
+        name = _unescape(self._identifier())
+        self._expect(";")
+
+        return {"type": "typedef", "idl_type": idl_type, "name": name}
+
+    def _ext_attrs(self) -> list[dict[str, Any]]:
+        if not self._accept("["):
+            return []
+
+        ext_attrs: list[dict[str, Any]] = []
+        while True:
+            name = self._identifier_or_keyword()
+            rhs: dict[str, str] | None = None
+
+            if self._accept("="):
+                kind = self._kinds[self._pos]
+                value = self._next()
+                if kind == "string":
+                    rhs = {"type": "string", "value": value}
+                elif kind in ("integer", "decimal"):
+                    rhs = {"type": kind, "value": value}
+                elif kind == "identifier":
+                    rhs = {"type": kind, "value": _unescape(value)}
+                else:
+                    msg = f"Unsupported extended attribute value '{value}'"
+                    raise UnsupportedSyntaxError(msg)
+
+            ext_attrs.append({"name": name, "arguments": [], "rhs": rhs, "type": "extended-attribute"})
+
+            if not self._accept(","):
+                break
+        self._expect("]")
+
+        return ext_attrs
+
+    def _identifier_or_keyword(self) -> str:
+        if self._kinds[self._pos] != "identifier":
+            msg = f"Expected identifier but got '{self._peek()}'"
+            raise UnsupportedSyntaxError(msg)
+        return self._next()
+
+    def _type_with_ext_attrs(self, type_kind: str | None) -> dict[str, Any]:
+        ext_attrs = self._ext_attrs()
+        idl_type = self._type(type_kind)
+        idl_type["ext_attrs"] = ext_attrs
+        return idl_type
+
+    def _type(self, type_kind: str | None) -> dict[str, Any]:
+        if self._accept("("):
+            members = [self._union_member()]
+            while self._accept("or"):
+                members.append(self._union_member())
+            self._expect(")")
+
+            if len(members) < 2:  # noqa: PLR2004
+                msg = "Union types need at least two members"
+                raise UnsupportedSyntaxError(msg)
+
+            return self._nullable(self._idl_type(members, type_kind, union=True))
+
+        return self._nullable(self._single_type(type_kind))
+
+    def _union_member(self) -> dict[str, Any]:
+        ext_attrs = self._ext_attrs()
+        if self._peek() == "(":
+            idl_type = self._type(None)
+        else:
+            idl_type = self._nullable(self._single_type(None))
+            if idl_type["generic"] == "record":
+                # pywebidl2 wraps records in unions in an additional type
+                idl_type = self._idl_type(idl_type, None)
+        idl_type["ext_attrs"] = ext_attrs
+        return idl_type
+
+    def _single_type(self, type_kind: str | None) -> dict[str, Any]:
+        kind = self._kinds[self._pos]
+        value = self._next()
+
+        if kind != "identifier":
+            msg = f"Expected type but got '{value}'"
+            raise UnsupportedSyntaxError(msg)
+
+        if value in ("sequence", "ObservableArray"):
+            # pywebidl2 reports both as a sequence
+            self._expect("<")
+            element = self._type_with_ext_attrs(type_kind)
+            self._expect(">")
+            return self._idl_type([element], type_kind, generic="sequence")
+
+        if value == "record":
+            self._expect("<")
+            key = self._idl_type(self._string_type(), type_kind)
+            self._expect(",")
+            element = self._type_with_ext_attrs(type_kind)
+            self._expect(">")
+            return self._idl_type([key, element], type_kind, generic="record")
+
+        if value == "unsigned":
+            return self._idl_type(f"unsigned {self._integer_type()}", type_kind)
+        if value in ("short", "long"):
+            self._pos -= 1
+            return self._idl_type(self._integer_type(), type_kind)
+        if value == "unrestricted":
+            float_type = self._next()
+            if float_type not in ("float", "double"):
+                msg = f"Expected 'float' or 'double' but got '{float_type}'"
+                raise UnsupportedSyntaxError(msg)
+            return self._idl_type(f"unrestricted {float_type}", type_kind)
+        if value in ("float", "double") or value in _SIMPLE_TYPES:
+            return self._idl_type(value, type_kind)
+        if value not in _KEYWORDS:
+            return self._idl_type(_unescape(value), type_kind)
+
+        msg = f"Unsupported type '{value}'"
+        raise UnsupportedSyntaxError(msg)
+
+    def _integer_type(self) -> str:
+        value = self._next()
+        if value == "short":
+            return value
+        if value == "long":
+            return "long long" if self._accept("long") else value
+
+        msg = f"Expected 'short' or 'long' but got '{value}'"
+        raise UnsupportedSyntaxError(msg)
+
+    def _string_type(self) -> str:
+        value = self._next()
+        if value not in ("ByteString", "DOMString", "USVString", "UTF8String"):
+            msg = f"Expected string type but got '{value}'"
+            raise UnsupportedSyntaxError(msg)
+        return value
+
+    def _nullable(self, idl_type: dict[str, Any]) -> dict[str, Any]:
+        if self._peek() == "?":
+            msg = "Nullable types are not supported"
+            raise UnsupportedSyntaxError(msg)
+        return idl_type
+
+    @staticmethod
+    def _idl_type(
+        idl_type: str | list[dict[str, Any]] | dict[str, Any],
+        type_kind: str | None,
+        *,
+        union: bool = False,
+        generic: str = "",
+    ) -> dict[str, Any]:
+        return {
+            "idl_type": idl_type,
+            "type": type_kind,
+            "ext_attrs": [],
+            "nullable": False,
+            "union": union,
+            "generic": generic,
+        }
+
+
+def parse(idl: str) -> dict[str, Any]:
+    """Parse a WebIDL string of the poly-scribe subset.
+
+    Args:
+        idl: The WebIDL string to parse.
+
+    Returns:
+        The parsed definitions, in the same format as `pywebidl2.parse`.
+
+    Raises:
+        UnsupportedSyntaxError: If the input is not part of the supported subset or is not valid WebIDL.
+    """
+    return _Parser(idl).parse()
@@ -0,0 +1,725 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Typed intermediate representation of parsed IDL data.
+
+The IR consists of frozen, slotted dataclasses, which need less memory than the nested dictionaries of `ParsedIDL`
+and give the generators typed attribute access instead of key lookups.
+The IR is immutable, so a single instance can be shared by all generators; each generator derives its own
+template data from it.
+Mappings are stored as read-only copies, so neither the creator of an instance nor its users can modify it in place.
+
+Type nodes are interned while parsing: structurally identical types share a single instance.
+Their hash is computed once on construction, so they are cheap keys for memoizing per-type results.
+`from_parsed_idl` and `to_parsed_idl` convert losslessly between both representations.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, TypeVar, Union
+
+from poly_scribe_code_gen._types import cpp_types
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from docstring_parser import Docstring
+
+    from poly_scribe_code_gen._types import ParsedIDL
+    from poly_scribe_code_gen.parse_idl import LazyDocstring
+
+    Comment = Union[Docstring, LazyDocstring]
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _precomputed_hash(self: Any) -> int:
+    return self._hash
+
+
+def _reduce_node(self: Any) -> tuple[type, tuple[Any, ...]]:
+    # Rebuild through the constructor, as the hash of strings differs between processes.
+    return type(self), tuple(getattr(self, node_field.name) for node_field in fields(self) if node_field.init)
+
+
+def _freeze_mappings(self: Any, *names: str) -> None:
+    for name in names:
+        value = getattr(self, name)
+        if not isinstance(value, MappingProxyType):
+            object.__setattr__(self, name, MappingProxyType(dict(value)))
+
+
+def _reduce_mappings(self: Any) -> tuple[type, tuple[Any, ...]]:
+    # read-only mappings cannot be pickled, they are passed to the constructor as dictionaries
+    return type(self), tuple(
+        dict(value) if isinstance(value, MappingProxyType) else value
+        for value in (getattr(self, data_field.name) for data_field in fields(self) if data_field.init)
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class ExtAttr:
+    """Extended attribute of a type, e.g. `[Default=Foo]`."""
+
+    name: str
+    """Name of the attribute."""
+    rhs_type: str | None = None
+    """Kind of the value of the attribute, e.g. `identifier` or `integer`."""
+    rhs_value: Any = None
+    """Value of the attribute."""
+    arguments: tuple[Any, ...] = ()
+    """Arguments of the attribute."""
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "_hash",
+            hash((ExtAttr, self.name, self.rhs_type, _hashable(self.rhs_value), _hashable(self.arguments))),
+        )
+
+    __hash__ = _precomputed_hash
+    __reduce__ = _reduce_node
+
+
+@dataclass(frozen=True, slots=True)
+class NamedType:
+    """A builtin or user defined type referenced by its name."""
+
+    name: str
+    """Name of the type."""
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((NamedType, self.name)))
+
+    __hash__ = _precomputed_hash
+    __reduce__ = _reduce_node
+
+
+@dataclass(frozen=True, slots=True)
+class SequenceType:
+    """A sequence of elements, with an optional fixed size."""
+
+    element: TypeNode
+    """Type of the elements."""
+    size: int | None = None
+    """Fixed size of the sequence, if any."""
+    ext_attrs: tuple[ExtAttr, ...] = ()
+    """Extended attributes of the type."""
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((SequenceType, self.element, self.size, self.ext_attrs)))
+
+    __hash__ = _precomputed_hash
+    __reduce__ = _reduce_node
+
+
+@dataclass(frozen=True, slots=True)
+class RecordType:
+    """A mapping from keys to values."""
+
+    key: TypeNode
+    """Type of the keys."""
+    value: TypeNode
+    """Type of the values."""
+    ext_attrs: tuple[ExtAttr, ...] = ()
+    """Extended attributes of the type."""
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((RecordType, self.key, self.value, self.ext_attrs)))
+
+    __hash__ = _precomputed_hash
+    __reduce__ = _reduce_node
+
+
+@dataclass(frozen=True, slots=True)
+class UnionType:
+    """A union of types."""
+
+    members: tuple[TypeNode, ...]
+    """The types contained in the union."""
+    ext_attrs: tuple[ExtAttr, ...] = ()
+    """Extended attributes of the type."""
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((UnionType, self.members, self.ext_attrs)))
+
+    __hash__ = _precomputed_hash
+    __reduce__ = _reduce_node
+
+
+TypeNode = Union[NamedType, SequenceType, RecordType, UnionType]
+"""Any type of the IR."""
+
+_TypeNodeT = TypeVar("_TypeNodeT", NamedType, SequenceType, RecordType, UnionType)
+
+
+def intern_type(type_node: _TypeNodeT, interned: dict[TypeNode, TypeNode]) -> _TypeNodeT:
+    """Get the shared instance of a type node.
+
+    Args:
+        type_node: The type node, its contained types should already be interned.
+        interned: The table of interned type nodes, the node is added if it is not contained yet.
+
+    Returns:
+        The instance from the table that is equal to the given node.
+    """
+    return interned.setdefault(type_node, type_node)  # type: ignore[return-value]
+
+
+@dataclass(frozen=True, slots=True)
+class Member:
+    """Member of a struct."""
+
+    name: str
+    """Name of the member."""
+    type: TypeNode
+    """Type of the member."""
+    required: bool = False
+    """Whether the member is required."""
+    default: Any = None
+    """Default value of the member, `"{}"` for an empty dictionary."""
+    default_type: str | None = None
+    """Type of the default value, given by the `Default` extended attribute."""
+    block_comment: Comment | None = None
+    """Block comment of the member."""
+    inline_comment: Comment | None = None
+    """Inline comment of the member."""
+
+
+@dataclass(frozen=True, slots=True)
+class Struct:
+    """A struct, defined by a WebIDL dictionary."""
+
+    name: str
+    """Name of the struct."""
+    members: tuple[Member, ...] = ()
+    """Members of the struct, excluding inherited ones."""
+    inheritance: str | None = None
+    """Name of the base struct, if any."""
+    block_comment: Comment | None = None
+    """Block comment of the struct."""
+    inline_comment: Comment | None = None
+    """Inline comment of the struct."""
+
+
+@dataclass(frozen=True, slots=True)
+class EnumValue:
+    """Value of an enumeration."""
+
+    name: str
+    """Name of the value."""
+    block_comment: Comment | None = None
+    """Block comment of the value."""
+    inline_comment: Comment | None = None
+    """Inline comment of the value."""
+
+
+@dataclass(frozen=True, slots=True)
+class Enumeration:
+    """An enumeration."""
+
+    name: str
+    """Name of the enumeration."""
+    values: tuple[EnumValue, ...] = ()
+    """Values of the enumeration."""
+    block_comment: Comment | None = None
+    """Block comment of the enumeration."""
+    inline_comment: Comment | None = None
+    """Inline comment of the enumeration."""
+
+
+@dataclass(frozen=True, slots=True)
+class Typedef:
+    """A type alias."""
+
+    name: str
+    """Name of the alias."""
+    type: TypeNode
+    """The aliased type."""
+    block_comment: Comment | None = None
+    """Block comment of the alias."""
+    inline_comment: Comment | None = None
+    """Inline comment of the alias."""
+
+
+class SymbolKind(Enum):
+    """Kind of a type name."""
+
+    BUILTIN = "builtin"
+    """A builtin type, e.g. `int` or `string`."""
+    STRUCT = "struct"
+    """A struct defined in the IDL."""
+    ENUM = "enum"
+    """An enumeration defined in the IDL."""
+    TYPEDEF = "typedef"
+    """A typedef defined in the IDL."""
+
+
+@dataclass(frozen=True, slots=True)
+class SymbolTable:
+    """All type names that can be referenced, with constant time lookup."""
+
+    kinds: Mapping[str, SymbolKind] = field(default_factory=dict)
+    """Kind of each type name."""
+    defined: frozenset[str] = field(init=False, repr=False, compare=False)
+    """Names of the structs, enumerations and typedefs, i.e. all types that are not builtin."""
+
+    def __post_init__(self) -> None:
+        _freeze_mappings(self, "kinds")
+        defined = frozenset(name for name, kind in self.kinds.items() if kind is not SymbolKind.BUILTIN)
+        object.__setattr__(self, "defined", defined)
+
+    @classmethod
+    def from_names(
+        cls,
+        *,
+        builtins: Iterable[str] = (),
+        structs: Iterable[str] = (),
+        enums: Iterable[str] = (),
+        typedefs: Iterable[str] = (),
+    ) -> SymbolTable:
+        """Build a symbol table from the names of the types.
+
+        Names defined in the IDL take precedence over builtin types of the same name.
+
+        Args:
+            builtins: Names of the builtin types.
+            structs: Names of the structs.
+            enums: Names of the enumerations.
+            typedefs: Names of the typedefs.
+
+        Returns:
+            The symbol table.
+        """
+        kinds = dict.fromkeys(builtins, SymbolKind.BUILTIN)
+        kinds.update(dict.fromkeys(typedefs, SymbolKind.TYPEDEF))
+        kinds.update(dict.fromkeys(enums, SymbolKind.ENUM))
+        kinds.update(dict.fromkeys(structs, SymbolKind.STRUCT))
+        return cls(kinds)
+
+    __reduce__ = _reduce_mappings
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.kinds
+
+    def kind(self, name: str) -> SymbolKind | None:
+        """Get the kind of a type name.
+
+        Args:
+            name: The type name.
+
+        Returns:
+            The kind of the type, or `None` if the name is unknown.
+        """
+        return self.kinds.get(name)
+
+
+@dataclass(frozen=True, slots=True)
+class InheritanceIndex:
+    """Transitive inheritance relations between structs."""
+
+    bases: Mapping[str, str] = field(default_factory=dict)
+    """Direct base by the name of each derived struct."""
+    children: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+    """Directly derived structs by the name of their base struct."""
+    ancestors: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+    """All bases of each struct, nearest first."""
+    descendants: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+    """All derived structs of each base struct in breadth-first order, structs without children are omitted."""
+    depth: Mapping[str, int] = field(default_factory=dict)
+    """Number of bases of each struct."""
+    order: tuple[str, ...] = ()
+    """All structs in topological order, i.e. every struct comes after its base."""
+
+    def __post_init__(self) -> None:
+        _freeze_mappings(self, "bases", "children", "ancestors", "descendants", "depth")
+
+    __reduce__ = _reduce_mappings
+
+    @classmethod
+    def from_bases(cls, bases: Mapping[str, str | None]) -> InheritanceIndex:
+        """Build the index from the direct base of each struct.
+
+        Bases that are not contained in `bases` are treated as external roots:
+        they appear in `children`, `descendants` and the `ancestors` of their derived structs, but not in `order`.
+
+        Args:
+            bases: The direct base of each struct, `None` for structs without a base.
+
+        Returns:
+            The inheritance index.
+
+        Raises:
+            RuntimeError: If the inheritance is cyclic.
+        """
+        direct_bases = {name: base for name, base in bases.items() if base}
+
+        children: dict[str, list[str]] = {}
+        for name, base in direct_bases.items():
+            children.setdefault(base, []).append(name)
+
+        ancestors: dict[str, tuple[str, ...]] = {}
+        for name in bases:
+            # walk up until a struct with known ancestors, then resolve the path top-down
+            path: list[str] = []
+            on_path: set[str] = set()
+            current = name
+            while current not in ancestors:
+                parent = direct_bases.get(current)
+                if parent is None:
+                    ancestors[current] = ()
+                    break
+                if parent in on_path or parent == current:
+                    msg = f"Cyclic inheritance of struct '{parent}'"
+                    raise RuntimeError(msg)
+                path.append(current)
+                on_path.add(current)
+                current = parent
+
+            for derived in reversed(path):
+                parent = direct_bases[derived]
+                ancestors[derived] = (parent, *ancestors[parent])
+
+        order = [name for name in bases if direct_bases.get(name) not in bases]
+        for name in order:
+            order.extend(children.get(name, ()))
+
+        descendants: dict[str, tuple[str, ...]] = {}
+        for base, derived_types in children.items():
+            subtree = list(derived_types)
+            for derived in subtree:
+                subtree.extend(children.get(derived, ()))
+            descendants[base] = tuple(subtree)
+
+        return cls(
+            bases=direct_bases,
+            children={base: tuple(derived) for base, derived in children.items()},
+            ancestors={name: ancestors[name] for name in bases},
+            descendants=descendants,
+            depth={name: len(ancestors[name]) for name in bases},
+            order=tuple(order),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class IDL:
+    """Parsed IDL data."""
+
+    typedefs: Mapping[str, Typedef] = field(default_factory=dict)
+    """Typedefs by name."""
+    enums: Mapping[str, Enumeration] = field(default_factory=dict)
+    """Enumerations by name."""
+    structs: Mapping[str, Struct] = field(default_factory=dict)
+    """Structs by name."""
+    inheritance_data: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+    """Directly derived structs by the name of their base struct."""
+    _symbols: SymbolTable | None = field(default=None, init=False, repr=False, compare=False)
+    _inheritance_index: InheritanceIndex | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        _freeze_mappings(self, "typedefs", "enums", "structs", "inheritance_data")
+
+    @property
+    def symbols(self) -> SymbolTable:
+        """All type names that can be referenced, i.e. the builtin types and the types defined in the IDL.
+
+        The table is built on first access, so intermediate instances, e.g. while linking, do not pay for it.
+        """
+        symbols = self._symbols
+        if symbols is None:
+            symbols = SymbolTable.from_names(
+                builtins=cpp_types, structs=self.structs, enums=self.enums, typedefs=self.typedefs
+            )
+            object.__setattr__(self, "_symbols", symbols)
+        return symbols
+
+    @property
+    def inheritance_index(self) -> InheritanceIndex:
+        """Transitive inheritance relations between the structs.
+
+        The index is built on first access, like [`symbols`][poly_scribe_code_gen._ir.IDL.symbols].
+        """
+        inheritance_index = self._inheritance_index
+        if inheritance_index is None:
+            inheritance_index = InheritanceIndex.from_bases(
+                {name: struct.inheritance for name, struct in self.structs.items()}
+            )
+            object.__setattr__(self, "_inheritance_index", inheritance_index)
+        return inheritance_index
+
+    __reduce__ = _reduce_mappings
+
+
+def as_idl(parsed_idl: ParsedIDL | IDL) -> IDL:
+    """Get the IR of parsed IDL data.
+
+    Args:
+        parsed_idl: Parsed IDL data, either as IR or as dictionaries.
+
+    Returns:
+        The IR, converted from the dictionaries if necessary.
+    """
+    if isinstance(parsed_idl, IDL):
+        return parsed_idl
+    return from_parsed_idl(parsed_idl)
+
+
+def as_type(type_data: TypeNode | dict[str, Any] | str) -> TypeNode:
+    """Get the IR of a type.
+
+    Args:
+        type_data: The type, either as IR or in the format of `ParsedIDL`.
+
+    Returns:
+        The IR of the type, converted if necessary.
+
+    Raises:
+        ValueError: If the type is not valid.
+    """
+    if isinstance(type_data, (NamedType, SequenceType, RecordType, UnionType)):
+        return type_data
+    return from_parsed_type(type_data)
+
+
+def from_parsed_idl(parsed_idl: ParsedIDL) -> IDL:
+    """Convert parsed IDL data from dictionaries to the IR.
+
+    Args:
+        parsed_idl: The parsed IDL data.
+
+    Returns:
+        The IR of the data.
+
+    Raises:
+        ValueError: If a type is not valid.
+    """
+    interned: dict[TypeNode, TypeNode] = {}
+    return IDL(
+        typedefs={
+            name: Typedef(name, from_parsed_type(data["type"], interned), *_comments_from_dict(data))
+            for name, data in parsed_idl["typedefs"].items()
+        },
+        enums={
+            name: Enumeration(
+                name,
+                tuple(EnumValue(value["name"], *_comments_from_dict(value)) for value in data["values"]),
+                *_comments_from_dict(data),
+            )
+            for name, data in parsed_idl["enums"].items()
+        },
+        structs={
+            name: Struct(
+                name,
+                tuple(
+                    Member(
+                        member_name,
+                        from_parsed_type(member_data["type"], interned),
+                        member_data["required"],
+                        member_data["default"],
+                        member_data["default_type"],
+                        *_comments_from_dict(member_data),
+                    )
+                    for member_name, member_data in data["members"].items()
+                ),
+                data["inheritance"],
+                *_comments_from_dict(data),
+            )
+            for name, data in parsed_idl["structs"].items()
+        },
+        inheritance_data={base: tuple(derived) for base, derived in parsed_idl["inheritance_data"].items()},
+    )
+
+
+def to_parsed_idl(idl: IDL) -> ParsedIDL:
+    """Convert the IR of parsed IDL data to dictionaries.
+
+    Args:
+        idl: The IR.
+
+    Returns:
+        The parsed IDL data as dictionaries.
+    """
+    return {
+        "typedefs": {
+            name: {"type": to_parsed_type(typedef.type), **comment_data(typedef)}
+            for name, typedef in idl.typedefs.items()
+        },
+        "enums": {
+            name: {
+                "values": [{"name": value.name, **comment_data(value)} for value in enum.values],
+                **comment_data(enum),
+            }
+            for name, enum in idl.enums.items()
+        },
+        "structs": {
+            name: {
+                "members": {
+                    member.name: {
+                        "type": to_parsed_type(member.type),
+                        "required": member.required,
+                        "default": member.default,
+                        "default_type": member.default_type,
+                        **comment_data(member),
+                    }
+                    for member in struct.members
+                },
+                "inheritance": struct.inheritance,
+                **comment_data(struct),
+            }
+            for name, struct in idl.structs.items()
+        },
+        "inheritance_data": {base: list(derived) for base, derived in idl.inheritance_data.items()},
+    }
+
+
+def from_parsed_type(type_data: dict[str, Any] | str, interned: dict[TypeNode, TypeNode] | None = None) -> TypeNode:
+    """Convert a type from the format of `ParsedIDL` to the IR.
+
+    Args:
+        type_data: The type, either a type name or a dictionary describing a compound type.
+        interned: Optional table of interned type nodes, see [`intern_type`][poly_scribe_code_gen._ir.intern_type].
+
+    Returns:
+        The IR of the type.
+
+    Raises:
+        ValueError: If the type is not valid.
+    """
+    if interned is None:
+        interned = {}
+
+    if isinstance(type_data, str):
+        return intern_type(NamedType(type_data), interned)
+
+    if type_data.get("vector"):
+        return intern_type(
+            SequenceType(
+                from_parsed_type(type_data["type_name"], interned),
+                type_data.get("size"),
+                _ext_attrs_from_dict(type_data),
+            ),
+            interned,
+        )
+    if type_data.get("map"):
+        return intern_type(
+            RecordType(
+                from_parsed_type(type_data["type_name"]["key"], interned),
+                from_parsed_type(type_data["type_name"]["value"], interned),
+                _ext_attrs_from_dict(type_data),
+            ),
+            interned,
+        )
+    if type_data.get("union"):
+        return intern_type(
+            UnionType(
+                tuple(from_parsed_type(contained, interned) for contained in type_data["type_name"]),
+                _ext_attrs_from_dict(type_data),
+            ),
+            interned,
+        )
+
+    msg = f"Unknown type: {type_data}"
+    raise ValueError(msg)
+
+
+def to_parsed_type(type_node: TypeNode) -> dict[str, Any] | str:
+    """Convert a type from the IR to the format of `ParsedIDL`.
+
+    Args:
+        type_node: The IR of the type.
+
+    Returns:
+        The type name for named types, a dictionary describing the type otherwise.
+    """
+    if isinstance(type_node, NamedType):
+        return type_node.name
+
+    if isinstance(type_node, SequenceType):
+        type_name: Any = to_parsed_type(type_node.element)
+        size = type_node.size
+    elif isinstance(type_node, RecordType):
+        type_name = {"key": to_parsed_type(type_node.key), "value": to_parsed_type(type_node.value)}
+        size = None
+    else:
+        type_name = [to_parsed_type(contained) for contained in type_node.members]
+        size = None
+
+    return {
+        "type_name": type_name,
+        "vector": isinstance(type_node, SequenceType),
+        "union": isinstance(type_node, UnionType),
+        "map": isinstance(type_node, RecordType),
+        "ext_attrs": [
+            {
+                "name": ext_attr.name,
+                "arguments": list(ext_attr.arguments),
+                "rhs": None if ext_attr.rhs_type is None else {"type": ext_attr.rhs_type, "value": ext_attr.rhs_value},
+                "type": "extended-attribute",
+            }
+            for ext_attr in type_node.ext_attrs
+        ],
+        "size": size,
+    }
+
+
+def ext_attr_from_dict(ext_attr: dict[str, Any]) -> ExtAttr:
+    """Convert an extended attribute as given by pywebidl2 to the IR.
+
+    Args:
+        ext_attr: The extended attribute.
+
+    Returns:
+        The IR of the extended attribute.
+    """
+    rhs = ext_attr.get("rhs")
+    return ExtAttr(
+        ext_attr["name"],
+        None if rhs is None else rhs["type"],
+        None if rhs is None else rhs["value"],
+        tuple(ext_attr.get("arguments", ())),
+    )
+
+
+def comment_data(node: Member | Struct | EnumValue | Enumeration | Typedef) -> dict[str, Comment]:
+    """Get the comments of a node in the format of `ParsedIDL`.
+
+    Args:
+        node: The node.
+
+    Returns:
+        The `block_comment` and `inline_comment` of the node, if they are set.
+    """
+    data = {}
+    if node.block_comment is not None:
+        data["block_comment"] = node.block_comment
+    if node.inline_comment is not None:
+        data["inline_comment"] = node.inline_comment
+    return data
+
+
+def _ext_attrs_from_dict(type_data: dict[str, Any]) -> tuple[ExtAttr, ...]:
+    return tuple(ext_attr_from_dict(ext_attr) for ext_attr in type_data.get("ext_attrs", ()))
+
+
+def _comments_from_dict(data: dict[str, Any]) -> tuple[Comment | None, Comment | None]:
+    return data.get("block_comment"), data.get("inline_comment")
@@ -0,0 +1,150 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Writing of generated files.
+
+Outputs are only written if their content changed.
+Leaving unchanged files untouched keeps their modification time, so build systems do not rebuild
+everything that depends on them, e.g. every translation unit that includes a generated header.
+New content is written to a temporary file first and then moved into place,
+so readers never see a partially written output.
+
+Large outputs can be streamed to the file in chunks and are compared with the existing file block by block,
+so they never have to be held in memory as a whole.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+_BUFFER_SIZE = 1024 * 1024
+"""Size of the write buffer and of the blocks in which files are compared."""
+
+
+def write_if_changed(out_file: Path, content: str) -> bool:
+    """Write the content to a file, unless the file already has exactly this content.
+
+    Args:
+        out_file: The file to write.
+        content: The new content of the file.
+
+    Returns:
+        Whether the file was written.
+    """
+    if _read(out_file) == content:
+        return False
+
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_file = temporary_file(out_file)
+    try:
+        with open(tmp_file, "w") as f:
+            f.write(content)
+        os.replace(tmp_file, out_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+    return True
+
+
+def write_chunks_if_changed(out_file: Path, chunks: Iterable[str]) -> bool:
+    """Stream the content to a file, unless the file already has exactly this content.
+
+    Args:
+        out_file: The file to write.
+        chunks: The new content of the file in chunks, e.g. from `jinja2.Template.generate`.
+
+    Returns:
+        Whether the file was written.
+    """
+    tmp_file = temporary_file(out_file)
+    try:
+        write_chunks(tmp_file, chunks)
+        return replace_if_changed(out_file, tmp_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+
+def write_chunks(out_file: Path, chunks: Iterable[str]) -> None:
+    """Stream content to a file through a large write buffer.
+
+    Args:
+        out_file: The file to write.
+        chunks: The content of the file in chunks.
+    """
+    with open(out_file, "w", buffering=_BUFFER_SIZE) as f:
+        f.writelines(chunks)
+
+
+def replace_if_changed(out_file: Path, new_file: Path) -> bool:
+    """Move a file over another one, unless both have the same content.
+
+    If the content is the same, `new_file` is removed and `out_file` is left untouched.
+
+    Args:
+        out_file: The file to replace.
+        new_file: The file with the new content, e.g. from [`temporary_file`][poly_scribe_code_gen._output.temporary_file].
+
+    Returns:
+        Whether `out_file` was replaced.
+    """
+    if _same_content(out_file, new_file):
+        new_file.unlink()
+        return False
+
+    os.replace(new_file, out_file)
+    return True
+
+
+def temporary_file(out_file: Path) -> Path:
+    """Create an empty temporary file next to an output file.
+
+    The temporary file has the same suffix as the output, so tools that look at the suffix treat it alike.
+    Unlike `tempfile.mkstemp`, it is created with the default permissions, which it passes on to the output.
+
+    Args:
+        out_file: The output file the temporary file is created for.
+
+    Returns:
+        Path to the temporary file.
+    """
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+
+    while True:
+        tmp_file = out_file.with_name(f".{out_file.stem}-{os.urandom(6).hex()}{out_file.suffix}")
+        try:
+            with open(tmp_file, "x"):
+                return tmp_file
+        except FileExistsError:
+            continue
+
+
+def _same_content(file: Path, other_file: Path) -> bool:
+    try:
+        if file.stat().st_size != other_file.stat().st_size:
+            return False
+
+        with open(file, "rb") as f, open(other_file, "rb") as other_f:
+            while True:
+                block = f.read(_BUFFER_SIZE)
+                if block != other_f.read(_BUFFER_SIZE):
+                    return False
+                if not block:
+                    return True
+    except FileNotFoundError:
+        return False
+
+
+def _read(file: Path) -> str | None:
+    try:
+        with open(file) as f:
+            return f.read()
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Jinja templates of the code generators.
+
+All generators share a single Jinja environment per process.
+The environment keeps compiled templates in memory, so a template is only compiled once per process,
+no matter how many IDL files are generated, e.g. in batch mode.
+With a bytecode cache, the compiled templates are also reused across processes.
+
+jinja2 is only imported once a template is requested.
+"""
+
+from __future__ import annotations
+
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import jinja2
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+"""Directory containing the templates."""
+
+
+@cache
+def environment() -> jinja2.Environment:
+    """Get the Jinja environment shared by all generators.
+
+    Returns:
+        The environment, loading templates from [`TEMPLATES_DIR`][poly_scribe_code_gen._templates.TEMPLATES_DIR].
+    """
+    import jinja2  # noqa: PLC0415
+
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        autoescape=jinja2.select_autoescape(
+            disabled_extensions=("jinja",),
+            default_for_string=True,
+            default=False,
+        ),
+    )
+
+
+def get_template(name: str) -> jinja2.Template:
+    """Get a template from the shared environment.
+
+    Args:
+        name: File name of the template in the templates directory.
+
+    Returns:
+        The compiled template.
+    """
+    return environment().get_template(name)
+
+
+def use_bytecode_cache(cache_dir: Path) -> None:
+    """Store the compiled templates of the shared environment in a directory.
+
+    Other processes using the same directory load the compiled templates instead of compiling them again.
+    Jinja invalidates entries when the template source or the Python version changes.
+
+    Args:
+        cache_dir: Directory for the compiled templates.
+    """
+    import jinja2  # noqa: PLC0415
+
+    env = environment()
+
+    if isinstance(env.bytecode_cache, jinja2.FileSystemBytecodeCache) and env.bytecode_cache.directory == str(
+        cache_dir
+    ):
+        return
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    env.bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache_dir))
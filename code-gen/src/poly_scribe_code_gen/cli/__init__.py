@@ -7,35 +7,53 @@
 This module provides the command line interface for generating code from WebIDL files.
 """
 
+from __future__ import annotations
+
 import argparse
-import copy
 import datetime
 import json
+from functools import partial
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from poly_scribe_code_gen import _cache
 from poly_scribe_code_gen.__about__ import __version__
-from poly_scribe_code_gen.cpp_gen import generate_cpp
-
-# from poly_scribe_code_gen.matlab_gen import generate_matlab
-from poly_scribe_code_gen.parse_idl import parse_idl
-from poly_scribe_code_gen.py_gen import generate_python, generate_python_package
+from poly_scribe_code_gen._cache import default_cache_dir
+from poly_scribe_code_gen._output import write_if_changed
+from poly_scribe_code_gen._templates import TEMPLATES_DIR, use_bytecode_cache
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+
+    from poly_scribe_code_gen._ir import IDL
     from poly_scribe_code_gen._types import AdditionalData
 
 
 def poly_scribe_code_gen() -> int:
     """Main entry point for the poly_scribe_code_gen command line interface.
 
-    This function parses command line arguments, processes the input WebIDL file,
+    This function parses command line arguments, processes the input WebIDL files,
     and generates the requested code files.
+    Multiple WebIDL files can be given, they may reference definitions in each other
+    and are generated as a single set of data structures.
     It supports generating C++, Python, and JSON schema files based on the provided WebIDL.
     It also allows for additional data to be passed for code generation.
 
+    Parsed IDL data and generated outputs can be cached on disk via the `--cache-dir` option or the
+    `POLY_SCRIBE_CACHE_DIR` environment variable.
+    If nothing relevant changed, the outputs are restored from the cache without generating them again.
+    Otherwise, each WebIDL file is cached on its own, so after an edit only the edited files are parsed again.
+
     If the `--schema` option is used, it requires either the `--py` or `--py-package` option to be specified,
     as the schema generation relies on the Python code being generated.
 
+    With `--jobs N`, the backends run concurrently in up to `N` processes.
+    With `--split-py-package`, the Python package consists of one module per group of connected definitions,
+    which are rendered and formatted concurrently in up to `N` processes as well.
+    The package imports each module on first access, so only the models that are used are built.
+
+    Outputs are only written if their content changed, the updated outputs are listed on stdout.
+
     Returns:
         Exit code, 0 for success, non-zero for failure.
 
@@ -44,7 +62,7 @@ def poly_scribe_code_gen() -> int:
     """
     parser = argparse.ArgumentParser(prog="poly-scribe-code-gen", description="Generate poly-scribe code from WebIDL.")
     parser.add_argument("-v", "--version", action="version", version=__version__)
-    parser.add_argument("input", help="Input WebIDL file to generate code from", type=Path)
+    parser.add_argument("input", help="Input WebIDL files to generate code from", type=Path, nargs="+")
     parser.add_argument("-c", "--cpp", help="Generate C++ code", type=Path, metavar="out")
     parser.add_argument("-p", "--py", help="Generate Python code", type=Path, metavar="out")
     parser.add_argument("-pp", "--py-package", help="Generate Python package", type=Path, metavar="out")
@@ -60,77 +78,370 @@ def poly_scribe_code_gen() -> int:
     parser.add_argument(
         "-a", "--additional-data", help="Additional data for the generation", type=Path, metavar="data", required=True
     )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for caching parsed IDL data and generated outputs (default: $POLY_SCRIBE_CACHE_DIR)",
+        type=Path,
+        metavar="dir",
+        default=default_cache_dir(),
+    )
+    parser.add_argument(
+        "--fast-parser",
+        help="Parse with the specialised parser for the poly-scribe WebIDL subset",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of processes to run the backends and package modules in concurrently (default: 1)",
+        type=int,
+        metavar="N",
+        default=1,
+    )
+    parser.add_argument(
+        "--no-format",
+        help="Do not format the generated Python code with black and isort",
+        dest="format_code",
+        action="store_false",
+    )
+    parser.add_argument(
+        "--split-py-package",
+        help="Generate one module per group of connected definitions in the Python package",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--py-codecs",
+        help="Generate decoders and encoders for loading and saving trusted data in the Python code",
+        action="store_true",
+    )
 
     args = parser.parse_args()
 
-    parsed_idl = parse_idl(args.input)
-
     with open(args.additional_data) as f:
         additional_data: AdditionalData = json.load(f)
 
-    additional_data["year"] = str(datetime.datetime.now(tz=datetime.timezone.utc).date().year)
-    additional_data["out_file"] = args.cpp.name if args.cpp else None
+    changed = generate(
+        args.input,
+        additional_data,
+        cpp=args.cpp,
+        py=args.py,
+        py_package=args.py_package,
+        schema=(Path(args.schema[0]), args.schema[1]) if args.schema else None,
+        cache_dir=args.cache_dir,
+        fast_parser=args.fast_parser,
+        jobs=args.jobs,
+        format_code=args.format_code,
+        split_py_package=args.split_py_package,
+        py_codecs=args.py_codecs,
+    )
 
-    if args.cpp:
-        cpp_idl_copy = copy.deepcopy(parsed_idl)
-        generate_cpp(parsed_idl=cpp_idl_copy, additional_data=additional_data, out_file=args.cpp)
+    for out_file in changed:
+        print(f"Updated {out_file}")  # noqa: T201
 
-    # if args.matlab:
-    #     matlab_idl_copy = copy.deepcopy(parsed_idl)
-    #     generate_matlab(parsed_idl=matlab_idl_copy, additional_data=additional_data, out_path=args.matlab)
+    return 0
 
-    if args.py:
-        python_idl_copy = copy.deepcopy(parsed_idl)
-        generate_python(parsed_idl=python_idl_copy, additional_data=additional_data, out_file=args.py)
 
-    if args.py_package:
-        python_idl_copy = copy.deepcopy(parsed_idl)
-        generate_python_package(parsed_idl=python_idl_copy, additional_data=additional_data, out_dir=args.py_package)
+def generate(
+    idl_files: Sequence[Path],
+    additional_data: AdditionalData,
+    *,
+    cpp: Path | None = None,
+    py: Path | None = None,
+    py_package: Path | None = None,
+    schema: tuple[Path, str] | None = None,
+    cache_dir: Path | None = None,
+    fast_parser: bool = False,
+    jobs: int = 1,
+    format_code: bool = True,
+    split_py_package: bool = False,
+    py_codecs: bool = False,
+) -> list[Path]:
+    """Generate the requested outputs for a set of WebIDL files.
+
+    This is what a single invocation of the command line interface does after parsing its arguments.
+
+    The backends do not depend on each other, so with `jobs` greater than one they run concurrently
+    in a process pool, each on its own copy of the parsed IDL.
+    The schema is generated as soon as the Python code it is loaded from is ready.
+
+    With a cache directory, the generated outputs are cached, keyed by the content of the WebIDL files,
+    the additional data, the requested outputs, the templates and the generator version.
+    The year, which is set to the current one, is not part of the key.
+    On a hit, the outputs are restored from the cache without importing the generators.
+
+    Args:
+        idl_files: The WebIDL files to generate code from.
+        additional_data: Additional data for the generation, the year and output file are set here.
+        cpp: Output file for the C++ code.
+        py: Output file for the Python code.
+        py_package: Output directory for the Python package.
+        schema: Output file for the JSON schema and the name of the class to generate it for.
+        cache_dir: Optional directory for caching parsed IDL data and generated outputs.
+        fast_parser: Use the specialised parser for the poly-scribe WebIDL subset.
+        jobs: Maximum number of processes to run the backends in.
+        format_code: Format the generated Python code with black and isort.
+        split_py_package: Split the Python package into modules, rendered in up to `jobs` processes.
+        py_codecs: Generate decoders and encoders for loading and saving trusted data in the Python code.
 
-    if args.schema and not (args.py or args.py_package):
+    Returns:
+        The output files whose content changed, unchanged outputs are not written.
+
+    Raises:
+        RuntimeError: If a schema is requested without Python code or the schema cannot be generated.
+    """
+    if schema and not (py or py_package):
         msg = "Schema can only be generated with Python or Python package"
         raise RuntimeError(msg)
 
-    if args.schema:
-        import importlib.util  # noqa: PLC0415
-        import inspect  # noqa: PLC0415
-        import sys  # noqa: PLC0415
-
-        module_name = "idl_module"
-
-        if args.py:
-            spec = importlib.util.spec_from_file_location(module_name, args.py)
-        else:
-            source_dir = args.py_package / "src" / additional_data["package"]
-            init_file = source_dir / "__init__.py"
-            if not init_file.exists():
-                msg = f"Python package '{args.py_package}' does not contain an __init__.py file"
-                raise RuntimeError(msg)
-            spec = importlib.util.spec_from_file_location(module_name, init_file)
-
-        if spec is None or spec.loader is None:
-            msg = f"Failed to load Python module from '{args.py or args.py_package}'"
-            raise RuntimeError(msg)
+    outputs = _output_files(additional_data, cpp=cpp, py=py, py_package=py_package, schema=schema)
+
+    key = None
+    if cache_dir is not None:
+        key = _generation_key(
+            idl_files,
+            additional_data,
+            outputs,
+            cpp=cpp,
+            schema=schema,
+            format_code=format_code and bool(py or py_package),
+            split_py_package=split_py_package and bool(py_package),
+            py_codecs=py_codecs and bool(py or py_package),
+        )
+        cached_outputs = _cache.load(cache_dir / "generate", key)
+        if cached_outputs is not None:
+            if py_package and split_py_package:
+                # the modules depend on the IDL, they are the cached outputs besides the requested ones
+                module_files = [name.removeprefix("py_package/") for name in cached_outputs if name not in outputs]
+                outputs.update(_package_module_files(py_package, additional_data, module_files))
+            return [out_file for name, out_file in outputs.items() if write_if_changed(out_file, cached_outputs[name])]
+
+    changed = _generate_uncached(
+        idl_files,
+        additional_data,
+        cpp=cpp,
+        py=py,
+        py_package=py_package,
+        schema=schema,
+        cache_dir=cache_dir,
+        fast_parser=fast_parser,
+        jobs=jobs,
+        format_code=format_code,
+        split_py_package=split_py_package,
+        py_codecs=py_codecs,
+        outputs=outputs,
+    )
 
-        idl_module = importlib.util.module_from_spec(spec)
-        sys.modules[module_name] = idl_module
-        spec.loader.exec_module(idl_module)
+    if cache_dir is not None and key is not None:
+        _cache.store(cache_dir / "generate", key, {name: out_file.read_text() for name, out_file in outputs.items()})
+
+    return changed
 
-        out_file = Path(args.schema[0])
-        requested_model = args.schema[1]
 
-        class_members = inspect.getmembers(sys.modules[module_name], inspect.isclass)
+def _generate_uncached(
+    idl_files: Sequence[Path],
+    additional_data: AdditionalData,
+    *,
+    cpp: Path | None,
+    py: Path | None,
+    py_package: Path | None,
+    schema: tuple[Path, str] | None,
+    cache_dir: Path | None,
+    fast_parser: bool,
+    jobs: int,
+    format_code: bool,
+    split_py_package: bool,
+    py_codecs: bool,
+    outputs: dict[str, Path],
+) -> list[Path]:
+    # the backends pull in jinja2, black and isort, so only the selected ones are imported
+    from poly_scribe_code_gen.parse_idl import parse_idl_files  # noqa: PLC0415
 
-        class_members_flatten = [m[0] for m in class_members]
+    parsed_idl = parse_idl_files(idl_files, cache_dir=cache_dir, fast_parser=fast_parser)
 
-        if requested_model not in class_members_flatten:
+    if cache_dir is not None:
+        use_bytecode_cache(cache_dir / "templates")
+
+    additional_data["year"] = str(datetime.datetime.now(tz=datetime.timezone.utc).date().year)
+    additional_data["out_file"] = cpp.name if cpp else None
+
+    backends: dict[str, tuple[Callable[[IDL, AdditionalData, Path], list[Path]], Path]] = {}
+    if cpp:
+        from poly_scribe_code_gen.cpp_gen import generate_cpp  # noqa: PLC0415
+
+        backends["cpp"] = (generate_cpp, cpp)
+    # if matlab:
+    #     from poly_scribe_code_gen.matlab_gen import generate_matlab
+    #
+    #     backends["matlab"] = (generate_matlab, matlab)
+    if py:
+        from poly_scribe_code_gen.py_gen import generate_python  # noqa: PLC0415
+
+        backends["py"] = (partial(generate_python, format_code=format_code, codecs=py_codecs), py)
+    if py_package:
+        from poly_scribe_code_gen.py_gen import generate_python_package, split_modules  # noqa: PLC0415
+
+        backends["py_package"] = (
+            partial(
+                generate_python_package, format_code=format_code, split=split_py_package, jobs=jobs, codecs=py_codecs
+            ),
+            py_package,
+        )
+
+        if split_py_package:
+            # the modules are outputs as well, so that they are cached with the other outputs
+            outputs.update(_package_module_files(py_package, additional_data, split_modules(parsed_idl)))
+
+    changed: list[Path] = []
+
+    def _generate_requested_schema() -> None:
+        if schema and _generate_schema(
+            schema[0], schema[1], py=py, py_package=py_package, package=additional_data["package"]
+        ):
+            changed.append(schema[0])
+
+    if jobs <= 1 or len(backends) <= 1:
+        for generator, out in backends.values():
+            changed.extend(generator(parsed_idl, additional_data, out))
+        _generate_requested_schema()
+        return changed
+
+    from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(backends))) as executor:
+        futures = {
+            name: executor.submit(generator, parsed_idl, additional_data, out)
+            for name, (generator, out) in backends.items()
+        }
+
+        if schema:
+            # the schema is loaded from the Python code, the other backends keep running meanwhile
+            futures["py" if py else "py_package"].result()
+            _generate_requested_schema()
+
+        for future in futures.values():
+            changed.extend(future.result())
+
+    return changed
+
+
+def _output_files(
+    additional_data: AdditionalData,
+    *,
+    cpp: Path | None,
+    py: Path | None,
+    py_package: Path | None,
+    schema: tuple[Path, str] | None,
+) -> dict[str, Path]:
+    outputs = {}
+    if cpp:
+        outputs["cpp"] = cpp
+    if py:
+        outputs["py"] = py
+    if py_package:
+        outputs["py_package/__init__.py"] = py_package / "src" / additional_data["package"] / "__init__.py"
+        outputs["py_package/pyproject.toml"] = py_package / "pyproject.toml"
+    if schema:
+        outputs["schema"] = schema[0]
+    return outputs
+
+
+def _package_module_files(
+    py_package: Path, additional_data: AdditionalData, module_files: Iterable[str]
+) -> dict[str, Path]:
+    source_dir = py_package / "src" / additional_data["package"]
+    return {f"py_package/{module_file}": source_dir / module_file for module_file in module_files}
+
+
+def _generation_key(
+    idl_files: Sequence[Path],
+    additional_data: AdditionalData,
+    outputs: dict[str, Path],
+    *,
+    cpp: Path | None,
+    schema: tuple[Path, str] | None,
+    format_code: bool,
+    split_py_package: bool,
+    py_codecs: bool,
+) -> str:
+    # the year changes the copyright notice only, which does not warrant generating everything again
+    relevant_data = {key: value for key, value in additional_data.items() if key not in {"year", "out_file"}}
+
+    parts: list[str | bytes] = [
+        "generate-2",
+        json.dumps(relevant_data, sort_keys=True),
+        json.dumps(sorted(outputs)),
+        "split" if split_py_package else "",
+        "codecs" if py_codecs else "",
+        # the name of the C++ output and the schema class end up in the generated content
+        cpp.name if cpp else "",
+        schema[1] if schema else "",
+        # the formatted code depends on the formatters, which are not imported for this
+        _formatter_versions() if format_code else "",
+    ]
+
+    parts.extend(idl_file.read_bytes() for idl_file in idl_files)
+
+    for template in sorted(TEMPLATES_DIR.rglob("*")):
+        if template.is_file():
+            parts.extend((template.relative_to(TEMPLATES_DIR).as_posix(), template.read_bytes()))
+
+    return _cache.cache_key(*parts)
+
+
+def _formatter_versions() -> str:
+    from importlib.metadata import PackageNotFoundError, version  # noqa: PLC0415
+
+    versions = []
+    for formatter in ("black", "isort"):
+        try:
+            versions.append(f"{formatter}=={version(formatter)}")
+        except PackageNotFoundError:
+            versions.append(formatter)
+    return ",".join(versions)
+
+
+def _generate_schema(
+    out_file: Path, requested_model: str, *, py: Path | None, py_package: Path | None, package: str
+) -> bool:
+    import importlib.util  # noqa: PLC0415
+    import inspect  # noqa: PLC0415
+    import sys  # noqa: PLC0415
+
+    module_name = "idl_module"
+
+    if py:
+        spec = importlib.util.spec_from_file_location(module_name, py)
+    elif py_package:
+        source_dir = py_package / "src" / package
+        init_file = source_dir / "__init__.py"
+        if not init_file.exists():
+            msg = f"Python package '{py_package}' does not contain an __init__.py file"
+            raise RuntimeError(msg)
+        # the modules of a split package are imported relative to the package
+        spec = importlib.util.spec_from_file_location(
+            module_name, init_file, submodule_search_locations=[str(source_dir)]
+        )
+    else:
+        spec = None
+
+    if spec is None or spec.loader is None:
+        msg = f"Failed to load Python module from '{py or py_package}'"
+        raise RuntimeError(msg)
+
+    idl_module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = idl_module
+    try:
+        spec.loader.exec_module(idl_module)
+
+        # the models of a split package are imported on access, so only the requested one is built
+        if not inspect.isclass(getattr(idl_module, requested_model, None)):
             msg = f"Data model '{requested_model}' not found in given IDL."
             raise RuntimeError(msg)
 
         schema_data = getattr(idl_module, requested_model).schema_json(indent=2)
+    finally:
+        # a later generation in the same process, e.g. in a batch worker, must not reuse the modules
+        for name in [name for name in sys.modules if name == module_name or name.startswith(f"{module_name}.")]:
+            del sys.modules[name]
 
-        out_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(out_file, "w") as f:
-            f.write(schema_data)
-
-    return 0
+    return write_if_changed(out_file, schema_data)
@@ -0,0 +1,235 @@
+# SPDX-FileCopyrightText: 2024-present Pascal Palenda <pascal.palenda@akustik.rwth-aachen.de>
+#
+# SPDX-License-Identifier: MIT
+
+"""Batch command line interface for the poly_scribe_code_gen package.
+
+This module generates the code for many independent WebIDL inputs in a single invocation.
+The inputs and outputs are listed in a JSON manifest and the jobs are distributed over a process pool,
+so the interpreter start-up and the imports of the generators are paid once per worker instead of once per input.
+
+A manifest lists the jobs, paths are relative to the directory of the manifest:
+
+```json
+{
+    "jobs": [
+        {
+            "idl": ["common.webidl", "plugin.webidl"],
+            "additional_data": {"package": "plugin"},
+            "cpp": "plugin/plugin.hpp",
+            "py_package": "plugin/py",
+            "schema": ["plugin/schema.json", "PluginSystem"]
+        }
+    ]
+}
+```
+
+`idl` may be a single file, `additional_data` may also be the path to a JSON file.
+The outputs `cpp`, `py`, `py_package` and `schema` are optional, like the respective command line options.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from poly_scribe_code_gen.__about__ import __version__
+from poly_scribe_code_gen._cache import default_cache_dir
+from poly_scribe_code_gen.cli import generate
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from poly_scribe_code_gen._types import AdditionalData
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """A single entry of a batch manifest."""
+
+    idl_files: tuple[Path, ...]
+    """The WebIDL files to generate code from."""
+    additional_data: AdditionalData
+    """Additional data for the generation."""
+    cpp: Path | None = None
+    """Output file for the C++ code."""
+    py: Path | None = None
+    """Output file for the Python code."""
+    py_package: Path | None = None
+    """Output directory for the Python package."""
+    schema: tuple[Path, str] | None = None
+    """Output file for the JSON schema and the name of the class to generate it for."""
+    options: dict[str, Any] = field(default_factory=dict)
+    """Keyword arguments passed on to the generation, e.g. the cache directory."""
+
+
+def load_manifest(manifest_file: Path) -> list[BatchJob]:
+    """Load the jobs of a batch manifest.
+
+    Args:
+        manifest_file: Path to the JSON manifest.
+
+    Returns:
+        The jobs of the manifest, with all paths resolved relative to the manifest.
+
+    Raises:
+        TypeError: If the manifest does not contain a list of jobs.
+        ValueError: If a job does not specify its WebIDL files or additional data.
+    """
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+
+    base_dir = manifest_file.parent
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        msg = f"Manifest '{manifest_file}' must contain a list of jobs"
+        raise TypeError(msg)
+
+    jobs = []
+
+    for index, entry in enumerate(manifest["jobs"]):
+        if "idl" not in entry or "additional_data" not in entry:
+            msg = f"Job {index} in manifest '{manifest_file}' requires 'idl' and 'additional_data'"
+            raise ValueError(msg)
+
+        idl = entry["idl"]
+        idl_files = tuple(base_dir / idl_file for idl_file in ([idl] if isinstance(idl, str) else idl))
+
+        additional_data = entry["additional_data"]
+        if isinstance(additional_data, str):
+            with open(base_dir / additional_data) as f:
+                additional_data = json.load(f)
+
+        schema = entry.get("schema")
+
+        jobs.append(
+            BatchJob(
+                idl_files=idl_files,
+                additional_data=additional_data,
+                cpp=base_dir / entry["cpp"] if entry.get("cpp") else None,
+                py=base_dir / entry["py"] if entry.get("py") else None,
+                py_package=base_dir / entry["py_package"] if entry.get("py_package") else None,
+                schema=(base_dir / schema[0], schema[1]) if schema else None,
+            )
+        )
+
+    return jobs
+
+
+def run_batch(jobs: list[BatchJob], *, max_workers: int | None = None, **options: Any) -> dict[int, str]:
+    """Generate the outputs of all jobs on a process pool.
+
+    A failing job does not stop the other jobs.
+
+    Args:
+        jobs: The jobs to run.
+        max_workers: Number of worker processes, defaults to the number of CPUs.
+        options: Keyword arguments for the generation of every job, e.g. `cache_dir` and `fast_parser`.
+
+    Returns:
+        The error message of each failed job by its index.
+    """
+    jobs = [replace(job, options={**options, **job.options}) for job in jobs]
+
+    if max_workers == 1 or len(jobs) <= 1:
+        return _collect_errors(map(_run_job, jobs))
+
+    with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(jobs))) as executor:
+        return _collect_errors(executor.map(_run_job, jobs))
+
+
+def _collect_errors(results: Iterable[str | None]) -> dict[int, str]:
+    return {index: error for index, error in enumerate(results) if error is not None}
+
+
+def _run_job(job: BatchJob) -> str | None:
+    try:
+        generate(
+            job.idl_files,
+            job.additional_data,
+            cpp=job.cpp,
+            py=job.py,
+            py_package=job.py_package,
+            schema=job.schema,
+            **job.options,
+        )
+    except Exception as e:  # noqa: BLE001
+        return f"{type(e).__name__}: {e}"
+
+    return None
+
+
+def poly_scribe_code_gen_batch() -> int:
+    """Main entry point for the batch command line interface.
+
+    This function parses the command line arguments, loads the manifest and runs all of its jobs.
+    Errors of failed jobs are printed to stderr.
+
+    Returns:
+        Exit code, 0 if all jobs succeeded, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        prog="poly-scribe-code-gen-batch", description="Generate poly-scribe code for all jobs of a manifest."
+    )
+    parser.add_argument("-v", "--version", action="version", version=__version__)
+    parser.add_argument("manifest", help="JSON manifest listing the jobs", type=Path)
+    parser.add_argument(
+        "-j", "--jobs", help="Number of worker processes (default: number of CPUs)", type=int, metavar="N"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for caching parsed IDL data and generated outputs (default: $POLY_SCRIBE_CACHE_DIR)",
+        type=Path,
+        metavar="dir",
+        default=default_cache_dir(),
+    )
+    parser.add_argument(
+        "--fast-parser",
+        help="Parse with the specialised parser for the poly-scribe WebIDL subset",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-format",
+        help="Do not format the generated Python code with black and isort",
+        dest="format_code",
+        action="store_false",
+    )
+    parser.add_argument(
+        "--split-py-package",
+        help="Generate one module per group of connected definitions in the Python packages",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--py-codecs",
+        help="Generate decoders and encoders for loading and saving trusted data in the Python code",
+        action="store_true",
+    )
+
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    errors = run_batch(
+        jobs,
+        max_workers=args.jobs,
+        cache_dir=args.cache_dir,
+        fast_parser=args.fast_parser,
+        format_code=args.format_code,
+        split_py_package=args.split_py_package,
+        py_codecs=args.py_codecs,
+    )
+
+    for index, error in errors.items():
+        idl_files = ", ".join(str(idl_file) for idl_file in jobs[index].idl_files)
+        print(f"Job {index} ({idl_files}) failed: {error}", file=sys.stderr)  # noqa: T201
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(poly_scribe_code_gen_batch())
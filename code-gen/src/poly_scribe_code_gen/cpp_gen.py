@@ -10,19 +10,32 @@ It supports generating enumerations, typedefs, structs, and polymorphic structs
 
 from __future__ import annotations
 
-import copy
-from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
-import jinja2
+from poly_scribe_code_gen._ir import (
+    IDL,
+    InheritanceIndex,
+    NamedType,
+    RecordType,
+    SequenceType,
+    TypeNode,
+    as_idl,
+    as_type,
+    comment_data,
+)
+from poly_scribe_code_gen._output import write_chunks_if_changed
+from poly_scribe_code_gen._templates import get_template
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping, Sequence
+    from pathlib import Path
+
     from docstring_parser import Docstring
 
     from poly_scribe_code_gen._types import AdditionalData, ParsedIDL
 
 
-def generate_cpp(parsed_idl: ParsedIDL, additional_data: AdditionalData, out_file: Path) -> None:
+def generate_cpp(parsed_idl: ParsedIDL | IDL, additional_data: AdditionalData, out_file: Path) -> list[Path]:
     """Generate C++ code from the parsed IDL data.
 
     Based on the parsed IDL data and additional data, this function generates [reflect-cpp](https://rfl.getml.com/) data structures.
@@ -45,143 +58,177 @@ def generate_cpp(parsed_idl: ParsedIDL, additional_data: AdditionalData, out_fil
     - UBJSON
 
     Any types from the IDL that are not supported in C++ are converted to cpp types.
+
+    The parsed IDL data can be given either as dictionaries or as the typed intermediate representation.
+    It is not modified.
+
+    The output file is only written if its content changed, so its modification time does not trigger
+    rebuilds of unchanged code.
+
+    Returns:
+        The output files whose content changed.
     """
 
-    res = _render_template(parsed_idl, additional_data)
+    chunks = _render_chunks(parsed_idl, additional_data)
+
+    return [out_file] if write_chunks_if_changed(out_file, chunks) else []
 
-    out_file.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(out_file, "w") as f:
-        f.write(res)
+def _render_template(parsed_idl: ParsedIDL | IDL, additional_data: AdditionalData) -> str:
+    return "".join(_render_chunks(parsed_idl, additional_data))
 
 
-def _render_template(parsed_idl: ParsedIDL, additional_data: AdditionalData) -> str:
+def _render_chunks(parsed_idl: ParsedIDL | IDL, additional_data: AdditionalData) -> Iterator[str]:
+    # the output is generated in chunks, so large headers can be streamed to disk
     if not additional_data.get("package"):
         msg = "Missing package name in additional data"
         raise ValueError(msg)
 
-    package_dir = Path(__file__).resolve().parent
-    templates_dir = package_dir / "templates"
-
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(templates_dir),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        autoescape=jinja2.select_autoescape(
-            disabled_extensions=("jinja",),
-            default_for_string=True,
-            default=False,
-        ),
-    )
+    j2_template = get_template("reflect.jinja")
 
-    j2_template = env.get_template("reflect.jinja")
+    idl = as_idl(parsed_idl)
 
-    parsed_idl = _transform_types(parsed_idl)
-    parsed_idl = _flatten_struct_inheritance(parsed_idl)
-    parsed_idl = _handle_rfl_tagged_union(parsed_idl)
-    parsed_idl = _transform_comments(parsed_idl)
+    template_data = _transform_types(idl)
+    template_data = _flatten_struct_inheritance(template_data, idl.inheritance_index)
+    template_data = _handle_rfl_tagged_union(template_data, idl.inheritance_index)
+    template_data = _transform_comments(template_data)
 
-    data = {**additional_data, **parsed_idl}
+    data = {**additional_data, **template_data}
 
-    return j2_template.render(data)
+    return j2_template.generate(data)
 
 
-def _transform_types(parsed_idl: ParsedIDL) -> ParsedIDL:
-    for struct_data in parsed_idl["structs"].values():
-        for member_data in struct_data["members"].values():
-            member_data["type"] = _transformer(member_data["type"], parsed_idl["inheritance_data"])
-            if not member_data["required"]:
-                member_data["type"] = f"std::optional<{member_data['type']}>"
+def _transform_types(parsed_idl: ParsedIDL | IDL) -> ParsedIDL:
+    idl = as_idl(parsed_idl)
 
-            if "std::string" in member_data["type"] and member_data["default"]:
-                member_data["default"] = f'"{member_data["default"]}"'
+    # type nodes are shared between members, so each distinct type is rendered once
+    rendered: dict[TypeNode, str] = {}
 
-            if "bool" in member_data["type"] and member_data["default"] is not None:
-                member_data["default"] = "true" if member_data["default"] else "false"
+    structs = {}
+    for name, struct in idl.structs.items():
+        members = {}
+        for member in struct.members:
+            member_type = _transformer(member.type, idl.inheritance_data, rendered)
+            if not member.required:
+                member_type = f"std::optional<{member_type}>"
 
-    for type_def_data in parsed_idl["typedefs"].values():
-        type_def_data["type"] = _transformer(type_def_data["type"], parsed_idl["inheritance_data"])
+            default = member.default
+            if "std::string" in member_type and default:
+                default = f'"{default}"'
 
-    return parsed_idl
+            if "bool" in member_type and default is not None:
+                default = "true" if default else "false"
 
+            members[member.name] = {
+                "type": member_type,
+                "required": member.required,
+                "default": default,
+                "default_type": member.default_type,
+                **comment_data(member),
+            }
 
-def _transformer(type_input: dict[str, Any], inheritance_data: None | dict[str, list[str]] = None) -> str:
-    if isinstance(type_input, str):
-        conversion = {"string": "std::string", "ByteString": "std::string"}
+        structs[name] = {"members": members, "inheritance": struct.inheritance, **comment_data(struct)}
 
-        if inheritance_data and type_input in inheritance_data:
-            return f"{type_input}_t"
+    return {
+        "typedefs": {
+            name: {"type": _transformer(typedef.type, idl.inheritance_data, rendered), **comment_data(typedef)}
+            for name, typedef in idl.typedefs.items()
+        },
+        "enums": {
+            name: {
+                "values": [{"name": value.name, **comment_data(value)} for value in enum.values],
+                **comment_data(enum),
+            }
+            for name, enum in idl.enums.items()
+        },
+        "structs": structs,
+        "inheritance_data": {base: list(derived) for base, derived in idl.inheritance_data.items()},
+    }
 
-        return conversion.get(type_input, type_input)
 
-    if type_input["vector"]:
-        transformed_type = _transformer(type_input["type_name"], inheritance_data)
+def _transformer(
+    type_input: TypeNode | dict[str, Any] | str,
+    inheritance_data: None | Mapping[str, Sequence[str]] = None,
+    rendered: dict[TypeNode, str] | None = None,
+) -> str:
+    type_node = as_type(type_input)
 
-        if type_input["size"] is not None:
-            return f"std::array<{transformed_type}, {type_input['size']}>"
+    if rendered is None:
+        return _render_type(type_node, inheritance_data, rendered)
 
-        return f"std::vector<{transformed_type}>"
-    if type_input["map"]:
-        key_type = _transformer(type_input["type_name"]["key"], inheritance_data)
-        value_type = _transformer(type_input["type_name"]["value"], inheritance_data)
-        return f"std::unordered_map<{key_type}, {value_type}>"
-    if type_input["union"]:
-        contained_types = [_transformer(contained, inheritance_data) for contained in type_input["type_name"]]
-        transformed_type = ",".join(contained_types)
-        return f"std::variant<{transformed_type}>"
+    type_str = rendered.get(type_node)
+    if type_str is None:
+        type_str = rendered[type_node] = _render_type(type_node, inheritance_data, rendered)
 
-    msg = f"Unknown type: {type_input}"
-    raise ValueError(msg)
+    return type_str
 
 
-def _flatten_struct_inheritance(parsed_idl: ParsedIDL) -> ParsedIDL:
-    inheritance_data = parsed_idl["inheritance_data"]
+def _render_type(
+    type_node: TypeNode,
+    inheritance_data: None | Mapping[str, Sequence[str]],
+    rendered: dict[TypeNode, str] | None,
+) -> str:
+    if isinstance(type_node, NamedType):
+        conversion = {"string": "std::string", "ByteString": "std::string"}
 
-    sorted_inheritance_data = _sort_inheritance_data(inheritance_data)
+        if inheritance_data and type_node.name in inheritance_data:
+            return f"{type_node.name}_t"
 
-    for base_type, derived_types in sorted_inheritance_data:
-        base_struct = parsed_idl["structs"][base_type]
-        for derived_type in derived_types:
-            derived_struct = parsed_idl["structs"][derived_type]
+        return conversion.get(type_node.name, type_node.name)
 
-            derived_struct["members"].update(copy.deepcopy(base_struct["members"]))
+    if isinstance(type_node, SequenceType):
+        transformed_type = _transformer(type_node.element, inheritance_data, rendered)
 
-    return parsed_idl
+        if type_node.size is not None:
+            return f"std::array<{transformed_type}, {type_node.size}>"
 
+        return f"std::vector<{transformed_type}>"
+    if isinstance(type_node, RecordType):
+        key_type = _transformer(type_node.key, inheritance_data, rendered)
+        value_type = _transformer(type_node.value, inheritance_data, rendered)
+        return f"std::unordered_map<{key_type}, {value_type}>"
 
-def _sort_inheritance_data(inheritance_data: dict[str, list[str]]) -> list[tuple[str, list[str]]]:
-    sorted_inheritance_data: list[tuple[str, list[str]]] = []
+    contained_types = [_transformer(contained, inheritance_data, rendered) for contained in type_node.members]
+    transformed_type = ",".join(contained_types)
+    return f"std::variant<{transformed_type}>"
 
-    for base_type, derived_types in inheritance_data.items():
-        inserted = False
-        for i, (sorted_base_type, _) in enumerate(sorted_inheritance_data):
-            if sorted_base_type in derived_types:
-                sorted_inheritance_data.insert(i, (base_type, derived_types))
-                inserted = True
-                break
-        if not inserted:
-            sorted_inheritance_data.append((base_type, derived_types))
 
-    return sorted_inheritance_data
+def _flatten_struct_inheritance(parsed_idl: ParsedIDL, inheritance_index: InheritanceIndex | None = None) -> ParsedIDL:
+    if inheritance_index is None:
+        inheritance_index = _inheritance_index(parsed_idl)
 
+    structs = parsed_idl["structs"]
 
-def _handle_rfl_tagged_union(parsed_idl: ParsedIDL) -> ParsedIDL:
-    new_inheritance_data = {}
-    for key in parsed_idl["inheritance_data"]:
-        new_inheritance_data[f"{key}_t"] = parsed_idl["inheritance_data"][key]
+    # bases come first in the topological order, so their members are already flattened
+    for derived_type in inheritance_index.order:
+        base_type = inheritance_index.bases.get(derived_type)
+        if base_type is None:
+            continue
 
-        # check if the values of the current key are also in the inheritance data and add their value to the new inheritance data as well
-        types_to_add = []
-        for value in parsed_idl["inheritance_data"][key]:
-            if value in parsed_idl["inheritance_data"]:
-                types_to_add.extend(parsed_idl["inheritance_data"][value])
-        new_inheritance_data[f"{key}_t"].extend(types_to_add)
+        structs[derived_type]["members"].update(
+            {member_name: dict(member_data) for member_name, member_data in structs[base_type]["members"].items()}
+        )
 
-        new_inheritance_data[f"{key}_t"].insert(0, key)
-    parsed_idl["inheritance_data"] = new_inheritance_data
     return parsed_idl
 
 
+def _handle_rfl_tagged_union(parsed_idl: ParsedIDL, inheritance_index: InheritanceIndex | None = None) -> ParsedIDL:
+    if inheritance_index is None:
+        inheritance_index = _inheritance_index(parsed_idl)
+
+    parsed_idl["inheritance_data"] = {
+        f"{base_type}_t": [base_type, *inheritance_index.descendants.get(base_type, ())]
+        for base_type in parsed_idl["inheritance_data"]
+    }
+    return parsed_idl
+
+
+def _inheritance_index(parsed_idl: ParsedIDL) -> InheritanceIndex:
+    return InheritanceIndex.from_bases(
+        {struct_name: struct_data["inheritance"] for struct_name, struct_data in parsed_idl["structs"].items()}
+    )
+
+
 def _render_doxystring(doc_string: Docstring) -> str:
     doxy_string = "///\n"
 
@@ -9,8 +9,7 @@ import os
 from pathlib import Path
 from typing import Any
 
-import jinja2
-
+from poly_scribe_code_gen._templates import get_template
 from poly_scribe_code_gen._types import AdditionalData
 
 
@@ -23,21 +22,7 @@ def generate_matlab(parsed_idl: dict[str, Any], additional_data: AdditionalData,
 
     parsed_idl = _transform_types(parsed_idl)
 
-    package_dir = os.path.abspath(os.path.dirname(__file__))
-    templates_dir = os.path.join(package_dir, "templates")
-
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(templates_dir),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        autoescape=jinja2.select_autoescape(
-            disabled_extensions=("hpp.jinja",),
-            default_for_string=True,
-            default=False,
-        ),
-    )
-
-    j2_template = env.get_template("matlab.jinja")
+    j2_template = get_template("matlab.jinja")
 
     for struct in parsed_idl["structs"]:
         if struct["name"] in parsed_idl["inheritance_data"]:
@@ -51,7 +36,7 @@ def generate_matlab(parsed_idl: dict[str, Any], additional_data: AdditionalData,
         with open(out_path / f"{name}.m", "w") as f:
             f.write(res)
 
-    j2_template = env.get_template("matlab_enum.jinja")
+    j2_template = get_template("matlab_enum.jinja")
 
     for enum in parsed_idl["enums"]:
         data = {**additional_data, **enum}
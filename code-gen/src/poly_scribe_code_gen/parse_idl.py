@@ -13,17 +13,38 @@ It also handles polymorphism and adds comments to the parsed data.
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING, Any
-
-from docstring_parser import Docstring
-from docstring_parser import parse as parse_docstring
-from pywebidl2 import parse, validate
-
-from poly_scribe_code_gen._types import ParsedIDL, cpp_types
+from dataclasses import asdict, replace
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from poly_scribe_code_gen import _cache, _fast_parser
+from poly_scribe_code_gen._ir import (
+    IDL,
+    Enumeration,
+    EnumValue,
+    ExtAttr,
+    Member,
+    NamedType,
+    RecordType,
+    SequenceType,
+    Struct,
+    SymbolTable,
+    Typedef,
+    TypeNode,
+    UnionType,
+    ext_attr_from_dict,
+    intern_type,
+    to_parsed_idl,
+    to_parsed_type,
+)
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
     from pathlib import Path
 
+    from docstring_parser import Docstring
+
+    from poly_scribe_code_gen._types import ParsedIDL
+
 type_transformer = {
     "boolean": "bool",
     "byte": "char",
@@ -31,8 +52,46 @@ type_transformer = {
 }
 """Mapping of WebIDL types to internal representations."""
 
+_PARSE_CACHE_FORMAT = "ir-6"
 
-def parse_idl(idl_file: Path) -> ParsedIDL:
+_BLOCK_COMMENT_INDICATORS = ("///", "//!", "/**", "/*!")
+_INLINE_COMMENT_INDICATORS = ("///<", "//!<", "/**<", "/*!<")
+
+_IDENTIFIER_PATTERN = r"[A-Za-z_][0-9A-Za-z_-]*"
+
+_COMMENT_SCAN_REGEX = re.compile(
+    r"""
+    [^/"{}]*
+    (?:
+        (?P<comment>//[^\n]*|/\*.*?\*/)
+        |"[^"]*"
+        |(?P<open>\{)
+        |(?P<close>\})
+        |/
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+"""Scans the comments, strings and braces of an IDL, skipping everything in between."""
+
+_DEFINITION_REGEX = re.compile(rf"(?<![\w-])(?:dictionary|enum)\s+(?P<name>{_IDENTIFIER_PATTERN})")
+
+_DECLARATION_REGEX = re.compile(
+    rf"""
+    [^\S\n]*\n?[^\S\n]*(?=\S)
+    (?:
+        (?:dictionary|enum)\s+(?P<definition>{_IDENTIFIER_PATTERN})
+        |(?:\[[^\]]*\]\s*)?typedef\s(?:\[[^\]]*\]|[^;\[\]])*?(?P<typedef>{_IDENTIFIER_PATTERN})\s*;
+        |"(?P<value>[^"]*)"
+        |(?:\[[^\]]*\]|[^;=\[\]{{}}/])*?(?<![\w-])(?P<member>{_IDENTIFIER_PATTERN})\s*[=;]
+    )
+    """,
+    re.VERBOSE,
+)
+"""Matches the declaration of a dictionary, enum, typedef, enum value or dictionary member."""
+
+
+def parse_idl(idl_file: Path, *, cache_dir: Path | None = None, fast_parser: bool = False) -> ParsedIDL:
     """Parse the given WebIDL file.
 
     This function reads a WebIDL file, validates its content, and extracts
@@ -40,169 +99,348 @@ def parse_idl(idl_file: Path) -> ParsedIDL:
     and adds comments to the parsed data.
     It returns a dictionary containing the parsed IDL data.
 
+    If a cache directory is given, the parsed data is stored there, keyed by the content of the
+    WebIDL file and the generator version.
+    Parsing the same content again will then load the result from the cache instead.
+
+    With `fast_parser`, a parser specialised on the WebIDL subset supported by poly-scribe is used.
+    It produces the same result as the general pywebidl2 parser, which is still used for any input
+    the specialised parser does not understand, e.g. to report syntax errors.
+
     Args:
         idl_file: Path to the WebIDL file to parse.
+        cache_dir: Optional directory for caching the parsed data.
+        fast_parser: Use the specialised parser for the poly-scribe WebIDL subset.
 
     Returns:
         A dictionary containing parsed IDL data, including typedefs, enums, structs, and inheritance data.
     """
 
-    with open(idl_file) as f:
-        idl = f.read()
+    return to_parsed_idl(parse_idl_ir(idl_file, cache_dir=cache_dir, fast_parser=fast_parser))
 
-    return _validate_and_parse(idl)
 
+def parse_idl_ir(idl_file: Path, *, cache_dir: Path | None = None, fast_parser: bool = False) -> IDL:
+    """Parse the given WebIDL file into the typed intermediate representation.
 
-def _validate_and_parse(idl: str) -> ParsedIDL:
-    if not idl:
-        return {"typedefs": {}, "enums": {}, "structs": {}, "inheritance_data": {}}
+    This works like [`parse_idl`][poly_scribe_code_gen.parse_idl.parse_idl], but returns the data as
+    slotted dataclasses instead of nested dictionaries.
+    The generators accept this representation directly.
 
-    errors = validate(idl)
+    Args:
+        idl_file: Path to the WebIDL file to parse.
+        cache_dir: Optional directory for caching the parsed data.
+        fast_parser: Use the specialised parser for the poly-scribe WebIDL subset.
 
-    if errors:
-        msg = "WebIDL validation errors:\n{}".format("\n".join(errors.__repr__()))
-        raise RuntimeError(msg)
+    Returns:
+        The parsed IDL data, including typedefs, enums, structs, and inheritance data.
+    """
+    return parse_idl_files([idl_file], cache_dir=cache_dir, fast_parser=fast_parser)
 
-    parsed_idl_raw = parse(idl)
 
-    typedefs, enums, dictionaries = _flatten(parsed_idl_raw)
+def parse_idl_files(idl_files: Iterable[Path], *, cache_dir: Path | None = None, fast_parser: bool = False) -> IDL:
+    """Parse a set of WebIDL files that may reference definitions in each other.
+
+    Every file is parsed, and cached, on its own by [`parse_idl_units`][poly_scribe_code_gen.parse_idl.parse_idl_units].
+    The results are then linked into a single IDL by [`link_units`][poly_scribe_code_gen.parse_idl.link_units].
+
+    Args:
+        idl_files: Paths to the WebIDL files to parse.
+        cache_dir: Optional directory for caching the parsed data of each file.
+        fast_parser: Use the specialised parser for the poly-scribe WebIDL subset.
 
-    parsed_idl: ParsedIDL = {"typedefs": {}, "enums": {}, "structs": {}, "inheritance_data": {}}
+    Returns:
+        The parsed IDL data of all files.
+    """
+    return link_units(parse_idl_units(idl_files, cache_dir=cache_dir, fast_parser=fast_parser))
 
-    for name, definition in typedefs.items():
-        parsed_idl["typedefs"][name] = {
-            "type": _flatten_type(definition["idl_type"], parent_ext_attrs=definition["ext_attrs"])
-        }
 
-    for name, definition in enums.items():
-        parsed_idl["enums"][name] = {"values": _flatten_enums(definition)}
+def parse_idl_units(
+    idl_files: Iterable[Path], *, cache_dir: Path | None = None, fast_parser: bool = False
+) -> dict[Path, IDL]:
+    """Parse each of the given WebIDL files on its own.
 
-    for name, definition in dictionaries.items():
-        parsed_idl["structs"][name] = _flatten_dictionaries(definition)
+    The content of a file is parsed without resolving the types it references, so a file only has to be
+    parsed again if its own content changes.
+    If a cache directory is given, the result for each file is stored there, keyed by the content of the file
+    and the generator version.
 
-    _type_check(parsed_idl, cpp_types)
+    Args:
+        idl_files: Paths to the WebIDL files to parse.
+        cache_dir: Optional directory for caching the parsed data of each file.
+        fast_parser: Use the specialised parser for the poly-scribe WebIDL subset.
 
-    parsed_idl = _handle_polymorphism(parsed_idl)
+    Returns:
+        The unlinked IDL data of each file, in the order the files were given.
+    """
+    units: dict[Path, IDL] = {}
 
-    return _add_comments(idl, parsed_idl)
+    for idl_file in idl_files:
+        with open(idl_file) as f:
+            idl = f.read()
+
+        if cache_dir is None:
+            units[idl_file] = _parse_unit(idl, fast_parser=fast_parser)
+            continue
+
+        parse_cache_dir = cache_dir / "parse"
+        key = _cache.cache_key(_PARSE_CACHE_FORMAT, idl)
+
+        unit = _cache.load(parse_cache_dir, key)
+        if unit is None:
+            unit = _parse_unit(idl, fast_parser=fast_parser)
+            _cache.store(parse_cache_dir, key, unit)
+
+        units[idl_file] = unit
+
+    return units
+
+
+def link_units(units: Mapping[Path, IDL]) -> IDL:
+    """Link separately parsed WebIDL files into a single IDL.
+
+    The definitions of all files are merged, the types of the merged definitions are checked
+    and the inheritance data is derived.
+
+    Args:
+        units: The unlinked IDL data of each file, e.g. from [`parse_idl_units`][poly_scribe_code_gen.parse_idl.parse_idl_units].
+
+    Returns:
+        The linked IDL data.
+
+    Raises:
+        RuntimeError: If a name is defined in more than one file, a type is not valid or the inheritance is cyclic.
+    """
+    return _link(units)
+
+
+def _validate_and_parse(idl: str, *, fast_parser: bool = False) -> ParsedIDL:
+    return to_parsed_idl(_validate_and_parse_ir(idl, fast_parser=fast_parser))
+
+
+def _validate_and_parse_ir(idl: str, *, fast_parser: bool = False) -> IDL:
+    return _link({"<idl>": _parse_unit(idl, fast_parser=fast_parser)})
+
+
+def _link(units: Mapping[Any, IDL]) -> IDL:
+    if len(units) == 1:
+        (parsed_idl,) = units.values()
+    else:
+        parsed_idl = _merge_units(units)
+
+    _type_check(parsed_idl)
+
+    return _handle_polymorphism(parsed_idl)
+
+
+def _merge_units(units: Mapping[Any, IDL]) -> IDL:
+    typedefs: dict[str, Typedef] = {}
+    enums: dict[str, Enumeration] = {}
+    structs: dict[str, Struct] = {}
+    defined_in: dict[str, Any] = {}
+
+    for source, unit in units.items():
+        for name in (*unit.typedefs, *unit.enums, *unit.structs):
+            if name in defined_in:
+                msg = f"'{name}' in '{source}' is already defined in '{defined_in[name]}'."
+                raise RuntimeError(msg)
+            defined_in[name] = source
+
+        typedefs.update(unit.typedefs)
+        enums.update(unit.enums)
+        structs.update(unit.structs)
+
+    return IDL(typedefs=typedefs, enums=enums, structs=structs)
 
 
-def _type_check(parsed_idl: ParsedIDL, types_cpp: list[str]) -> None:
-    struct_names = list(parsed_idl["structs"].keys())
-    enum_names = list(parsed_idl["enums"].keys())
-    typedef_names = list(parsed_idl["typedefs"].keys())
+def _parse_unit(idl: str, *, fast_parser: bool = False) -> IDL:
+    if not idl:
+        return IDL()
+
+    parsed_idl_raw = _parse_webidl(idl, fast_parser=fast_parser)
+
+    typedefs, enums, dictionaries = _flatten(parsed_idl_raw)
 
-    for typedef_name, typedef_data in parsed_idl["typedefs"].items():
-        type_data = typedef_data["type"]
-        _type_check_impl(type_data, typedef_name, types_cpp, enum_names, struct_names, typedef_names)
+    # structurally identical types share a single node
+    interned: dict[TypeNode, TypeNode] = {}
 
-    for struct_name, struct_data in parsed_idl["structs"].items():
-        for member_name, member_data in struct_data["members"].items():
-            _type_check_impl(
-                member_data["type"], f"{struct_name}.{member_name}", types_cpp, enum_names, struct_names, typedef_names
+    parsed_idl = IDL(
+        typedefs={
+            name: Typedef(
+                name,
+                _flatten_type(definition["idl_type"], parent_ext_attrs=definition["ext_attrs"], interned=interned),
             )
+            for name, definition in typedefs.items()
+        },
+        enums={name: Enumeration(name, _flatten_enums(definition)) for name, definition in enums.items()},
+        structs={
+            name: _flatten_dictionaries(definition, interned=interned) for name, definition in dictionaries.items()
+        },
+    )
 
+    return _add_comments(idl, parsed_idl)
 
-def _type_check_impl(
-    type_data: dict[str, Any],
-    def_name: str,
-    types_cpp: list[str],
-    enumerations: list[str],
-    structs: list[str],
-    type_defs: list[str],
-) -> None:
-    def _check_type(type_name: str, context: str) -> None:
-        if (
-            type_name not in types_cpp
-            and type_name not in enumerations
-            and type_name not in structs
-            and type_name not in type_defs
-        ):
-            msg = f"Member type '{type_name}' in {context} is not valid."
-            raise RuntimeError(msg)
 
-    if isinstance(type_data, str):
-        _check_type(type_data, f"'{def_name}'")
-        return
+def _parse_webidl(idl: str, *, fast_parser: bool = False) -> dict[str, Any]:
+    if fast_parser:
+        try:
+            return _fast_parser.parse(idl)
+        except _fast_parser.UnsupportedSyntaxError:
+            pass
+
+    result = _parse_webidl_single_pass(idl)
+
+    if result is None:
+        import pywebidl2  # noqa: PLC0415
+
+        _raise_on_errors(pywebidl2.validate(idl))
+        return pywebidl2.parse(idl)
+
+    return result
+
+
+def _parse_webidl_single_pass(idl: str) -> dict[str, Any] | None:
+    # pywebidl2 runs the full ANTLR parse once in `validate` and once more in `parse`.
+    # Parsing with the error collecting strategy gives us both the diagnostics and the tree in one pass.
+    # This relies on pywebidl2 internals, so we return None to fall back to the public API if they change.
+    # pywebidl2 pulls in the ANTLR runtime, it is only imported when a file actually has to be parsed.
+    import pywebidl2  # noqa: PLC0415
+
+    parser = pywebidl2.WebIDLParser(idl)
+
+    antlr_parser = getattr(parser, "_parser", None)
+    error_listener = getattr(parser, "_error_listener", None)
+    if antlr_parser is None or error_listener is None or not hasattr(parser, "setup_parser_strategy"):
+        return None
+
+    parser.setup_parser_strategy("default")
+    tree = antlr_parser.webIDL()
+
+    _raise_on_errors(error_listener.errors)
+
+    return asdict(pywebidl2.WebIDLVisitor(tree).run())
+
+
+def _raise_on_errors(errors: list[Any]) -> None:
+    if errors:
+        msg = "WebIDL validation errors:\n{}".format("\n".join(repr(error) for error in errors))
+        raise RuntimeError(msg)
+
+
+def _type_check(parsed_idl: IDL) -> None:
+    for typedef in parsed_idl.typedefs.values():
+        _type_check_impl(typedef.type, typedef.name, parsed_idl.symbols)
+
+    for struct in parsed_idl.structs.values():
+        for member in struct.members:
+            _type_check_impl(member.type, f"{struct.name}.{member.name}", parsed_idl.symbols)
+
+
+def _type_check_impl(type_data: TypeNode, def_name: str, symbols: SymbolTable) -> None:
+    def _check_type(type_node: TypeNode, context: str) -> None:
+        if isinstance(type_node, NamedType) and type_node.name in symbols:
+            return
+
+        msg = f"Member type '{to_parsed_type(type_node)}' in {context} is not valid."
+        raise RuntimeError(msg)
 
-    if type_data["union"]:
-        for contained_type in type_data["type_name"]:
+    if isinstance(type_data, UnionType):
+        for contained_type in type_data.members:
             _check_type(contained_type, f"union '{def_name}'")
-    elif type_data["vector"]:
-        _check_type(type_data["type_name"], f"vector '{def_name}'")
-    elif type_data["map"]:
-        _check_type(type_data["type_name"]["value"], f"map '{def_name}'")
+    elif isinstance(type_data, SequenceType):
+        _check_type(type_data.element, f"vector '{def_name}'")
+    elif isinstance(type_data, RecordType):
+        _check_type(type_data.value, f"map '{def_name}'")
     else:
-        _check_type(type_data["type_name"], f"'{def_name}'")
+        _check_type(type_data, f"'{def_name}'")
+
+
+_CommentedNode = TypeVar("_CommentedNode", Struct, Member, Enumeration, EnumValue, Typedef)
 
 
-def _add_comments(idl: str, parsed_idl: ParsedIDL) -> ParsedIDL:
+def _add_comments(idl: str, parsed_idl: IDL) -> IDL:
     comment_data = _find_comments(idl)
+    block_comments = comment_data["block_comments"]
+    inline_comments = comment_data["inline_comments"]
 
-    def _get_comment(comments_dict: dict, expected_key: tuple) -> str | None:
-        return comments_dict.get(expected_key)
+    def _with_comments(node: _CommentedNode, key: tuple[str, ...]) -> _CommentedNode:
+        block_comment = block_comments.get(key)
+        inline_comment = inline_comments.get(key)
 
-    for struct_name, struct_data in parsed_idl["structs"].items():
-        struct_key = (struct_name,)
+        if not block_comment and not inline_comment:
+            return node
 
-        # check if struct_name is in the key of any of the block comments
-        block_comment = _get_comment(comment_data["block_comments"], struct_key)
-        if block_comment:
-            struct_data["block_comment"] = _parse_comments(block_comment)
+        return replace(
+            node,
+            block_comment=LazyDocstring(block_comment) if block_comment else None,
+            inline_comment=LazyDocstring(inline_comment) if inline_comment else None,
+        )
 
-        inline_comment = _get_comment(comment_data["inline_comments"], struct_key)
-        if inline_comment:
-            struct_data["inline_comment"] = _parse_comments(inline_comment)
+    structs = {
+        name: _with_comments(
+            replace(struct, members=tuple(_with_comments(member, (name, member.name)) for member in struct.members)),
+            (name,),
+        )
+        for name, struct in parsed_idl.structs.items()
+    }
 
-        for member_name, member_data in struct_data["members"].items():
-            member_key = (struct_name, member_name)
+    enums = {
+        name: _with_comments(
+            replace(enum, values=tuple(_with_comments(value, (name, value.name)) for value in enum.values)),
+            (name,),
+        )
+        for name, enum in parsed_idl.enums.items()
+    }
 
-            # check if member_name is in the key of any of the block comments
-            block_comment = _get_comment(comment_data["block_comments"], member_key)
-            if block_comment:
-                member_data["block_comment"] = _parse_comments(block_comment)
+    typedefs = {name: _with_comments(typedef, (name,)) for name, typedef in parsed_idl.typedefs.items()}
 
-            inline_comment = _get_comment(comment_data["inline_comments"], member_key)
-            if inline_comment:
-                member_data["inline_comment"] = _parse_comments(inline_comment)
+    return replace(parsed_idl, typedefs=typedefs, enums=enums, structs=structs)
+
+
+class LazyDocstring:
+    """Doc comment of a declaration, which is only parsed into a `Docstring` when it is used.
+
+    Attribute access is forwarded to the parsed `Docstring`, so this can be used in its place.
+    Parsing happens on the first access and the result is kept for later ones.
+    """
 
-    for enum_name, enum_data in parsed_idl["enums"].items():
-        enum_key = (enum_name,)
-        # check if enum_name is in the key of any of the block comments
-        block_comment = _get_comment(comment_data["block_comments"], enum_key)
-        if block_comment:
-            enum_data["block_comment"] = _parse_comments(block_comment)
+    __slots__ = ("_docstring", "raw")
 
-        inline_comment = _get_comment(comment_data["inline_comments"], enum_key)
-        if inline_comment:
-            enum_data["inline_comment"] = _parse_comments(inline_comment)
+    def __init__(self, raw: str) -> None:
+        """Initialize the comment from its raw text.
 
-        for enum_value in enum_data["values"]:
-            # check if enum_value is in the key of any of the block comments
-            enum_value_key = (enum_name, enum_value["name"])
-            block_comment = _get_comment(comment_data["block_comments"], enum_value_key)
-            if block_comment:
-                enum_value["block_comment"] = _parse_comments(block_comment)
+        Args:
+            raw: Text of the comment, including the comment indicators.
+        """
+        self.raw = raw
+        self._docstring: Docstring | None = None
 
-            inline_comment = _get_comment(comment_data["inline_comments"], enum_value_key)
-            if inline_comment:
-                enum_value["inline_comment"] = _parse_comments(inline_comment)
+    @property
+    def docstring(self) -> Docstring:
+        """The parsed docstring."""
+        if self._docstring is None:
+            self._docstring = _parse_comments(self.raw)
+        return self._docstring
 
-    for typedef_name, typedef_data in parsed_idl["typedefs"].items():
-        typedef_key = (typedef_name,)
-        # check if typedef_name is in the key of any of the block comments
-        block_comment = _get_comment(comment_data["block_comments"], typedef_key)
-        if block_comment:
-            typedef_data["block_comment"] = _parse_comments(block_comment)
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.docstring, name)
 
-        inline_comment = _get_comment(comment_data["inline_comments"], typedef_key)
-        if inline_comment:
-            typedef_data["inline_comment"] = _parse_comments(inline_comment)
+    def __reduce__(self) -> tuple[type[LazyDocstring], tuple[str]]:
+        # only the raw text is stored, e.g. in the parse cache
+        return (LazyDocstring, (self.raw,))
 
-    return parsed_idl
+    def __copy__(self) -> LazyDocstring:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> LazyDocstring:
+        # the parsed docstring is never modified, so copies can share it
+        return self
 
 
 def _parse_comments(comment: str) -> Docstring:
+    from docstring_parser import parse as parse_docstring  # noqa: PLC0415
+
     # strip leading whitespace in each line of the comment.
     # also strip the leading comment characters.
     comment = re.sub(r"^\s*(?:[/*][/!\*<]*) ?", "", comment, flags=re.MULTILINE)
@@ -212,8 +450,10 @@ def _parse_comments(comment: str) -> Docstring:
     return parse_docstring(comment.strip())
 
 
-def _flatten_members(members: list[dict[str, Any]]) -> dict[str, Any]:
-    output = {}
+def _flatten_members(
+    members: list[dict[str, Any]], *, interned: dict[TypeNode, TypeNode] | None = None
+) -> tuple[Member, ...]:
+    output = []
     for member in members:
         if member["type"] == "field":
             # check if the member ext_attrs with the name "Default" exists
@@ -236,113 +476,93 @@ def _flatten_members(members: list[dict[str, Any]]) -> dict[str, Any]:
             else:
                 default_value = None
 
-            output[member["name"]] = {
-                "type": _flatten_type(member["idl_type"], parent_ext_attrs=member["ext_attrs"]),  # type: ignore
-                "required": bool(member["required"]),
-                "default": default_value,
-                "default_type": default_type,
-            }
+            output.append(
+                Member(
+                    member["name"],
+                    _flatten_type(member["idl_type"], parent_ext_attrs=member["ext_attrs"], interned=interned),
+                    required=bool(member["required"]),
+                    default=default_value,
+                    default_type=default_type,
+                )
+            )
         else:
             msg = f"Unsupported WebIDL type '{member['type']}'."
             raise RuntimeError(msg)
 
-    return output
+    return tuple(output)
 
 
 def _flatten_type(
-    input_type: dict[str, Any], *, parent_ext_attrs: list[dict[str, Any]] | None = None
-) -> dict[str, Any]:
+    input_type: dict[str, Any],
+    *,
+    parent_ext_attrs: list[dict[str, Any]] | None = None,
+    interned: dict[TypeNode, TypeNode] | None = None,
+) -> TypeNode:
     if parent_ext_attrs is None:
         parent_ext_attrs = []
-    output = {}
-    size = None
+    if interned is None:
+        interned = {}
     if not input_type["generic"] and not input_type["union"]:
-        output = type_transformer.get(input_type["idl_type"], input_type["idl_type"])
-    elif not input_type["generic"] and input_type["union"]:
-        output = {
-            "type_name": [_flatten_type(x) for x in input_type["idl_type"]],
-            "vector": False,
-            "union": True,
-            "map": False,
-            "ext_attrs": input_type["ext_attrs"],
-            "size": size,
-        }
-    elif input_type["generic"] and not input_type["union"]:
+        return intern_type(NamedType(type_transformer.get(input_type["idl_type"], input_type["idl_type"])), interned)
+
+    if not input_type["generic"] and input_type["union"]:
+        return intern_type(
+            UnionType(
+                tuple(_flatten_type(x, interned=interned) for x in input_type["idl_type"]),
+                _flatten_ext_attrs(input_type["ext_attrs"]),
+            ),
+            interned,
+        )
+
+    if input_type["generic"] and not input_type["union"]:
         if input_type["generic"] == "ObservableArray" or input_type["generic"] == "sequence":
-            ext_attrs = parent_ext_attrs + input_type["ext_attrs"]
-            if any(attr["name"] == "Size" for attr in ext_attrs):
-                size_ext_attr = next(attr for attr in ext_attrs if attr["name"] == "Size")
+            size = None
+            ext_attrs = input_type["ext_attrs"]
+            parent_and_own_ext_attrs = parent_ext_attrs + ext_attrs
+            if any(attr["name"] == "Size" for attr in parent_and_own_ext_attrs):
+                size_ext_attr = next(attr for attr in parent_and_own_ext_attrs if attr["name"] == "Size")
                 if size_ext_attr["rhs"]["type"] != "integer":
                     msg = "Size attribute must be of type integer."
                     raise RuntimeError(msg)
                 size = int(size_ext_attr["rhs"]["value"])
 
-                input_type["ext_attrs"] = [attr for attr in ext_attrs if attr["name"] != "Size"]
+                ext_attrs = [attr for attr in parent_and_own_ext_attrs if attr["name"] != "Size"]
 
             if len(input_type["idl_type"]) != 1:
                 msg = "Sequence must have one element."
                 raise RuntimeError(msg)
 
-            output = {
-                "type_name": _flatten_type(input_type["idl_type"][0]),
-                "vector": True,
-                "union": False,
-                "map": False,
-                "ext_attrs": input_type["ext_attrs"],
-                "size": size,
-            }
+            return intern_type(
+                SequenceType(
+                    _flatten_type(input_type["idl_type"][0], interned=interned), size, _flatten_ext_attrs(ext_attrs)
+                ),
+                interned,
+            )
+
         if input_type["generic"] == "record":
             if len(input_type["idl_type"]) != 2:  # noqa: PLR2004
                 msg = "Record must have two elements."
                 raise RuntimeError(msg)
 
-            output = {
-                "type_name": {
-                    "key": _flatten_type(input_type["idl_type"][0]),
-                    "value": _flatten_type(input_type["idl_type"][1]),
-                },
-                "vector": False,
-                "union": False,
-                "map": True,
-                "ext_attrs": input_type["ext_attrs"],
-                "size": size,
-            }
-    else:
-        msg = "Unrecognised WebIDL type structure."
-        raise RuntimeError(msg)
-
-    return output
-
-
-def _handle_polymorphism(input_idl: ParsedIDL) -> ParsedIDL:
-    def replace_type(type_data: dict[str, Any] | str, derived_type: str, base: str) -> dict[str, Any] | str:
-        if isinstance(type_data, str):
-            return base if type_data == derived_type else type_data
-
-        if type_data.get("type_name") == derived_type:
-            type_data["type_name"] = base
-        elif isinstance(type_data.get("type_name"), list):
-            type_data["type_name"] = [replace_type(t, derived_type, base) for t in type_data["type_name"]]
-        elif isinstance(type_data.get("type_name"), dict):
-            type_data["type_name"]["key"] = replace_type(type_data["type_name"]["key"], derived_type, base)
-            type_data["type_name"]["value"] = replace_type(type_data["type_name"]["value"], derived_type, base)
-
-        return type_data
-
-    structures = input_idl["structs"]
+            return intern_type(
+                RecordType(
+                    _flatten_type(input_type["idl_type"][0], interned=interned),
+                    _flatten_type(input_type["idl_type"][1], interned=interned),
+                    _flatten_ext_attrs(input_type["ext_attrs"]),
+                ),
+                interned,
+            )
 
-    inheritance_data: dict[str, list[str]] = {}
+    msg = "Unrecognised WebIDL type structure."
+    raise RuntimeError(msg)
 
-    for name, data in structures.items():
-        if inherits_from := data["inheritance"]:
-            if inherits_from not in inheritance_data:
-                inheritance_data[inherits_from] = []
 
-            inheritance_data[inherits_from].append(name)
+def _flatten_ext_attrs(ext_attrs: list[dict[str, Any]]) -> tuple[ExtAttr, ...]:
+    return tuple(ext_attr_from_dict(ext_attr) for ext_attr in ext_attrs)
 
-    input_idl["inheritance_data"] = inheritance_data
 
-    return input_idl
+def _handle_polymorphism(input_idl: IDL) -> IDL:
+    return replace(input_idl, inheritance_data=input_idl.inheritance_index.children)
 
 
 def _flatten(input_idl: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
@@ -365,23 +585,20 @@ def _flatten(input_idl: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any],
     return typedefs, enums, dictionaries
 
 
-def _flatten_enums(definition: dict[str, Any]) -> list[dict[str, Any]]:
+def _flatten_enums(definition: dict[str, Any]) -> tuple[EnumValue, ...]:
     enum_values = []
     for val in definition["values"]:
         if val["type"] == "enum-value":
-            enum_values.append({"name": val["value"]})
+            enum_values.append(EnumValue(val["value"]))
         else:
             msg = f"Unsupported WebIDL type '{val['type']}' in enum."
             raise RuntimeError(msg)
 
-    return enum_values
+    return tuple(enum_values)
 
 
-def _flatten_dictionaries(definition: dict[str, Any]) -> dict[str, Any]:
-    dictionary_definition = {}
-    dictionary_definition["members"] = _flatten_members(definition["members"])
-
-    dictionary_definition["inheritance"] = definition["inheritance"]
+def _flatten_dictionaries(definition: dict[str, Any], *, interned: dict[TypeNode, TypeNode] | None = None) -> Struct:
+    members = _flatten_members(definition["members"], interned=interned)
 
     if definition["partial"]:
         msg = "Partial dictionaries are not supported."
@@ -391,127 +608,73 @@ def _flatten_dictionaries(definition: dict[str, Any]) -> dict[str, Any]:
         msg = "Dictionary ext_attrs are not supported."
         raise RuntimeError(msg)
 
-    return dictionary_definition
+    return Struct(definition["name"], members, definition["inheritance"])
 
 
 def _find_comments(idl: str) -> dict[str, dict[tuple[str, ...], str]]:
-    block_comment_indicators = ["///", "//!"]
-    multi_line_block_comment_indicators = ["/**", "/*!"]
-    multi_line_block_comment_end_indicators = ["*/"]
-    inline_comment_indicators = ["///<", "//!<", "/**<", "/*!<"]
-
-    typedef_pattern = (
-        r"""\btypedef\s+(?:\[\s*[^\]]*\s*\]\s*)?(?:[\w]+(?:<[^<>]*?(?:<[^<>]*?>)?[^<>]*?>)?)\s+([a-zA-Z_]\w*)\s*;"""
-    )
-    dictionary_pattern = r"""\bdictionary\s+([a-zA-Z_]\w*)(?:\s*:\s*[a-zA-Z_]\w*)?\s*"""
-    member_pattern = r"""(?:\[\s*[^\]]*\s*\]\s*)?(?:required\s+)?(?:[\w]+(?:<[^<>]*?(?:<[^<>]*?>)?[^<>]*?>)?)\s+([a-zA-Z_]\w*)\s*(?:=|;)"""
-    enum_pattern = r"""\benum\s+([a-zA-Z_]\w*)"""
-    enum_value_pattern = r"""\"([^"]+)\""""
-
-    combined_pattern = f"{typedef_pattern}|{dictionary_pattern}|{member_pattern}|{enum_pattern}|{enum_value_pattern}"
-    identifier_regex = re.compile(combined_pattern)
-    dict_decl_regex = re.compile(dictionary_pattern)
-    enum_decl_regex = re.compile(enum_pattern)
-
-    block_comment_data = {}
-    inline_comment_data = {}
-    tmp_block_comment = ""
-    in_block_comment = False
-    in_multi_line_block_comment = False
-    multi_line_block_comment_end = False
-
-    # State tracking variables for blocks
-    scope_stack: list[str] = []  # Tracks nested block scope types, e.g., ["parent:MyDict"]
-    pending_dict = None  # Tracks a 'dictionary Foo' declaration prior to reaching '{'
-    pending_enum = None  # Tracks an 'enum Foo' declaration prior to reaching '{'
-
-    for idl_line in idl.splitlines():
-        idl_line_strip = idl_line.strip()
-
-        # --- Inline comment processing ---
-        if any(indicator in idl_line for indicator in inline_comment_indicators):
-            indicator_used = next(ind for ind in inline_comment_indicators if ind in idl_line)
-            split_line = idl_line.split(indicator_used, 1)
-            code_part = split_line[0].strip()
-            comment_part = split_line[1].strip()
-
-            key = identifier_regex.findall(code_part)
-            key_flat = [next(item for sublist in key for item in sublist if item)]
-
-            # Prepend current dictionary name if inside a dictionary scope
-            current_dict = next(
-                (s.split(":", 1)[1] for s in reversed(scope_stack) if s.startswith("parent:")),
-                None,
-            )
-            if current_dict and key_flat:
-                key_flat.insert(0, current_dict)
-
-            inline_comment_data[tuple(key_flat)] = comment_part
-
-        # --- Comment block collection logic ---
-        if any(idl_line_strip.startswith(indicator) for indicator in block_comment_indicators):
-            tmp_block_comment += idl_line_strip + "\n"
-            in_block_comment = True
-        elif any(idl_line_strip.startswith(indicator) for indicator in multi_line_block_comment_indicators):
-            tmp_block_comment += idl_line_strip + "\n"
-            in_multi_line_block_comment = True
-        elif (
-            any(idl_line_strip.startswith(indicator) for indicator in multi_line_block_comment_end_indicators)
-            and in_multi_line_block_comment
-        ):
-            tmp_block_comment += idl_line_strip + "\n"
-            multi_line_block_comment_end = True
-            in_multi_line_block_comment = False
-        elif in_multi_line_block_comment:
-            tmp_block_comment += idl_line_strip + "\n"
-        elif in_block_comment or multi_line_block_comment_end:
-            key = identifier_regex.findall(idl_line_strip)
-            if not key:
-                in_block_comment = False
-                in_multi_line_block_comment = False
-                multi_line_block_comment_end = False
-                tmp_block_comment = ""
-                continue  # Skip lines that don't contain identifiers
-            key_flat = [next(item for sublist in key for item in sublist if item)]
-
-            # Prepend current dictionary name if inside a dictionary scope
-            current_dict = next(
-                (s.split(":", 1)[1] for s in reversed(scope_stack) if s.startswith("parent:")),
-                None,
-            )
-            if current_dict and key_flat:
-                key_flat.insert(0, current_dict)
-
-            block_comment_data[tuple(key_flat)] = tmp_block_comment.strip()
-
-            in_block_comment = False
-            in_multi_line_block_comment = False
-            multi_line_block_comment_end = False
-            tmp_block_comment = ""
-
-        # --- Scope / Context Tracking ---
-        dict_match = dict_decl_regex.search(idl_line_strip)
-        enum_match = enum_decl_regex.search(idl_line_strip)
-        if dict_match:
-            pending_dict = dict_match.group(1)
-        elif enum_match:
-            pending_enum = enum_match.group(1)
-
-        # Count opening and closing braces to maintain scope stack
-        for char in idl_line_strip:
-            if char == "{":
-                if pending_dict:
-                    scope_stack.append(f"parent:{pending_dict}")
-                    pending_dict = None
-                elif pending_enum:
-                    scope_stack.append(f"parent:{pending_enum}")
-                    pending_enum = None
-                else:
-                    scope_stack.append("other")
-            elif char == "}":
-                if scope_stack:
-                    scope_stack.pop()
-                pending_dict = None
-                pending_enum = None
+    # A single scan over the comments, strings and braces of the IDL, which tracks the enclosing dictionary or enum.
+    # Block comments are attached to the declaration that directly follows them, at most one line below.
+    # Inline comments are attached to the first declaration on their line.
+    block_comment_data: dict[tuple[str, ...], str] = {}
+    inline_comment_data: dict[tuple[str, ...], str] = {}
+
+    depth = 0
+    scope: str | None = None  # name of the enclosing dictionary or enum
+    header_start = 0  # start of the code between the last top-level token and the next opening brace
+
+    pending_block: list[str] = []  # lines of consecutive block comments waiting for their declaration
+    pending_block_end = -1
+
+    def _declaration_key(match: re.Match[str]) -> tuple[str, ...] | None:
+        if name := match.group("definition") or match.group("typedef"):
+            return (name,)
+        if scope is None:
+            return None
+        return (scope, match.group("value") or match.group("member"))
+
+    for match in _COMMENT_SCAN_REGEX.finditer(idl):
+        kind = match.lastgroup
+
+        if kind == "open":
+            if depth == 0:
+                definition = _DEFINITION_REGEX.search(idl, header_start, match.start("open"))
+                scope = definition.group("name") if definition else None
+            depth += 1
+        elif kind == "close":
+            depth -= 1
+            if depth == 0:
+                scope = None
+        elif kind == "comment":
+            comment = match.group("comment")
+            start = match.start("comment")
+            line_start = idl.rfind("\n", 0, start) + 1
+
+            if comment.startswith(_INLINE_COMMENT_INDICATORS):
+                declaration = _DECLARATION_REGEX.search(idl, line_start, start)
+                if declaration and (key := _declaration_key(declaration)):
+                    inline_comment_data[key] = _comment_text(comment[4:])
+            elif comment.startswith(_BLOCK_COMMENT_INDICATORS) and not idl[line_start:start].strip():
+                gap = idl[pending_block_end:start]
+                if not pending_block or gap.count("\n") != 1 or gap.strip():
+                    pending_block = []
+                comment_lines = [comment_line.strip() for comment_line in comment.strip().splitlines()]
+                if comment_lines[-1] != "*/":
+                    # the terminator of a comment ending on a line with text, e.g. a one-line `/** text */`
+                    comment_lines[-1] = comment_lines[-1].removesuffix("*/").rstrip()
+                pending_block.extend(comment_lines)
+                pending_block_end = match.end()
+
+                declaration = _DECLARATION_REGEX.match(idl, pending_block_end)
+                if declaration and (key := _declaration_key(declaration)):
+                    block_comment_data[key] = "\n".join(pending_block)
+                    pending_block = []
+
+        if depth == 0:
+            header_start = match.end()
 
     return {"block_comments": block_comment_data, "inline_comments": inline_comment_data}
+
+
+def _comment_text(comment: str) -> str:
+    comment = comment.removesuffix("*/")
+    return "\n".join(comment_line.strip() for comment_line in comment.strip().splitlines())
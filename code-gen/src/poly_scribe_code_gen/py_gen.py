@@ -5,21 +5,52 @@
 """Generate Python code from parsed IDL data.
 
 This module provides functions to generate a Python package and Python files from parsed IDL data.
-It uses Jinja2 templates to render the code and formats it with black and isort.
+It uses Jinja2 templates to render the code and optionally formats it with black and isort.
 """
 
-from pathlib import Path
-from typing import Any
+from __future__ import annotations
 
-import black
-import isort
-import jinja2
-from docstring_parser import Docstring, DocstringStyle, compose
-
-from poly_scribe_code_gen._types import AdditionalData, ParsedIDL
+import contextlib
+import re
+from itertools import repeat
+from typing import TYPE_CHECKING, Any
 
+from docstring_parser import Docstring, DocstringStyle, compose
 
-def generate_python_package(parsed_idl: ParsedIDL, additional_data: AdditionalData, out_dir: Path) -> None:
+from poly_scribe_code_gen._ir import (
+    IDL,
+    InheritanceIndex,
+    NamedType,
+    RecordType,
+    SequenceType,
+    SymbolKind,
+    TypeNode,
+    UnionType,
+    as_idl,
+    as_type,
+    comment_data,
+)
+from poly_scribe_code_gen._output import write_chunks_if_changed, write_if_changed
+from poly_scribe_code_gen._templates import get_template
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from collections.abc import Set as AbstractSet
+    from pathlib import Path
+
+    from poly_scribe_code_gen._types import AdditionalData, ParsedIDL
+
+
+def generate_python_package(
+    parsed_idl: ParsedIDL | IDL,
+    additional_data: AdditionalData,
+    out_dir: Path,
+    *,
+    format_code: bool = True,
+    split: bool = False,
+    jobs: int = 1,
+    codecs: bool = False,
+) -> list[Path]:
     """Generate a Python package from the parsed IDL data.
 
     The package will be created in the specified output directory.
@@ -30,10 +61,26 @@ def generate_python_package(parsed_idl: ParsedIDL, additional_data: AdditionalDa
 
     For more details on the generated python file, see the documentation of [`generate_python`][poly_scribe_code_gen.py_gen.generate_python].
 
+    With `split`, the definitions are spread over one module per group of connected definitions,
+    see [`split_modules`][poly_scribe_code_gen.py_gen.split_modules].
+    The `__init__.py` provides the `load` and `save` functions and re-exports the definitions of all modules.
+    It imports a module only when one of its definitions is accessed first (PEP 562),
+    so only the models that are used, and the ones they depend on, are defined.
+    The modules are independent of each other, so with `jobs` greater than one,
+    they are rendered and formatted concurrently in a process pool.
+    Modules of previous runs that are no longer generated are not removed.
+
     Args:
-        parsed_idl: The parsed IDL data.
+        parsed_idl: The parsed IDL data, either as dictionaries or as the typed intermediate representation.
         additional_data: Additional data for the package.
         out_dir: The output directory for the package.
+        format_code: Format the generated Python code with black and isort.
+        split: Generate one module per group of connected definitions instead of a single `__init__.py`.
+        jobs: Maximum number of processes to render the modules of a split package in.
+        codecs: Generate decoders and encoders, see [`generate_python`][poly_scribe_code_gen.py_gen.generate_python].
+
+    Returns:
+        The generated files whose content changed.
 
     Raises:
         ValueError: If the output directory is not a directory or if the package name is not set.
@@ -52,24 +99,218 @@ def generate_python_package(parsed_idl: ParsedIDL, additional_data: AdditionalDa
     source_dir = out_dir / "src" / additional_data["package"]
     source_dir.mkdir(parents=True, exist_ok=True)
 
-    generate_python(parsed_idl, additional_data, source_dir / "__init__.py")
+    if split:
+        changed = _generate_split_package(
+            parsed_idl, additional_data, source_dir, format_code=format_code, jobs=jobs, codecs=codecs
+        )
+    else:
+        changed = generate_python(
+            parsed_idl, additional_data, source_dir / "__init__.py", format_code=format_code, codecs=codecs
+        )
 
     project_res = _render_pyproject_toml(additional_data)
 
     pyproject_toml = out_dir / "pyproject.toml"
 
-    with open(pyproject_toml, "w") as f:
-        f.write(project_res)
+    if write_if_changed(pyproject_toml, project_res):
+        changed.append(pyproject_toml)
+
+    return changed
+
+
+def split_modules(parsed_idl: ParsedIDL | IDL) -> dict[str, IDL]:
+    """Split the IDL data into independent modules of a Python package.
+
+    Definitions that reference each other, directly or through other definitions, end up in the same module.
+    This includes derived structs, which are part of the polymorphic type of their base struct.
+    No module references a definition of another module, so the modules can be generated separately.
+
+    Each module is named after its first definition in snake case, with a leading underscore.
+
+    Args:
+        parsed_idl: The parsed IDL data, either as dictionaries or as the typed intermediate representation.
+
+    Returns:
+        The definitions of each module by its file name, in the order of the definitions.
+    """
+    idl = as_idl(parsed_idl)
+
+    # union-find over the definitions, each group points to its first definition
+    groups: dict[str, str] = {name: name for name in (*idl.typedefs, *idl.enums, *idl.structs)}
+
+    def _find(name: str) -> str:
+        while groups[name] != name:
+            groups[name] = groups[groups[name]]
+            name = groups[name]
+        return name
+
+    def _connect(name: str, other: str) -> None:
+        if other not in groups:
+            return
+        group, other_group = sorted((_find(name), _find(other)), key=order.__getitem__)
+        groups[other_group] = group
+
+    order = {name: index for index, name in enumerate(groups)}
+    visited: dict[TypeNode, set[str]] = {}
+
+    for name, typedef in idl.typedefs.items():
+        for referenced in _referenced_names(typedef.type, visited):
+            _connect(name, referenced)
+
+    for name, struct in idl.structs.items():
+        if struct.inheritance:
+            _connect(name, struct.inheritance)
+        for member in struct.members:
+            for referenced in _referenced_names(member.type, visited):
+                _connect(name, referenced)
+            if member.default_type:
+                _connect(name, member.default_type)
+
+    members: dict[str, set[str]] = {}
+    for name in groups:
+        members.setdefault(_find(name), set()).add(name)
+
+    modules: dict[str, IDL] = {}
+    for group, names in members.items():
+        module_name = f"_{_snake_case(group)}"
+        module_file = f"{module_name}.py"
+        index = 1
+        while module_file in modules:
+            index += 1
+            module_file = f"{module_name}_{index}.py"
+
+        modules[module_file] = IDL(
+            typedefs={name: typedef for name, typedef in idl.typedefs.items() if name in names},
+            enums={name: enum for name, enum in idl.enums.items() if name in names},
+            structs={name: struct for name, struct in idl.structs.items() if name in names},
+            inheritance_data={base: derived for base, derived in idl.inheritance_data.items() if base in names},
+        )
+
+    return modules
+
+
+def _referenced_names(type_node: TypeNode, visited: dict[TypeNode, set[str]]) -> set[str]:
+    # interned nodes are shared between members, so the names of each distinct node are collected once
+    names = visited.get(type_node)
+    if names is not None:
+        return names
+
+    if isinstance(type_node, NamedType):
+        names = {type_node.name}
+    elif isinstance(type_node, SequenceType):
+        names = _referenced_names(type_node.element, visited)
+    elif isinstance(type_node, RecordType):
+        names = _referenced_names(type_node.key, visited) | _referenced_names(type_node.value, visited)
+    else:
+        names = set().union(*(_referenced_names(member, visited) for member in type_node.members))
+
+    visited[type_node] = names
+    return names
+
+
+def _snake_case(name: str) -> str:
+    name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", name)
+    return re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name).lower()
+
+
+def _generate_split_package(
+    parsed_idl: ParsedIDL | IDL,
+    additional_data: AdditionalData,
+    source_dir: Path,
+    *,
+    format_code: bool,
+    jobs: int,
+    codecs: bool,
+) -> list[Path]:
+    modules = split_modules(parsed_idl)
+
+    if jobs <= 1 or len(modules) <= 1:
+        contents = [_render_module(module, additional_data, format_code, codecs) for module in modules.values()]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(modules))) as executor:
+            contents = list(
+                executor.map(
+                    _render_module,
+                    modules.values(),
+                    repeat(additional_data),
+                    repeat(format_code),
+                    repeat(codecs),
+                    chunksize=max(1, len(modules) // (jobs * 4)),
+                )
+            )
+
+    changed = [
+        source_dir / module_file
+        for module_file, content in zip(modules, contents)
+        if write_if_changed(source_dir / module_file, content)
+    ]
 
+    init_file = source_dir / "__init__.py"
+    if write_if_changed(
+        init_file, _render_package_init(modules, additional_data, format_code=format_code, codecs=codecs)
+    ):
+        changed.append(init_file)
 
-def generate_python(parsed_idl: ParsedIDL, additional_data: AdditionalData, out_file: Path) -> None:
+    return changed
+
+
+def _render_module(module: IDL, additional_data: AdditionalData, format_code: bool, codecs: bool) -> str:  # noqa: FBT001
+    j2_template = get_template("python_module.jinja")
+
+    template_data = _transform_comments(_transform_types(module))
+
+    code = j2_template.render(
+        {
+            **additional_data,
+            **template_data,
+            "polymorphic_types": _transform_polymorphic_types(module),
+            **_codec_data(module, template_data, codecs=codecs),
+        }
+    )
+
+    return _format_code(code) if format_code else code
+
+
+def _render_package_init(
+    modules: dict[str, IDL], additional_data: AdditionalData, *, format_code: bool, codecs: bool
+) -> str:
+    j2_template = get_template("python_package_init.jinja")
+
+    module_names = {
+        module_file.removesuffix(".py"): [
+            *module.typedefs,
+            *module.enums,
+            *map(_polymorphic_alias, _polymorphic_bases(module)),
+            *module.structs,
+        ]
+        for module_file, module in modules.items()
+    }
+
+    code = j2_template.render({**additional_data, "modules": module_names, "codecs": codecs})
+
+    return _format_code(code) if format_code else code
+
+
+def generate_python(
+    parsed_idl: ParsedIDL | IDL,
+    additional_data: AdditionalData,
+    out_file: Path,
+    *,
+    format_code: bool = True,
+    codecs: bool = False,
+) -> list[Path]:
     """Generate a Python file from the parsed IDL data.
 
     Based on the parsed IDL data a pydantic model is generated.
-    The generated file will be formatted with black and isort.
+    The generated code is formatted with black and isort in memory before it is written.
+    Without formatting, black and isort are not imported and the code is streamed to the file as it is rendered.
 
     Enumerations are generated as Enum classes.
     Any typedefs are generated as type aliases.
+    The models defer building their pydantic schemas to their first use,
+    so importing the module does not pay for models that are never used.
 
     In addition to the classes that hold the data, two functions are generated:
     `load` and `save`, which can be used to load and save the data from and to a file.
@@ -80,140 +321,180 @@ def generate_python(parsed_idl: ParsedIDL, additional_data: AdditionalData, out_
     - YAML
     - CBOR
 
+    With `codecs`, a decode function is generated for every struct, straight from the IDL.
+    `load(..., validate=False)` uses them to turn parsed CBOR into models with `model_construct`,
+    checking for required members and dispatching polymorphic structs on their `type` field.
+    This skips the pydantic validation, so it is only meant for trusted data, e.g. written by the C++ code.
+    Likewise, an encode function is generated for every struct, which maps a model to its members
+    with the discriminator as a constant. `save` hands them to the CBOR encoder,
+    which writes the models one by one instead of dumping the whole data into dictionaries first.
+
     Args:
-        parsed_idl: The parsed IDL data.
+        parsed_idl: The parsed IDL data, either as dictionaries or as the typed intermediate representation.
         additional_data: Additional data for the package.
         out_file: The output file for the generated Python code.
+        format_code: Format the generated code with black and isort.
+        codecs: Generate the decode and encode functions.
+
+    Returns:
+        The output files whose content changed.
+        The file is only written if its formatted content differs from the existing file.
     """
-    res = _render_template(parsed_idl, additional_data)
+    chunks = _render_chunks(parsed_idl, additional_data, codecs=codecs)
 
-    out_file.parent.mkdir(parents=True, exist_ok=True)
+    if not format_code:
+        return [out_file] if write_chunks_if_changed(out_file, chunks) else []
 
-    with open(out_file, "w") as f:
-        f.write(res)
+    return [out_file] if write_if_changed(out_file, _format_code("".join(chunks))) else []
 
-    black.format_file_in_place(out_file, write_back=black.WriteBack.YES, fast=True, mode=black.FileMode())
 
-    isort.file(out_file)
+def _format_code(code: str) -> str:
+    # black and isort are only imported when formatting is requested
+    import black  # noqa: PLC0415
+    import isort  # noqa: PLC0415
 
+    # the same as black.format_file_in_place on a file, without writing and reading the file
+    with contextlib.suppress(black.NothingChanged):
+        code = black.format_file_contents(code, fast=True, mode=black.Mode())
 
-def _render_template(parsed_idl: ParsedIDL, additional_data: AdditionalData) -> str:
-    package_dir = Path(__file__).resolve().parent
-    templates_dir = package_dir / "templates"
+    return isort.code(code)
 
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(templates_dir),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        autoescape=jinja2.select_autoescape(
-            disabled_extensions=("hpp.jinja",),
-            default_for_string=True,
-            default=False,
-        ),
-    )
 
-    j2_template = env.get_template("python.jinja")
+def _render_template(parsed_idl: ParsedIDL | IDL, additional_data: AdditionalData, *, codecs: bool = False) -> str:
+    return "".join(_render_chunks(parsed_idl, additional_data, codecs=codecs))
 
-    parsed_idl = _transform_types(parsed_idl)
 
-    parsed_idl = _transform_comments(parsed_idl)
+def _render_chunks(
+    parsed_idl: ParsedIDL | IDL, additional_data: AdditionalData, *, codecs: bool = False
+) -> Iterator[str]:
+    j2_template = get_template("python.jinja")
 
-    data = {**additional_data, **parsed_idl}
+    template_data = _transform_types(parsed_idl)
 
-    return j2_template.render(data)
+    template_data = _transform_comments(template_data)
 
+    data = {
+        **additional_data,
+        **template_data,
+        "polymorphic_types": _transform_polymorphic_types(parsed_idl),
+        **_codec_data(parsed_idl, template_data, codecs=codecs),
+    }
 
-def _render_pyproject_toml(additional_data: AdditionalData) -> str:
-    package_dir = Path(__file__).resolve().parent
-    templates_dir = package_dir / "templates"
-
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(templates_dir),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        autoescape=jinja2.select_autoescape(
-            disabled_extensions=("hpp.jinja",),
-            default_for_string=True,
-            default=False,
-        ),
-    )
+    return j2_template.generate(data)
 
-    j2_template = env.get_template("pyproject.jinja")
 
-    return j2_template.render(additional_data)
+def _render_pyproject_toml(additional_data: AdditionalData) -> str:
+    j2_template = get_template("pyproject.jinja")
 
+    return j2_template.render(additional_data)
 
-def _transform_types(parsed_idl: ParsedIDL) -> ParsedIDL:
-    defined_types = set()
 
-    for struct_name in parsed_idl["structs"]:
-        defined_types.add(struct_name)
+def _transform_types(parsed_idl: ParsedIDL | IDL) -> ParsedIDL:
+    idl = as_idl(parsed_idl)
+    inheritance_index = idl.inheritance_index
 
-    for enum_name in parsed_idl["enums"]:
-        defined_types.add(enum_name)
+    defined_types = idl.symbols.defined
 
-    for typedef_name in parsed_idl["typedefs"]:
-        defined_types.add(typedef_name)
+    # type nodes are shared between members, so each distinct type is rendered once
+    rendered: dict[TypeNode, str] = {}
 
-    for struct_name, struct_data in parsed_idl["structs"].items():
-        for member_data in struct_data["members"].values():
-            member_data["type"] = _transformer(member_data["type"], parsed_idl["inheritance_data"], defined_types)
+    structs = {}
+    for struct_name, struct in idl.structs.items():
+        members: dict[str, dict[str, Any]] = {}
+        for member in struct.members:
+            member_type = _transformer(member.type, inheritance_index, defined_types, rendered)
+            default = member.default
 
-            if member_data["default"] == "{}" and member_data["default_type"] is not None:
-                # member_data["default"] = f"Field(default={member_data['default_type']}())"
-                member_data["default"] = f"{member_data['default_type']}()"
+            if default == "{}" and member.default_type is not None:
+                default = f"{member.default_type}()"
 
-            if member_data["default"] == "{}" and member_data["default_type"] is None:
-                # member_data["default"] = f"Field(default={member_data['type']}())"
-                type_str = member_data["type"]
-                if isinstance(type_str, str) and type_str.startswith('"') and type_str.endswith('"'):
+            if default == "{}" and member.default_type is None:
+                type_str = member_type
+                if type_str.startswith('"') and type_str.endswith('"'):
                     type_str = type_str[1:-1]
-                member_data["default"] = f"{type_str}()"
+                default = f"{type_str}()"
 
-            if not member_data["required"]:
-                member_data["type"] = f"Optional[{member_data['type']}]"
+            if not member.required:
+                member_type = f"Optional[{member_type}]"
 
-            if "str" in member_data["type"] and member_data["default"] is not None:
-                member_data["default"] = f'"{member_data["default"]}"'
+            if "str" in member_type and default is not None:
+                default = f'"{default}"'
 
-            if member_data["default"] is None and member_data["required"] is False:
-                member_data["default"] = "None"
+            if default is None and member.required is False:
+                default = "None"
+
+            members[member.name] = {
+                "type": member_type,
+                "required": member.required,
+                "default": default,
+                "default_type": member.default_type,
+                **comment_data(member),
+            }
 
         # Check if a member named "type" is already present in the struct and raise an error if so
-        if any(member == "type" for member in struct_data["members"]):
+        if "type" in members:
             msg = f"Struct {struct_name} already has a member named 'type'"
             raise ValueError(msg)
 
-        for derived_types in parsed_idl["inheritance_data"].values():
-            if struct_name in derived_types and not any(member == "type" for member in struct_data["members"]):
-                doc_string = Docstring()
-                doc_string.short_description = "Discriminator field"
-                struct_data["members"]["type"] = {
-                    "type": f'Literal["{struct_name}"]',
-                    "default": f'"{struct_name}"',
-                    "block_comment": doc_string,
-                }
-
-        if struct_name in parsed_idl["inheritance_data"] and not any(
-            member == "type" for member in struct_data["members"]
-        ):
+        if struct_name in inheritance_index.children or struct_name in inheritance_index.bases:
             doc_string = Docstring()
             doc_string.short_description = "Discriminator field"
-            struct_data["members"]["type"] = {
+            members["type"] = {
                 "type": f'Literal["{struct_name}"]',
                 "default": f'"{struct_name}"',
                 "block_comment": doc_string,
             }
 
-    for type_def in parsed_idl["typedefs"].values():
-        type_def["type"] = _transformer(type_def["type"], parsed_idl["inheritance_data"], defined_types)
-
-    return parsed_idl
-
+        structs[struct_name] = {"members": members, "inheritance": struct.inheritance, **comment_data(struct)}
 
-def _transformer(type_input: dict[str, Any], inheritance_data: dict[str, list[str]], defined_types: set[str]) -> str:
-    if isinstance(type_input, str):
-        type_input_poly = _get_polymorphic_type(type_input, inheritance_data, defined_types)
+    return {
+        "typedefs": {
+            name: {
+                "type": _transformer(typedef.type, inheritance_index, defined_types, rendered),
+                **comment_data(typedef),
+            }
+            for name, typedef in idl.typedefs.items()
+        },
+        "enums": {
+            name: {
+                "values": [{"name": value.name, **comment_data(value)} for value in enum.values],
+                **comment_data(enum),
+            }
+            for name, enum in idl.enums.items()
+        },
+        "structs": structs,
+        "inheritance_data": {base: list(derived) for base, derived in idl.inheritance_data.items()},
+    }
+
+
+def _transformer(
+    type_input: TypeNode | dict[str, Any] | str,
+    inheritance_index: InheritanceIndex,
+    defined_types: AbstractSet[str],
+    rendered: dict[TypeNode, str] | None = None,
+) -> str:
+    type_node = as_type(type_input)
+
+    if rendered is None:
+        return _render_type(type_node, inheritance_index, defined_types, rendered)
+
+    type_str = rendered.get(type_node)
+    if type_str is None:
+        type_str = rendered[type_node] = _render_type(type_node, inheritance_index, defined_types, rendered)
+
+    return type_str
+
+
+def _render_type(
+    type_node: TypeNode,
+    inheritance_index: InheritanceIndex,
+    defined_types: AbstractSet[str],
+    rendered: dict[TypeNode, str] | None,
+) -> str:
+    if isinstance(type_node, NamedType):
+        if inheritance_index.descendants.get(type_node.name):
+            # every reference shares the alias, so pydantic builds a single validator for the union
+            return f'"{_polymorphic_alias(type_node.name)}"'
 
         conversion = {
             "string": "str",
@@ -235,51 +516,211 @@ def _transformer(type_input: dict[str, Any], inheritance_data: dict[str, list[st
         }
 
         # check if type_input is in defined_types
-        if type_input_poly in defined_types:
-            return f'"{conversion.get(type_input_poly, type_input_poly)}"'
+        if type_node.name in defined_types:
+            return f'"{conversion.get(type_node.name, type_node.name)}"'
 
-        return conversion.get(type_input_poly, type_input_poly)
+        return conversion.get(type_node.name, type_node.name)
 
-    if type_input["union"]:
-        contained_types = [
-            _transformer(contained, inheritance_data, defined_types) for contained in type_input["type_name"]
-        ]
-        transformed_type = ",".join(contained_types)
-        return f"Union[{transformed_type}]"
-    if type_input["vector"]:
-        transformed_type = _transformer(type_input["type_name"], inheritance_data, defined_types)
-
-        if type_input["size"] is not None:
-            return (
-                f"Annotated[List[{transformed_type}], Len("
-                f"min_length={type_input['size']}, "
-                f"max_length={type_input['size']})]"
-            )
+    if isinstance(type_node, SequenceType):
+        transformed_type = _transformer(type_node.element, inheritance_index, defined_types, rendered)
+
+        if type_node.size is not None:
+            return f"Annotated[List[{transformed_type}], Len(min_length={type_node.size}, max_length={type_node.size})]"
 
         return f"List[{transformed_type}]"
-    if type_input["map"]:
-        key_type = _transformer(type_input["type_name"]["key"], inheritance_data, defined_types)
+    if isinstance(type_node, RecordType):
+        key_type = _transformer(type_node.key, inheritance_index, defined_types, rendered)
         # TODO: here we can check if the type changed??
 
-        value_type = _transformer(type_input["type_name"]["value"], inheritance_data, defined_types)
+        value_type = _transformer(type_node.value, inheritance_index, defined_types, rendered)
         return f"Dict[{key_type}, {value_type}]"
 
-    msg = f"Unknown type: {type_input}"
-    raise ValueError(msg)
+    contained_types = [
+        _transformer(contained, inheritance_index, defined_types, rendered) for contained in type_node.members
+    ]
+    transformed_type = ",".join(contained_types)
+    return f"Union[{transformed_type}]"
+
+
+def _codec_data(parsed_idl: ParsedIDL | IDL, template_data: ParsedIDL, *, codecs: bool) -> dict[str, Any]:
+    if not codecs:
+        return {"codecs": False}
+
+    idl = as_idl(parsed_idl)
+    return {
+        "codecs": True,
+        "decoders": _transform_decoders(idl, template_data["structs"]),
+        "encoders": _transform_encoders(idl, template_data["structs"]),
+    }
+
+
+def _model_fields(idl: IDL, structs: dict[str, Any], struct_name: str) -> dict[str, dict[str, Any]]:
+    # the rendered members of a model including the inherited ones, in the order of the pydantic fields,
+    # a redefined member, i.e. the discriminator, keeps the position of the inherited one
+    lineage = [
+        *(
+            ancestor
+            for ancestor in reversed(idl.inheritance_index.ancestors.get(struct_name, ()))
+            if ancestor in idl.structs
+        ),
+        struct_name,
+    ]
+    return {name: member_data for ancestor in lineage for name, member_data in structs[ancestor]["members"].items()}
+
+
+def _transform_decoders(idl: IDL, structs: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    # the decoders turn parsed JSON or CBOR into models without validating it,
+    # members without a rendered default are required
+    decoders: dict[str, dict[str, Any]] = {}
+    for struct_name in idl.structs:
+        types = {
+            member.name: member
+            for ancestor in (*reversed(idl.inheritance_index.ancestors.get(struct_name, ())), struct_name)
+            if ancestor in idl.structs
+            for member in idl.structs[ancestor].members
+        }
+
+        # the decoder of a base dispatches data of a derived struct on its discriminator
+        polymorphic = bool(idl.inheritance_index.descendants.get(struct_name))
+
+        members: list[dict[str, Any]] = []
+        for name, member_data in _model_fields(idl, structs, struct_name).items():
+            default = member_data["default"]
+            if name not in types:
+                # the discriminator is not read from the data, it is fixed by the struct
+                members.append({"name": name, "expression": None, "nullable": False, "default": default})
+                continue
+
+            expression = _decode_expression(types[name].type, "value", idl, 0)
+            if expression is None:
+                # the shape cannot be decoded without validation, so the struct is validated as a whole
+                decoders[struct_name] = {"members": None, "polymorphic": polymorphic}
+                break
+            members.append(
+                {"name": name, "expression": expression, "nullable": not types[name].required, "default": default}
+            )
+        else:
+            decoders[struct_name] = {"members": members, "polymorphic": polymorphic}
+
+    return decoders
+
+
+def _transform_encoders(idl: IDL, structs: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    # the encoders map a model to its members without descending into nested models,
+    # the discriminator is written as a constant instead of being read from the model
+    encoders: dict[str, dict[str, Any]] = {}
+    for struct_name in idl.structs:
+        members = [
+            {"name": name, "constant": member_data["default"] if name == "type" else None}
+            for name, member_data in _model_fields(idl, structs, struct_name).items()
+        ]
+        encoders[struct_name] = {"members": members}
+
+    return encoders
+
+
+def _decode_expression(type_node: TypeNode, value: str, idl: IDL, depth: int) -> str | None:
+    # returns the expression decoding `value`, `value` itself if it needs no decoding,
+    # or None if the type cannot be decoded without validation
+    if isinstance(type_node, NamedType):
+        name = type_node.name
+        kind = idl.symbols.kind(name)
+
+        if kind is SymbolKind.TYPEDEF:
+            return _decode_expression(idl.typedefs[name].type, value, idl, depth)
+        if kind is SymbolKind.ENUM:
+            return f"{name}({value})"
+        if kind is SymbolKind.STRUCT:
+            if idl.inheritance_index.descendants.get(name):
+                return f"_decode_polymorphic({value})"
+            return f"_decode_{name}({value})"
+        if name in {"float", "double", "long double"}:
+            # JSON does not distinguish integral floats from integers
+            return f"float({value})"
+        return value
+
+    if isinstance(type_node, SequenceType):
+        element = _decode_expression(type_node.element, f"v{depth}", idl, depth + 1)
+        if element is None:
+            return None
+        if element == f"v{depth}":
+            return value
+        return f"[{element} for v{depth} in {value}]"
+
+    if isinstance(type_node, RecordType):
+        item = _decode_expression(type_node.value, f"v{depth}", idl, depth + 1)
+        if item is None:
+            return None
+        if item == f"v{depth}":
+            return value
+        return f"{{k{depth}: {item} for k{depth}, v{depth} in {value}.items()}}"
+
+    return _decode_union(type_node, value, idl, depth)
+
+
+def _decode_union(type_node: UnionType, value: str, idl: IDL, depth: int) -> str | None:
+    # the members are told apart by the type of the parsed value, builtins are taken as they are
+    decoded: dict[type, str] = {}
+    for member in type_node.members:
+        resolved = member
+        while isinstance(resolved, NamedType) and idl.symbols.kind(resolved.name) is SymbolKind.TYPEDEF:
+            resolved = idl.typedefs[resolved.name].type
+
+        if isinstance(resolved, NamedType) and idl.symbols.kind(resolved.name) is SymbolKind.BUILTIN:
+            continue
+        if isinstance(resolved, NamedType) and idl.symbols.kind(resolved.name) is SymbolKind.STRUCT:
+            container: type = dict
+        elif isinstance(resolved, RecordType):
+            container = dict
+        elif isinstance(resolved, SequenceType):
+            container = list
+        else:
+            # enumerations and nested unions are ambiguous without validation
+            return None
+
+        expression = _decode_expression(resolved, value, idl, depth)
+        if container in decoded or expression is None:
+            return None
+        decoded[container] = expression
+
+    expression = value
+    for container, container_expression in decoded.items():
+        if container_expression != value:
+            expression = f"({container_expression} if isinstance({value}, {container.__name__}) else {expression})"
+    return expression
+
+
+def _transform_polymorphic_types(parsed_idl: ParsedIDL | IDL) -> dict[str, dict[str, str]]:
+    idl = as_idl(parsed_idl)
+
+    polymorphic_types = {}
+    for base in _polymorphic_bases(idl):
+        alias = _polymorphic_alias(base)
+        if alias in idl.symbols.defined:
+            msg = f"Type alias {alias} for the polymorphic struct {base} is already defined"
+            raise ValueError(msg)
+
+        polymorphic_types[alias] = {
+            "type": _polymorphic_union(base, idl.inheritance_index, idl.symbols.defined),
+            "base": base,
+        }
+
+    return polymorphic_types
+
 
+def _polymorphic_bases(idl: IDL) -> list[str]:
+    return [name for name in idl.structs if idl.inheritance_index.descendants.get(name)]
 
-def _get_polymorphic_type(type_input: str, inheritance_data: dict[str, list[str]], defined_types: set[str]) -> str:
-    union_content = []
 
-    if type_input in inheritance_data:
-        union_content.extend(inheritance_data[type_input])
-        union_content.append(type_input)
+def _polymorphic_alias(base: str) -> str:
+    return f"Any{base}"
 
-    if union_content:
-        union_content = [f'"{type_name}"' for type_name in union_content if type_name in defined_types]
-        return f'Annotated[Union[{", ".join(union_content)}],Field(discriminator="type")]'
 
-    return type_input
+def _polymorphic_union(base: str, inheritance_index: InheritanceIndex, defined_types: AbstractSet[str]) -> str:
+    union_content = [
+        f'"{type_name}"' for type_name in (*inheritance_index.descendants[base], base) if type_name in defined_types
+    ]
+    return f'Annotated[Union[{", ".join(union_content)}],Field(discriminator="type")]'
 
 
 def _transform_comments(parsed_idl: ParsedIDL) -> ParsedIDL:
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from poly_scribe_code_gen.cli.batch import BatchJob, load_manifest, run_batch
+
+
+def _write_manifest(tmp_path: Path, jobs: list[dict[str, Any]]) -> Path:
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps({"jobs": jobs}))
+    return manifest_file
+
+
+def test_load_manifest(tmp_path: Path) -> None:
+    (tmp_path / "data.json").write_text(json.dumps({"package": "bar"}))
+    manifest_file = _write_manifest(
+        tmp_path,
+        [
+            {"idl": "foo.webidl", "additional_data": {"package": "foo"}, "cpp": "out/foo.hpp"},
+            {
+                "idl": ["common.webidl", "bar.webidl"],
+                "additional_data": "data.json",
+                "py": "out/bar.py",
+                "schema": ["out/bar.json", "Bar"],
+            },
+        ],
+    )
+
+    jobs = load_manifest(manifest_file)
+
+    assert jobs == [
+        BatchJob(
+            idl_files=(tmp_path / "foo.webidl",),
+            additional_data={"package": "foo"},
+            cpp=tmp_path / "out" / "foo.hpp",
+        ),
+        BatchJob(
+            idl_files=(tmp_path / "common.webidl", tmp_path / "bar.webidl"),
+            additional_data={"package": "bar"},
+            py=tmp_path / "out" / "bar.py",
+            schema=(tmp_path / "out" / "bar.json", "Bar"),
+        ),
+    ]
+
+
+def test_load_manifest_missing_idl(tmp_path: Path) -> None:
+    manifest_file = _write_manifest(tmp_path, [{"additional_data": {"package": "foo"}}])
+
+    with pytest.raises(ValueError, match="Job 0 in manifest .* requires 'idl' and 'additional_data'"):
+        load_manifest(manifest_file)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_run_batch(tmp_path: Path, max_workers: int) -> None:
+    (tmp_path / "foo.webidl").write_text("dictionary Foo { int bar; };")
+    (tmp_path / "invalid.webidl").write_text("dictionary Bar { Missing baz; };")
+    manifest_file = _write_manifest(
+        tmp_path,
+        [
+            {"idl": "foo.webidl", "additional_data": {"package": "foo"}, "cpp": "out/foo.hpp", "py": "out/foo.py"},
+            {"idl": "invalid.webidl", "additional_data": {"package": "bar"}, "cpp": "out/bar.hpp"},
+        ],
+    )
+
+    errors = run_batch(load_manifest(manifest_file), max_workers=max_workers, cache_dir=tmp_path / "cache")
+
+    assert errors == {1: "RuntimeError: Member type 'Missing' in 'Bar.baz' is not valid."}
+    assert "struct Foo" in (tmp_path / "out" / "foo.hpp").read_text()
+    assert "class Foo" in (tmp_path / "out" / "foo.py").read_text()
+    assert not (tmp_path / "out" / "bar.hpp").exists()
+    assert list((tmp_path / "cache" / "parse").glob("*.pickle"))
+
+
+def test_run_batch_split_packages_with_schema(tmp_path: Path) -> None:
+    # both jobs run in the same process and define a different model with the same name
+    (tmp_path / "one.webidl").write_text("dictionary Root { int first; };")
+    (tmp_path / "two.webidl").write_text("dictionary Root { string second; };")
+    manifest_file = _write_manifest(
+        tmp_path,
+        [
+            {
+                "idl": f"{name}.webidl",
+                "additional_data": {"package": name},
+                "py_package": f"out/{name}",
+                "schema": [f"out/{name}.json", "Root"],
+            }
+            for name in ("one", "two")
+        ],
+    )
+
+    errors = run_batch(load_manifest(manifest_file), max_workers=1, split_py_package=True)
+
+    assert errors == {}
+    assert list(json.loads((tmp_path / "out" / "one.json").read_text())["properties"]) == ["first"]
+    assert list(json.loads((tmp_path / "out" / "two.json").read_text())["properties"]) == ["second"]
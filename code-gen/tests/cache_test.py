@@ -0,0 +1,100 @@
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import poly_scribe_code_gen._cache as cache
+import poly_scribe_code_gen.parse_idl as parsing
+
+
+def test_cache_key_depends_on_content() -> None:
+    assert cache.cache_key("foo") == cache.cache_key("foo")
+    assert cache.cache_key("foo") != cache.cache_key("bar")
+    assert cache.cache_key("foo", "bar") != cache.cache_key("foob", "ar")
+
+
+def test_cache_key_depends_on_version(mocker: Any) -> None:
+    key = cache.cache_key("foo")
+
+    mocker.patch("poly_scribe_code_gen._cache.__version__", "0.0.0")
+
+    assert cache.cache_key("foo") != key
+
+
+def test_store_and_load(tmp_path: Path) -> None:
+    cache.store(tmp_path, "key", {"foo": [1, 2, 3]})
+
+    assert cache.load(tmp_path, "key") == {"foo": [1, 2, 3]}
+    assert cache.load(tmp_path, "missing") is None
+
+
+def test_load_corrupt_entry(tmp_path: Path) -> None:
+    entry = tmp_path / "key.pickle"
+    entry.write_bytes(b"not a pickle")
+
+    assert cache.load(tmp_path, "key") is None
+    assert not entry.exists()
+
+
+def test_evict_by_age(tmp_path: Path) -> None:
+    cache.store(tmp_path, "old", "old")
+    cache.store(tmp_path, "new", "new")
+
+    old_time = time.time() - 100
+    os.utime(tmp_path / "old.pickle", (old_time, old_time))
+
+    cache.evict(tmp_path, max_age=50)
+
+    assert cache.load(tmp_path, "old") is None
+    assert cache.load(tmp_path, "new") == "new"
+
+
+def test_evict_by_size(tmp_path: Path) -> None:
+    for i in range(4):
+        cache.store(tmp_path, f"entry{i}", "x" * 1000)
+        entry_time = time.time() - 100 + i
+        os.utime(tmp_path / f"entry{i}.pickle", (entry_time, entry_time))
+
+    entry_size = (tmp_path / "entry0.pickle").stat().st_size
+
+    cache.evict(tmp_path, max_size=2 * entry_size)
+
+    assert sorted(p.name for p in tmp_path.glob("*.pickle")) == ["entry2.pickle", "entry3.pickle"]
+
+
+def test_parse_idl_cache_hit(tmp_path: Path, mocker: Any) -> None:
+    idl_file = tmp_path / "test.webidl"
+    idl_file.write_text(
+        """
+/// Block comment for Foo
+dictionary Foo {
+    int bar;
+};
+"""
+    )
+    cache_dir = tmp_path / "cache"
+
+    parsed_idl = parsing.parse_idl(idl_file, cache_dir=cache_dir)
+
+    validate_mock = mocker.patch("poly_scribe_code_gen.parse_idl._parse_unit")
+
+    cached_idl = parsing.parse_idl(idl_file, cache_dir=cache_dir)
+
+    validate_mock.assert_not_called()
+    assert cached_idl["structs"]["Foo"]["members"] == parsed_idl["structs"]["Foo"]["members"]
+    assert cached_idl["structs"]["Foo"]["block_comment"].description == "Block comment for Foo"
+
+
+def test_parse_idl_cache_miss_on_change(tmp_path: Path) -> None:
+    idl_file = tmp_path / "test.webidl"
+    cache_dir = tmp_path / "cache"
+
+    idl_file.write_text("dictionary Foo { int bar; };")
+    parsed_idl = parsing.parse_idl(idl_file, cache_dir=cache_dir)
+
+    idl_file.write_text("dictionary Foo { int baz; };")
+    changed_idl = parsing.parse_idl(idl_file, cache_dir=cache_dir)
+
+    assert "bar" in parsed_idl["structs"]["Foo"]["members"]
+    assert "baz" in changed_idl["structs"]["Foo"]["members"]
+    assert len(list((cache_dir / "parse").glob("*.pickle"))) == 2
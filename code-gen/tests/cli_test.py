@@ -0,0 +1,236 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from poly_scribe_code_gen import cli
+from poly_scribe_code_gen.cli import generate
+
+IDL = """
+dictionary Base {
+    int id;
+};
+
+dictionary Derived : Base {
+    sequence<double> values;
+};
+
+dictionary Config {
+    Base base;
+    record<ByteString, string> names;
+};
+"""
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_generate(tmp_path: Path, jobs: int) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+    out_dir = tmp_path / "out"
+
+    generate(
+        [idl_file],
+        {"package": "config"},
+        cpp=out_dir / "config.hpp",
+        py=out_dir / "config.py",
+        py_package=out_dir / "config_pkg",
+        schema=(out_dir / "config.json", "Config"),
+        jobs=jobs,
+    )
+
+    assert "struct Config" in (out_dir / "config.hpp").read_text()
+    assert "class Config" in (out_dir / "config.py").read_text()
+    assert (out_dir / "config_pkg" / "src" / "config" / "__init__.py").read_text() == (
+        out_dir / "config.py"
+    ).read_text()
+    assert '"title": "Config"' in (out_dir / "config.json").read_text()
+
+
+def test_generate_concurrent_matches_sequential(tmp_path: Path) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+
+    for jobs in (1, 2):
+        generate(
+            [idl_file],
+            {"package": "config"},
+            cpp=tmp_path / str(jobs) / "config.hpp",
+            py=tmp_path / str(jobs) / "config.py",
+            jobs=jobs,
+        )
+
+    for name in ("config.hpp", "config.py"):
+        assert (tmp_path / "1" / name).read_text() == (tmp_path / "2" / name).read_text()
+
+
+def test_generate_schema_requires_python(tmp_path: Path) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+
+    with pytest.raises(RuntimeError, match="Schema can only be generated with Python or Python package"):
+        generate([idl_file], {"package": "config"}, cpp=tmp_path / "config.hpp", schema=(tmp_path / "s.json", "Config"))
+
+    assert not (tmp_path / "config.hpp").exists()
+
+
+def test_generate_only_writes_changed_outputs(tmp_path: Path) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+    out_dir = tmp_path / "out"
+
+    def _generate() -> list[Path]:
+        return generate(
+            [idl_file],
+            {"package": "config"},
+            cpp=out_dir / "config.hpp",
+            py_package=out_dir / "config_pkg",
+            schema=(out_dir / "config.json", "Config"),
+        )
+
+    changed = _generate()
+
+    written = [
+        out_dir / "config.hpp",
+        out_dir / "config_pkg" / "src" / "config" / "__init__.py",
+        out_dir / "config_pkg" / "pyproject.toml",
+        out_dir / "config.json",
+    ]
+    assert sorted(changed) == sorted(written)
+
+    for out_file in written:
+        os.utime(out_file, (0, 0))
+
+    assert _generate() == []
+    assert all(out_file.stat().st_mtime == 0 for out_file in written)
+
+    idl_file.write_text(IDL.replace("int id;", "int id;\n    double scale;"))
+
+    changed = _generate()
+
+    assert sorted(changed) == sorted([out_dir / "config.hpp", written[1], out_dir / "config.json"])
+    assert written[2].stat().st_mtime == 0
+
+
+def test_generate_cache_hit(tmp_path: Path, mocker: Any) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+    out_dir = tmp_path / "out"
+    cache_dir = tmp_path / "cache"
+
+    def _generate() -> list[Path]:
+        return generate(
+            [idl_file],
+            {"package": "config"},
+            cpp=out_dir / "config.hpp",
+            py_package=out_dir / "config_pkg",
+            schema=(out_dir / "config.json", "Config"),
+            cache_dir=cache_dir,
+        )
+
+    _generate()
+    outputs = {out_file: out_file.read_text() for out_file in out_dir.rglob("*") if out_file.is_file()}
+
+    (out_dir / "config.hpp").unlink()
+    (out_dir / "config.json").write_text("modified")
+    generate_mock = mocker.patch("poly_scribe_code_gen.cli._generate_uncached")
+
+    changed = _generate()
+
+    generate_mock.assert_not_called()
+    assert sorted(changed) == [out_dir / "config.hpp", out_dir / "config.json"]
+    assert {out_file: out_file.read_text() for out_file in outputs} == outputs
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_split_py_package(tmp_path: Path, mocker: Any, jobs: int) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL + "dictionary Unrelated { string name; };")
+    out_dir = tmp_path / "out"
+    source_dir = out_dir / "config_pkg" / "src" / "config"
+
+    def _generate() -> list[Path]:
+        return generate(
+            [idl_file],
+            {"package": "config"},
+            py_package=out_dir / "config_pkg",
+            schema=(out_dir / "config.json", "Config"),
+            cache_dir=tmp_path / "cache",
+            jobs=jobs,
+            split_py_package=True,
+        )
+
+    changed = _generate()
+
+    modules = [source_dir / "_base.py", source_dir / "_unrelated.py"]
+    assert set(modules) <= set(changed)
+    assert "class Config" in modules[0].read_text()
+    assert "from ._unrelated import Unrelated" in (source_dir / "__init__.py").read_text()
+    assert '"title": "Config"' in (out_dir / "config.json").read_text()
+
+    for module in modules:
+        module.unlink()
+    generate_mock = mocker.patch("poly_scribe_code_gen.cli._generate_uncached")
+
+    assert sorted(_generate()) == sorted(modules)
+    generate_mock.assert_not_called()
+
+
+def test_generate_cache_hit_does_not_import_generators(tmp_path: Path) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+    cache_dir = tmp_path / "cache"
+
+    generate(
+        [idl_file], {"package": "config"}, cpp=tmp_path / "config.hpp", py=tmp_path / "config.py", cache_dir=cache_dir
+    )
+
+    script = f"""
+import sys
+from pathlib import Path
+from poly_scribe_code_gen.cli import generate
+
+changed = generate(
+    [Path({str(idl_file)!r})],
+    {{"package": "config"}},
+    cpp=Path({str(tmp_path / "config.hpp")!r}),
+    py=Path({str(tmp_path / "config.py")!r}),
+    cache_dir=Path({str(cache_dir)!r}),
+)
+assert changed == [], changed
+print(sorted({{"jinja2", "black", "isort", "pywebidl2"}} & set(sys.modules)))
+"""
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_generation_key(tmp_path: Path, mocker: Any) -> None:
+    idl_file = tmp_path / "config.webidl"
+    idl_file.write_text(IDL)
+    outputs = {"cpp": tmp_path / "config.hpp"}
+
+    def _key(additional_data: Any, **options: Any) -> str:
+        return cli._generation_key(
+            [idl_file],
+            additional_data,
+            options.pop("outputs", outputs),
+            cpp=options.pop("cpp", outputs["cpp"]),
+            schema=None,
+            **{"format_code": False, "split_py_package": False, "py_codecs": False, **options},
+        )
+
+    key = _key({"package": "config"})
+
+    assert _key({"package": "config", "year": "1999"}) == key
+    assert _key({"package": "other"}) != key
+    assert _key({"package": "config"}, cpp=tmp_path / "other.hpp") != key
+    assert _key({"package": "config"}, cpp=None, outputs={"py": tmp_path / "config.py"}) != key
+    assert _key({"package": "config"}, format_code=True) != key
+    assert _key({"package": "config"}, split_py_package=True) != key
+    assert _key({"package": "config"}, py_codecs=True) != key
+
+    mocker.patch("poly_scribe_code_gen._cache.__version__", "0.0.0")
+    assert _key({"package": "config"}) != key
@@ -1,12 +1,16 @@
+import copy
 import re
 from pathlib import Path
+from typing import Any
 
+import jinja2
 import pytest
 from docstring_parser import parse
 
 from poly_scribe_code_gen import cpp_gen
+from poly_scribe_code_gen._ir import NamedType, RecordType, SequenceType, TypeNode, UnionType
 from poly_scribe_code_gen._types import AdditionalData, ParsedIDL
-from poly_scribe_code_gen.parse_idl import _validate_and_parse
+from poly_scribe_code_gen.parse_idl import _validate_and_parse, _validate_and_parse_ir
 
 
 def test_render_template_additional_data() -> None:
@@ -125,6 +129,18 @@ def test__transform_types_unknown_type() -> None:
         cpp_gen._transformer(type_data)
 
 
+def test__transformer_memoizes_rendered_types() -> None:
+    element = NamedType("ByteString")
+    type_node = UnionType((SequenceType(element), RecordType(element, element)))
+    rendered: dict[TypeNode, str] = {}
+
+    result = cpp_gen._transformer(type_node, None, rendered)
+
+    assert result == rendered[type_node]
+    assert rendered[element] == "std::string"
+    assert rendered[SequenceType(NamedType("ByteString"))] == "std::vector<std::string>"
+
+
 def test_render_template_typedefs() -> None:
     idl = """
 typedef int my_int;
@@ -286,19 +302,31 @@ dictionary Y {
     assert 'using X_t = rfl::TaggedUnion<"type", X, B, C>;'.replace(" ", "") in result.replace(" ", "")
 
 
-def test__sort_inheritance_data() -> None:
-    inheritance_data = {
-        "X": ["B", "C"],
-        "B": ["D"],
-        "Y": ["X"],
-    }
+def test__flatten_struct_inheritance_deep_hierarchy() -> None:
+    idl = """
+dictionary D : B {
+    int d;
+};
+
+dictionary B : X {
+    int b;
+};
+
+dictionary X : Y {
+    int x;
+};
 
-    result = cpp_gen._sort_inheritance_data(inheritance_data)
+dictionary Y {
+    int y;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = cpp_gen._flatten_struct_inheritance(parsed_idl)
 
-    assert len(result) == 3
-    assert result[0] == ("Y", ["X"])
-    assert result[1] == ("X", ["B", "C"])
-    assert result[2] == ("B", ["D"])
+    assert list(result["structs"]["D"]["members"]) == ["d", "b", "x", "y"]
+    assert list(result["structs"]["B"]["members"]) == ["b", "x", "y"]
+    assert list(result["structs"]["X"]["members"]) == ["x", "y"]
 
 
 def test__flatten_struct_inheritance() -> None:
@@ -327,6 +355,49 @@ dictionary BazQux : FooBar {
     assert "bar" in result["structs"]["FooBar"]["members"]
 
 
+def test_render_template_does_not_modify_input() -> None:
+    idl = """
+dictionary X {
+    required int foo;
+    ByteString name = "x";
+};
+
+dictionary B : X {
+    required int bar;
+};
+
+typedef sequence<X> Xs;
+"""
+    parsed_idl = _validate_and_parse(idl)
+    expected_idl = copy.deepcopy(parsed_idl)
+
+    result = cpp_gen._render_template(parsed_idl, {"package": "test"})
+
+    assert parsed_idl == expected_idl
+    assert cpp_gen._render_template(parsed_idl, {"package": "test"}) == result
+
+
+def test_render_template_shared_ir() -> None:
+    idl = """
+/// Block comment for X
+dictionary X {
+    required int foo; ///< Inline comment for foo
+};
+
+dictionary B : X {
+    required int bar;
+};
+"""
+    parsed_idl = _validate_and_parse_ir(idl)
+
+    result = cpp_gen._render_template(parsed_idl, {"package": "test"})
+
+    assert cpp_gen._render_template(parsed_idl, {"package": "test"}) == result
+    assert "\\brief Inline comment for foo" in result
+    assert parsed_idl.structs["B"].members[0].name == "bar"
+    assert len(parsed_idl.structs["B"].members) == 1
+
+
 def test_generate_cpp(tmp_path: Path) -> None:
     idl = """
 dictionary Foo {
@@ -379,6 +450,20 @@ dictionary Baz : Foo {
         assert "namespace test" in content
 
 
+def test_generate_cpp_streams_output(tmp_path: Path, mocker: Any) -> None:
+    parsed_idl = _validate_and_parse_ir("dictionary Foo { int foo; }; dictionary Bar : Foo { sequence<int> baz; };")
+    additional_data: AdditionalData = {"package": "test", "out_file": "test.hpp"}
+    out_file = tmp_path / "test.hpp"
+
+    expected = cpp_gen._render_template(parsed_idl, additional_data)
+    render_spy = mocker.spy(jinja2.Template, "render")
+
+    cpp_gen.generate_cpp(parsed_idl, additional_data, out_file)
+
+    render_spy.assert_not_called()
+    assert out_file.read_text() == expected
+
+
 def test_generate_cpp_missing_package(tmp_path: Path) -> None:
     parsed_idl: ParsedIDL = {"structs": {}, "inheritance_data": {}, "typedefs": {}, "enums": {}}
     additional_data: AdditionalData = {  # type: ignore
@@ -641,6 +726,28 @@ dictionary Y {
     assert 'using X_t = rfl::TaggedUnion<"type", X, B, C, M, N>;'.replace(" ", "") in result.replace(" ", "")
 
 
+def test_render_template_deep_poly_inheritance() -> None:
+    idl = """
+dictionary A {
+};
+dictionary B : A {
+};
+dictionary C : B {
+};
+dictionary D : C {
+};
+dictionary E : D {
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = cpp_gen._render_template(parsed_idl, {"package": "test"})
+
+    assert 'using A_t = rfl::TaggedUnion<"type", A, B, C, D, E>;'.replace(" ", "") in result.replace(" ", "")
+    assert 'using B_t = rfl::TaggedUnion<"type", B, C, D, E>;'.replace(" ", "") in result.replace(" ", "")
+    assert 'using D_t = rfl::TaggedUnion<"type", D, E>;'.replace(" ", "") in result.replace(" ", "")
+
+
 def test_render_template_struct_with_empty_type_default() -> None:
     idl = """
     dictionary Base {
@@ -0,0 +1,130 @@
+from typing import Any
+
+import pytest
+from pywebidl2 import parse
+
+import poly_scribe_code_gen.parse_idl as parsing
+from poly_scribe_code_gen import _fast_parser
+
+SUBSET_IDL = """
+/// Block comment for Color
+enum Color { "Red", "Green", "blue", };
+
+[Size=3] typedef sequence<double> Vec3;
+typedef (int or float or Vec3) Number;
+
+/** Base dictionary */
+[Attr, Flag=foo, Count=3, Ratio=0.5, Text="bar"]
+dictionary Base {
+    required int id; ///< Inline comment
+    [Size=2] sequence<unsigned long long> pair;
+};
+
+dictionary Foo : Base {
+    required [Attr] record<ByteString, Color> map;
+    long long big = -42;
+    unrestricted double ratio = 1.5e3;
+    boolean flag = true;
+    ByteString name = "foo";
+    Color color = "Red";
+    sequence<sequence<float>> nested = [];
+    Base base = {};
+    ([Attr] int or sequence<Color> or record<DOMString, Base>) variant;
+    ObservableArray<short> observable;
+};
+"""
+
+POLY_SCRIBE_IDL = """
+/// Block comment for Color
+enum Color { "Red", "Green", "blue" };
+
+typedef [Size=3] sequence<double> Vec3;
+
+/** Base dictionary */
+dictionary Base {
+    required int id; ///< Inline comment
+};
+
+dictionary Foo : Base {
+    required record<ByteString, Color> map;
+    long long big = -42;
+    double ratio = 1.5e3;
+    bool flag = true;
+    string name = "foo";
+    Color color = "Red";
+    [Size=2] sequence<float> pair;
+    Base base = {};
+    Vec3 position;
+    (int or Color or Base) variant;
+};
+"""
+
+
+ESCAPED_IDL = """
+enum _Kind { "a" };
+[Default=_Leaf] typedef int _Id;
+dictionary _Base { _Id _id; };
+dictionary _Leaf : _Base {
+    _Kind kind;
+    sequence<_Id> ids;
+    (_Base or int) variant;
+    record<DOMString, _Base> bases;
+};
+"""
+
+
+@pytest.mark.parametrize("idl", [SUBSET_IDL, POLY_SCRIBE_IDL, ESCAPED_IDL])
+def test_parse_matches_pywebidl2(idl: str) -> None:
+    assert _fast_parser.parse(idl) == parse(idl)
+
+
+def test_validate_and_parse_matches_pywebidl2() -> None:
+    expected = parsing._validate_and_parse(POLY_SCRIBE_IDL)
+    result = parsing._validate_and_parse(POLY_SCRIBE_IDL, fast_parser=True)
+
+    assert _describe_comments(result) == _describe_comments(expected)
+    assert result["inheritance_data"] == expected["inheritance_data"]
+
+
+def _describe_comments(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {
+            key: value.description if key.endswith("_comment") else _describe_comments(value)
+            for key, value in data.items()
+        }
+    return data
+
+
+@pytest.mark.parametrize(
+    "idl",
+    [
+        "interface Foo {};",
+        "partial dictionary Foo {};",
+        "dictionary Foo { int? bar; };",
+        "dictionary Foo { double bar = Infinity; };",
+        "dictionary Foo { int bar = null; };",
+        "dictionary Foo { int bar }",
+        "dictionary enum { int bar; };",
+        "dictionary Foo { int bar; }; $",
+    ],
+)
+def test_parse_unsupported_syntax(idl: str) -> None:
+    with pytest.raises(_fast_parser.UnsupportedSyntaxError):
+        _fast_parser.parse(idl)
+
+
+def test_parse_webidl_fast_parser(mocker: Any) -> None:
+    single_pass_spy = mocker.spy(parsing, "_parse_webidl_single_pass")
+
+    parsing._parse_webidl(SUBSET_IDL, fast_parser=True)
+
+    single_pass_spy.assert_not_called()
+
+
+def test_parse_webidl_fast_parser_fallback(mocker: Any) -> None:
+    single_pass_spy = mocker.spy(parsing, "_parse_webidl_single_pass")
+
+    with pytest.raises(RuntimeError, match="WebIDL validation errors:"):
+        parsing._parse_webidl("dictionary Foo { int bar }", fast_parser=True)
+
+    single_pass_spy.assert_called_once()
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+CLI_IMPORT_BUDGET_US = 150_000
+"""Budget for the cumulative import time of the CLI, generous enough for slow machines."""
+
+HEAVY_MODULES = {"black", "isort", "jinja2", "pywebidl2", "docstring_parser", "pydantic"}
+
+
+def _import_times(module: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+
+    # each line reads "import time: <self us> | <cumulative us> | <indented module name>"
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def test_cli_import_time_budget() -> None:
+    times = _import_times("poly_scribe_code_gen.cli")
+
+    assert HEAVY_MODULES.isdisjoint(times)
+    assert "concurrent.futures.process" not in times
+    assert times["poly_scribe_code_gen.cli"] < CLI_IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize(
+    ("module", "unexpected"),
+    [
+        ("poly_scribe_code_gen.parse_idl", HEAVY_MODULES),
+        ("poly_scribe_code_gen.cpp_gen", HEAVY_MODULES),
+        ("poly_scribe_code_gen.py_gen", {"black", "isort", "jinja2", "pywebidl2", "pydantic"}),
+    ],
+)
+def test_module_imports_are_deferred(module: str, unexpected: set[str]) -> None:
+    times = _import_times(module)
+
+    assert unexpected.isdisjoint(times)
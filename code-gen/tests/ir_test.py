@@ -0,0 +1,189 @@
+import pickle
+from dataclasses import FrozenInstanceError, replace
+
+import pytest
+
+import poly_scribe_code_gen._ir as ir
+import poly_scribe_code_gen.parse_idl as parsing
+
+IDL = """
+/// Block comment for Vec3
+typedef [Size=3] sequence<double> Vec3;
+
+enum Kind { ///< Inline comment for Kind
+    "foo", ///< Inline comment for foo
+    "bar"
+};
+
+/// Block comment for Base
+dictionary Base {
+    required Vec3 position;
+    [Default=Kind] Kind kind = "foo";
+};
+
+dictionary Derived : Base {
+    record<ByteString, double> values;
+    (int or ByteString) id;
+    sequence<Base> children;
+    ByteString name = "derived";
+};
+"""
+
+
+def test_roundtrip_parsed_idl() -> None:
+    parsed_idl = parsing._validate_and_parse(IDL)
+
+    assert ir.to_parsed_idl(ir.from_parsed_idl(parsed_idl)) == parsed_idl
+
+
+def test_validate_and_parse_ir() -> None:
+    idl = parsing._validate_and_parse_ir(IDL)
+
+    assert idl.typedefs["Vec3"].type == ir.SequenceType(ir.NamedType("double"), 3)
+    assert idl.structs["Derived"].inheritance == "Base"
+    assert idl.structs["Derived"].members[0].type == ir.RecordType(ir.NamedType("string"), ir.NamedType("double"))
+    assert idl.structs["Derived"].members[1].type == ir.UnionType((ir.NamedType("int"), ir.NamedType("string")))
+    assert idl.structs["Base"].members[1].default_type == "Kind"
+    assert idl.inheritance_data == {"Base": ("Derived",)}
+    assert idl.enums["Kind"].values[0].inline_comment.description == "Inline comment for foo"  # type: ignore[union-attr]
+
+
+def test_pickle_roundtrip() -> None:
+    idl = parsing._validate_and_parse_ir(IDL)
+
+    restored = pickle.loads(pickle.dumps(idl))  # noqa: S301
+
+    assert restored.structs["Derived"] == idl.structs["Derived"]
+    assert restored.typedefs["Vec3"].type == idl.typedefs["Vec3"].type
+    assert restored.inheritance_data == idl.inheritance_data
+    assert restored.inheritance_index == idl.inheritance_index
+    assert restored.structs["Base"].block_comment.description == "Block comment for Base"  # type: ignore[union-attr]
+
+
+def test_nodes_have_no_dict() -> None:
+    idl = parsing._validate_and_parse_ir(IDL)
+
+    assert not hasattr(idl.structs["Base"], "__dict__")
+    assert not hasattr(idl.structs["Base"].members[0], "__dict__")
+
+
+def test_from_parsed_type_unknown_type() -> None:
+    with pytest.raises(ValueError, match="Unknown type:"):
+        ir.from_parsed_type({"type_name": "Foo", "vector": False, "map": False, "union": False, "size": None})
+
+
+def test_nodes_are_immutable() -> None:
+    idl = parsing._validate_and_parse_ir(IDL)
+
+    with pytest.raises(FrozenInstanceError):
+        idl.structs["Base"].name = "Foo"  # type: ignore[misc]
+
+    with pytest.raises(FrozenInstanceError):
+        idl.structs["Base"].members[0].type = ir.NamedType("int")  # type: ignore[misc]
+
+    # the mappings are read-only copies, so neither users nor the creator can modify the IR in place
+    with pytest.raises(TypeError):
+        idl.structs["Foo"] = idl.structs["Base"]  # type: ignore[index]
+
+    with pytest.raises(TypeError):
+        idl.symbols.kinds["Foo"] = ir.SymbolKind.STRUCT  # type: ignore[index]
+
+    with pytest.raises(TypeError):
+        idl.inheritance_index.ancestors["Foo"] = ()  # type: ignore[index]
+
+    structs = dict(idl.structs)
+    copy = ir.IDL(structs=structs)
+    structs.clear()
+    assert "Base" in copy.structs
+
+
+def test_type_nodes_are_interned() -> None:
+    idl = parsing._validate_and_parse_ir("""
+typedef [Size=3] sequence<double> Vec3;
+
+dictionary Foo {
+    [Size=3] sequence<double> a;
+    sequence<double> b;
+    (int or double) c;
+};
+
+dictionary Bar {
+    sequence<double> b;
+    (int or double) c;
+};
+""")
+    foo = idl.structs["Foo"].members
+    bar = idl.structs["Bar"].members
+
+    assert foo[0].type is idl.typedefs["Vec3"].type
+    assert foo[1].type is bar[0].type
+    assert foo[2].type is bar[1].type
+    assert foo[1].type.element is foo[2].type.members[1]  # type: ignore[union-attr]
+    assert foo[0].type != foo[1].type
+
+
+def test_type_node_hash_survives_pickle() -> None:
+    type_node = ir.SequenceType(
+        ir.NamedType("int"), 3, (ir.ExtAttr("Foo", "identifier-list", [{"value": "a"}, {"value": "b"}]),)
+    )
+
+    restored = pickle.loads(pickle.dumps(type_node))  # noqa: S301
+
+    assert restored == type_node
+    assert hash(restored) == hash(type_node)
+    assert {type_node: "foo"}[restored] == "foo"
+
+
+def test_symbol_table() -> None:
+    idl = parsing._validate_and_parse_ir(IDL)
+
+    assert idl.symbols.kind("Base") is ir.SymbolKind.STRUCT
+    assert idl.symbols.kind("Kind") is ir.SymbolKind.ENUM
+    assert idl.symbols.kind("Vec3") is ir.SymbolKind.TYPEDEF
+    assert idl.symbols.kind("double") is ir.SymbolKind.BUILTIN
+    assert idl.symbols.kind("Foo") is None
+    assert "string" in idl.symbols
+    assert "Foo" not in idl.symbols
+    assert idl.symbols.defined == {"Base", "Derived", "Kind", "Vec3"}
+
+    restored = pickle.loads(pickle.dumps(idl))  # noqa: S301
+
+    assert restored.symbols == idl.symbols
+
+
+def test_lookup_tables_are_built_on_first_access() -> None:
+    idl = replace(parsing._validate_and_parse_ir(IDL))
+
+    assert idl._symbols is None
+    assert idl._inheritance_index is None
+
+    assert idl.symbols is idl.symbols
+    assert idl.inheritance_index is idl.inheritance_index
+    assert idl.inheritance_index.descendants == {"Base": ("Derived",)}
+
+
+def test_symbol_table_defined_names_take_precedence() -> None:
+    symbols = ir.SymbolTable.from_names(builtins=["int", "float"], structs=["int"])
+
+    assert symbols.kind("int") is ir.SymbolKind.STRUCT
+    assert symbols.defined == {"int"}
+
+
+def test_inheritance_index() -> None:
+    index = ir.InheritanceIndex.from_bases({"D": "B", "C": "X", "B": "X", "X": "Y", "Y": None, "Z": "External"})
+
+    assert index.order == ("Y", "Z", "X", "C", "B", "D")
+    assert index.children == {"B": ("D",), "X": ("C", "B"), "Y": ("X",), "External": ("Z",)}
+    assert index.ancestors["D"] == ("B", "X", "Y")
+    assert index.ancestors["Y"] == ()
+    assert index.descendants["Y"] == ("X", "C", "B", "D")
+    assert "D" not in index.descendants
+    assert index.depth == {"D": 3, "C": 2, "B": 2, "X": 1, "Y": 0, "Z": 1}
+
+
+def test_inheritance_index_cyclic() -> None:
+    with pytest.raises(RuntimeError, match="Cyclic inheritance of struct"):
+        ir.InheritanceIndex.from_bases({"A": "B", "B": "C", "C": "A"})
+
+    with pytest.raises(RuntimeError, match="Cyclic inheritance of struct"):
+        parsing._validate_and_parse_ir("dictionary A : B {}; dictionary B : A {};")
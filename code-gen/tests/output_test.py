@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+from typing import Any
+
+from poly_scribe_code_gen._output import (
+    replace_if_changed,
+    temporary_file,
+    write_chunks_if_changed,
+    write_if_changed,
+)
+
+
+def test_write_if_changed(tmp_path: Path) -> None:
+    out_file = tmp_path / "out" / "foo.hpp"
+
+    assert write_if_changed(out_file, "foo")
+    assert out_file.read_text() == "foo"
+
+    os.utime(out_file, (0, 0))
+
+    assert not write_if_changed(out_file, "foo")
+    assert out_file.stat().st_mtime == 0
+
+    assert write_if_changed(out_file, "bar")
+    assert out_file.read_text() == "bar"
+    assert out_file.stat().st_mtime != 0
+    assert list(out_file.parent.iterdir()) == [out_file]
+
+
+def test_replace_if_changed(tmp_path: Path) -> None:
+    out_file = tmp_path / "foo.py"
+    out_file.write_text("foo")
+    os.utime(out_file, (0, 0))
+
+    new_file = temporary_file(out_file)
+    new_file.write_text("foo")
+
+    assert not replace_if_changed(out_file, new_file)
+    assert not new_file.exists()
+    assert out_file.stat().st_mtime == 0
+
+    new_file = temporary_file(out_file)
+    new_file.write_text("bar")
+
+    assert replace_if_changed(out_file, new_file)
+    assert not new_file.exists()
+    assert out_file.read_text() == "bar"
+
+
+def test_temporary_file(tmp_path: Path) -> None:
+    out_file = tmp_path / "out" / "foo.py"
+
+    tmp_file = temporary_file(out_file)
+
+    assert tmp_file.parent == out_file.parent
+    assert tmp_file.suffix == ".py"
+    assert tmp_file.read_text() == ""
+    assert temporary_file(out_file) != tmp_file
+
+
+def test_write_chunks_if_changed(tmp_path: Path) -> None:
+    out_file = tmp_path / "out" / "foo.hpp"
+
+    assert write_chunks_if_changed(out_file, iter(["foo", "bar"]))
+    assert out_file.read_text() == "foobar"
+
+    os.utime(out_file, (0, 0))
+
+    assert not write_chunks_if_changed(out_file, iter(["foob", "ar"]))
+    assert out_file.stat().st_mtime == 0
+
+    assert write_chunks_if_changed(out_file, iter(["foo", "baz"]))
+    assert out_file.read_text() == "foobaz"
+    assert list(out_file.parent.iterdir()) == [out_file]
+
+
+def test_replace_if_changed_compares_in_blocks(tmp_path: Path, mocker: Any) -> None:
+    mocker.patch("poly_scribe_code_gen._output._BUFFER_SIZE", 4)
+    out_file = tmp_path / "foo.hpp"
+    out_file.write_text("0123456789")
+
+    new_file = temporary_file(out_file)
+    new_file.write_text("0123456789")
+    assert not replace_if_changed(out_file, new_file)
+
+    new_file = temporary_file(out_file)
+    new_file.write_text("0123456780")
+    assert replace_if_changed(out_file, new_file)
+    assert out_file.read_text() == "0123456780"
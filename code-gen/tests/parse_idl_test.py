@@ -1,22 +1,24 @@
+import copy
+import pickle
 import re
-from typing import TYPE_CHECKING, Any
+from collections.abc import Iterable
+from typing import Any
 
 import pytest
+import pywebidl2
 
 import poly_scribe_code_gen.parse_idl as parsing
-
-if TYPE_CHECKING:
-    from poly_scribe_code_gen._types import ParsedIDL
+from poly_scribe_code_gen._ir import IDL, NamedType, RecordType, SequenceType, SymbolTable, Typedef, UnionType
 
 
 def test_parse_idl(mocker: Any) -> None:
     mocker.patch("builtins.open", mocker.mock_open(read_data="dummy"))
-    validate_mock = mocker.patch("poly_scribe_code_gen.parse_idl._validate_and_parse", return_value={})
+    validate_mock = mocker.patch("poly_scribe_code_gen.parse_idl._parse_unit", return_value=IDL())
 
     parsed_idl = parsing.parse_idl("dummy")  # type: ignore
 
-    assert parsed_idl == {}
-    validate_mock.assert_called_once_with("dummy")  # type: ignore
+    assert parsed_idl == {"typedefs": {}, "enums": {}, "structs": {}, "inheritance_data": {}}
+    validate_mock.assert_called_once_with("dummy", fast_parser=False)  # type: ignore
 
 
 def test__validate_and_parse_empty_idl() -> None:
@@ -365,6 +367,56 @@ typedef int foobar
         parsing._validate_and_parse(idl)
 
 
+def test__parse_webidl_single_pass(mocker: Any) -> None:
+    validate_mock = mocker.patch("pywebidl2.validate")
+    parse_mock = mocker.patch("pywebidl2.parse")
+
+    idl = """
+dictionary Foo {
+    required int bar;
+};
+    """
+    result = parsing._parse_webidl(idl)
+
+    validate_mock.assert_not_called()
+    parse_mock.assert_not_called()
+    assert result["definitions"][0]["name"] == "Foo"
+
+
+def test__parse_webidl_matches_pywebidl2() -> None:
+    idl = """
+typedef [Size=3] sequence<double> vec3;
+enum FooBar { "foo", "bar" };
+dictionary Foo {
+    required vec3 bar;
+    record<ByteString, (int or float)> baz;
+};
+dictionary Bar : Foo {
+    [Default=Foo] Foo foo = {};
+};
+    """
+    assert parsing._parse_webidl(idl) == pywebidl2.parse(idl)
+
+
+def test__parse_webidl_single_pass_errors() -> None:
+    with pytest.raises(RuntimeError, match="WebIDL validation errors:\n.*missing ';'"):
+        parsing._parse_webidl_single_pass("""
+typedef int foobar
+    """)
+
+
+def test__parse_webidl_fallback(mocker: Any) -> None:
+    mocker.patch("poly_scribe_code_gen.parse_idl._parse_webidl_single_pass", return_value=None)
+    validate_mock = mocker.patch("pywebidl2.validate", return_value=[])
+    parse_mock = mocker.patch("pywebidl2.parse", return_value={"definitions": []})
+
+    result = parsing._parse_webidl("dictionary Foo {};")
+
+    validate_mock.assert_called_once_with("dictionary Foo {};")
+    parse_mock.assert_called_once_with("dictionary Foo {};")
+    assert result == {"definitions": []}
+
+
 def test__flatten_members_raises_unsupported_type() -> None:
     with pytest.raises(RuntimeError, match="Unsupported WebIDL type 'foo'."):
         parsing._flatten_members([{"type": "foo"}])
@@ -396,6 +448,19 @@ def test__validate_and_parse_block_comments_added_2() -> None:
     )
 
 
+def test__validate_and_parse_single_line_block_comments() -> None:
+    idl = """
+    /** Single line doc for Foo */
+    dictionary Foo {
+        /*! Single line doc for bar */
+        int bar;
+    };
+    """
+    parsed_idl = parsing._validate_and_parse(idl)
+    assert parsed_idl["structs"]["Foo"]["block_comment"].description == "Single line doc for Foo"
+    assert parsed_idl["structs"]["Foo"]["members"]["bar"]["block_comment"].description == "Single line doc for bar"
+
+
 def test__validate_and_parse_inline_comments_added() -> None:
     idl = """
     dictionary Foo {
@@ -517,230 +582,166 @@ enum FooBar {
     assert parsed_idl["enums"]["FooBar"]["values"][3]["block_comment"].description == "This is a block comment for qux"
 
 
+def _symbols(
+    *builtins: str, structs: Iterable[str] = (), enums: Iterable[str] = (), typedefs: Iterable[str] = ()
+) -> SymbolTable:
+    return SymbolTable.from_names(builtins=builtins, structs=structs, enums=enums, typedefs=typedefs)
+
+
 def test__type_check_impl_valid_union_type() -> None:
-    type_data = {
-        "type_name": ["int", "float"],
-        "union": True,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types = ["int", "float"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = UnionType((NamedType("int"), NamedType("float")))
 
-    parsing._type_check_impl(type_data, "test_union", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_union",
+        _symbols("int", "float"),
+    )
 
 
 def test__type_check_impl_invalid_union_type() -> None:
-    type_data = {
-        "type_name": ["int", "invalid_type"],
-        "union": True,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types = ["int"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = UnionType((NamedType("int"), NamedType("invalid_type")))
 
     with pytest.raises(
         RuntimeError,
         match="Member type 'invalid_type' in union 'test_union' is not valid.",
     ):
-        parsing._type_check_impl(type_data, "test_union", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_union",
+            _symbols("int"),
+        )
 
 
 def test__type_check_impl_valid_vector_type() -> None:
-    type_data = {
-        "type_name": "int",
-        "union": False,
-        "vector": True,
-        "map": False,
-    }
-    cpp_types = ["int"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = SequenceType(NamedType("int"))
 
-    parsing._type_check_impl(type_data, "test_vector", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_vector",
+        _symbols("int"),
+    )
 
 
 def test__type_check_impl_invalid_vector_type() -> None:
-    type_data = {
-        "type_name": "invalid_type",
-        "union": False,
-        "vector": True,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = SequenceType(NamedType("invalid_type"))
 
     with pytest.raises(
         RuntimeError,
         match="Member type 'invalid_type' in vector 'test_vector' is not valid.",
     ):
-        parsing._type_check_impl(type_data, "test_vector", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_vector",
+            _symbols(),
+        )
 
 
 def test__type_check_impl_valid_map_type() -> None:
-    type_data = {
-        "type_name": {"key": "string", "value": "int"},
-        "union": False,
-        "vector": False,
-        "map": True,
-    }
-    cpp_types = ["int", "string"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = RecordType(NamedType("string"), NamedType("int"))
 
-    parsing._type_check_impl(type_data, "test_map", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_map",
+        _symbols("int", "string"),
+    )
 
 
 def test__type_check_impl_invalid_map_type() -> None:
-    type_data = {
-        "type_name": {"key": "string", "value": "invalid_type"},
-        "union": False,
-        "vector": False,
-        "map": True,
-    }
-    cpp_types = ["string"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = RecordType(NamedType("string"), NamedType("invalid_type"))
 
     with pytest.raises(RuntimeError, match="Member type 'invalid_type' in map 'test_map' is not valid."):
-        parsing._type_check_impl(type_data, "test_map", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_map",
+            _symbols("string"),
+        )
 
 
 def test__type_check_impl_valid_typedef() -> None:
-    type_data = {
-        "type_name": "int",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types = ["int"]
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = NamedType("int")
 
-    parsing._type_check_impl(type_data, "test_typedef", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_typedef",
+        _symbols("int"),
+    )
 
 
 def test__type_check_impl_invalid_typedef() -> None:
-    type_data = {
-        "type_name": "invalid_type",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = NamedType("invalid_type")
 
     with pytest.raises(RuntimeError, match="Member type 'invalid_type' in 'test_typedef' is not valid."):
-        parsing._type_check_impl(type_data, "test_typedef", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_typedef",
+            _symbols(),
+        )
 
 
 def test__type_check_impl_valid_struct_type() -> None:
-    type_data = {
-        "type_name": "Foo",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs = ["Foo"]
-    type_defs: list[str] = []
+    type_data = NamedType("Foo")
 
-    parsing._type_check_impl(type_data, "test_struct", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_struct",
+        _symbols(structs=["Foo"]),
+    )
 
 
 def test__type_check_impl_invalid_struct_type() -> None:
-    type_data = {
-        "type_name": "Bar",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs = ["Foo"]
-    type_defs: list[str] = []
+    type_data = NamedType("Bar")
 
     with pytest.raises(RuntimeError, match="Member type 'Bar' in 'test_struct' is not valid."):
-        parsing._type_check_impl(type_data, "test_struct", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_struct",
+            _symbols(structs=["Foo"]),
+        )
 
 
 def test__type_check_impl_valid_enum_type() -> None:
-    type_data = {
-        "type_name": "FooBar",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations = ["FooBar"]
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = NamedType("FooBar")
 
-    parsing._type_check_impl(type_data, "test_enum", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_enum",
+        _symbols(enums=["FooBar"]),
+    )
 
 
 def test__type_check_impl_invalid_enum_type() -> None:
-    type_data = {
-        "type_name": "BarBaz",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations = ["FooBar"]
-    structs: list[str] = []
-    type_defs: list[str] = []
+    type_data = NamedType("BarBaz")
 
     with pytest.raises(RuntimeError, match="Member type 'BarBaz' in 'test_enum' is not valid."):
-        parsing._type_check_impl(type_data, "test_enum", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_enum",
+            _symbols(enums=["FooBar"]),
+        )
 
 
 def test__type_check_impl_valid_type_def() -> None:
-    type_data = {
-        "type_name": "typedef_int",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs = ["typedef_int"]
+    type_data = NamedType("typedef_int")
 
-    parsing._type_check_impl(type_data, "test_typedef", cpp_types, enumerations, structs, type_defs)
+    parsing._type_check_impl(
+        type_data,
+        "test_typedef",
+        _symbols(typedefs=["typedef_int"]),
+    )
 
 
 def test__type_check_impl_invalid_type_def() -> None:
-    type_data = {
-        "type_name": "typedef_float",
-        "union": False,
-        "vector": False,
-        "map": False,
-    }
-    cpp_types: list[str] = []
-    enumerations: list[str] = []
-    structs: list[str] = []
-    type_defs = ["typedef_int"]
+    type_data = NamedType("typedef_float")
 
     with pytest.raises(
         RuntimeError,
         match="Member type 'typedef_float' in 'test_typedef' is not valid.",
     ):
-        parsing._type_check_impl(type_data, "test_typedef", cpp_types, enumerations, structs, type_defs)
+        parsing._type_check_impl(
+            type_data,
+            "test_typedef",
+            _symbols(typedefs=["typedef_int"]),
+        )
 
 
 def test__validate_and_parse_invalid_type() -> None:
@@ -786,15 +787,11 @@ def test__add_comments_comment_for_undefined_type() -> None:
 
     typedef int baz; //< Inline comment for undefined
     """
-    parsed_idl: ParsedIDL = {
-        "typedefs": {"BAZ": {}},
-        "enums": {},
-        "structs": {},
-        "inheritance_data": {},
-    }
+    parsed_idl = IDL(typedefs={"BAZ": Typedef("BAZ", NamedType("int"))})
     returned_idl = parsing._add_comments(idl, parsed_idl)
 
-    assert returned_idl == parsed_idl
+    assert returned_idl.typedefs["BAZ"].block_comment is None
+    assert returned_idl.typedefs["BAZ"].inline_comment is None
 
 
 def test__add_comments_inline_comments_for_enum_def() -> None:
@@ -852,6 +849,72 @@ def test__find_comments() -> None:
     )
 
 
+def test__find_comments_offsets() -> None:
+    idl = """
+    /// Mentions dictionary Wrong, but documents Foo
+    dictionary Foo {
+        /// Attached to bar
+        [Size=3] sequence<float> bar = []; /**< Inline comment for bar */
+
+        /// Not attached, separated by an empty line
+
+        int baz;
+        /// Not attached, followed by a plain comment
+        // Plain comment
+        int qux;
+        /** Attached to quux */ record<ByteString, (int or float)> quux = {}; //!< Inline comment for quux
+    };
+
+    /// Attached to Bar
+    [Size=2] typedef sequence<int> Bar;
+    """
+    comment_data = parsing._find_comments(idl)
+
+    assert comment_data["block_comments"] == {
+        ("Foo",): "/// Mentions dictionary Wrong, but documents Foo",
+        ("Foo", "bar"): "/// Attached to bar",
+        ("Foo", "quux"): "/** Attached to quux",
+        ("Bar",): "/// Attached to Bar",
+    }
+    assert comment_data["inline_comments"] == {
+        ("Foo", "bar"): "Inline comment for bar",
+        ("Foo", "quux"): "Inline comment for quux",
+    }
+
+
+def test__validate_and_parse_comments_parsed_lazily(mocker: Any) -> None:
+    idl = """
+    /// This is a block comment for Foo
+    dictionary Foo {
+        int bar; ///< This is an inline comment for bar
+    };
+    """
+    parse_comments_spy = mocker.spy(parsing, "_parse_comments")
+
+    parsed_idl = parsing._validate_and_parse(idl)
+
+    parse_comments_spy.assert_not_called()
+
+    block_comment = parsed_idl["structs"]["Foo"]["block_comment"]
+    assert block_comment.raw == "/// This is a block comment for Foo"
+    assert block_comment.description == "This is a block comment for Foo"
+    assert block_comment.short_description == "This is a block comment for Foo"
+
+    parse_comments_spy.assert_called_once_with("/// This is a block comment for Foo")
+
+
+def test_lazy_docstring_pickle_and_copy() -> None:
+    comment = parsing.LazyDocstring("/// Comment for Foo")
+    assert comment.description == "Comment for Foo"
+
+    unpickled_comment = pickle.loads(pickle.dumps(comment))  # noqa: S301
+
+    assert unpickled_comment.raw == comment.raw
+    assert unpickled_comment._docstring is None
+    assert unpickled_comment.description == "Comment for Foo"
+    assert copy.deepcopy(comment) is comment
+
+
 def test__parse_comments() -> None:
     pythonic_comment = """
 /// Main comment for Foo
@@ -986,3 +1049,52 @@ def test__validate_and_parse_default_empty_type_defined() -> None:
         "required": False,
         "default_type": "Foo",
     }
+
+
+def test_parse_idl_files(tmp_path: Any) -> None:
+    base_file = tmp_path / "base.webidl"
+    base_file.write_text("""
+/// The base
+dictionary Base {
+    int id;
+};
+
+enum Color { "red", "green" };
+""")
+    derived_file = tmp_path / "derived.webidl"
+    derived_file.write_text("""
+dictionary Derived : Base {
+    Color color; ///< The color
+};
+
+dictionary Data {
+    sequence<Base> items;
+};
+""")
+
+    idl = parsing.parse_idl_files([base_file, derived_file])
+
+    assert list(idl.structs) == ["Base", "Derived", "Data"]
+    assert idl.inheritance_data == {"Base": ("Derived",)}
+    assert idl.structs["Base"].block_comment.description == "The base"  # type: ignore
+    assert idl.structs["Derived"].members[0].inline_comment.description == "The color"  # type: ignore
+
+
+def test_parse_idl_files_unknown_type(tmp_path: Any) -> None:
+    idl_file = tmp_path / "data.webidl"
+    idl_file.write_text("dictionary Data { Missing missing; };")
+
+    with pytest.raises(RuntimeError, match=re.escape("Member type 'Missing' in 'Data.missing' is not valid.")):
+        parsing.parse_idl_files([idl_file])
+
+
+def test_parse_idl_files_duplicate_definition(tmp_path: Any) -> None:
+    first_file = tmp_path / "first.webidl"
+    first_file.write_text("dictionary Foo { int bar; };")
+    second_file = tmp_path / "second.webidl"
+    second_file.write_text('enum Foo { "bar" };')
+
+    with pytest.raises(
+        RuntimeError, match=re.escape(f"'Foo' in '{second_file}' is already defined in '{first_file}'.")
+    ):
+        parsing.parse_idl_files([first_file, second_file])
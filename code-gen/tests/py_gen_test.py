@@ -1,9 +1,11 @@
+import copy
 import random
 import re
 import string
+import subprocess
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import pytest
 
@@ -14,7 +16,8 @@ else:
 
 
 from poly_scribe_code_gen import py_gen
-from poly_scribe_code_gen.parse_idl import _validate_and_parse
+from poly_scribe_code_gen._ir import InheritanceIndex
+from poly_scribe_code_gen.parse_idl import _validate_and_parse, _validate_and_parse_ir
 
 if TYPE_CHECKING:
     from poly_scribe_code_gen._types import AdditionalData
@@ -115,7 +118,7 @@ def test__transform_types_unknown_type() -> None:
     }
 
     with pytest.raises(ValueError, match="Unknown type:"):
-        py_gen._transformer(type_data, {}, set())
+        py_gen._transformer(type_data, InheritanceIndex(), set())
 
 
 def test_render_template_typedefs() -> None:
@@ -194,6 +197,46 @@ dictionary BazQux {
             assert 'union: Optional[Union[int, float, bool, "FooBar"]]'.replace(" ", "") in struct_body.replace(" ", "")
 
 
+def test_render_template_does_not_modify_input() -> None:
+    idl = """
+dictionary FooBar {
+    required int foo;
+    ByteString name = "foo";
+};
+
+dictionary BazQux : FooBar {
+    FooBar bar = {};
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+    expected_idl = copy.deepcopy(parsed_idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "test"})
+
+    assert parsed_idl == expected_idl
+    assert py_gen._render_template(parsed_idl, {"package": "test"}) == result
+
+
+def test_render_template_shared_ir() -> None:
+    idl = """
+/// Block comment for FooBar
+dictionary FooBar {
+    required int foo;
+};
+
+dictionary BazQux : FooBar {
+    required float bar;
+};
+"""
+    parsed_idl = _validate_and_parse_ir(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "test"})
+
+    assert py_gen._render_template(parsed_idl, {"package": "test"}) == result
+    assert "Block comment for FooBar" in result
+    assert [member.name for member in parsed_idl.structs["FooBar"].members] == ["foo"]
+
+
 def test_render_template_struct_with_inheritance() -> None:
     idl = """
 dictionary FooBar {
@@ -328,6 +371,28 @@ dictionary Baz : Foo {
         assert "bar: Optional[float]" in content
 
 
+def test_generate_py_format_code(tmp_path: Path, mocker: Any) -> None:
+    parsed_idl = _validate_and_parse_ir("dictionary Foo { int foo; }; dictionary Bar : Foo { sequence<int> baz; };")
+    additional_data: AdditionalData = {"package": "foo", "year": "2024"}
+
+    raw_file = tmp_path / "raw.py"
+    format_code = mocker.spy(py_gen, "_format_code")
+    py_gen.generate_python(parsed_idl, additional_data, raw_file, format_code=False)
+
+    format_code.assert_not_called()
+    raw = raw_file.read_text()
+    assert raw == py_gen._render_template(parsed_idl, additional_data)
+
+    formatted_file = tmp_path / "formatted.py"
+    py_gen.generate_python(parsed_idl, additional_data, formatted_file)
+    formatted = formatted_file.read_text()
+
+    assert formatted == py_gen._format_code(raw)
+    assert formatted == py_gen._format_code(formatted)
+    assert not py_gen.generate_python(parsed_idl, additional_data, formatted_file)
+    assert not list(tmp_path.glob(".*"))
+
+
 def test__render_template_poly_have_type_member() -> None:
     idl = """
 dictionary X {
@@ -473,6 +538,107 @@ dictionary Baz : Foo {
         assert "bar: Optional[float]" in content
 
 
+def test_split_modules() -> None:
+    idl = _validate_and_parse_ir(
+        """
+typedef sequence<int> IntSeq;
+enum Color { "RED", "GREEN" };
+dictionary Base { int a; };
+dictionary Derived : Base { Color color; };
+dictionary Holder { Base base; };
+dictionary Other { IntSeq values; };
+dictionary HTTPConfig { string url = "localhost"; };
+"""
+    )
+
+    modules = py_gen.split_modules(idl)
+
+    assert {module_file: [*m.typedefs, *m.enums, *m.structs] for module_file, m in modules.items()} == {
+        "_int_seq.py": ["IntSeq", "Other"],
+        "_color.py": ["Color", "Base", "Derived", "Holder"],
+        "_http_config.py": ["HTTPConfig"],
+    }
+    assert modules["_color.py"].inheritance_data == {"Base": ("Derived",)}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_python_package_split(tmp_path: Path, jobs: int) -> None:
+    idl = _validate_and_parse_ir(
+        """
+dictionary Base { int a; };
+dictionary Derived : Base { sequence<int> values; };
+dictionary Holder { Base base; };
+dictionary Other { string name; };
+"""
+    )
+
+    changed = py_gen.generate_python_package(idl, {"package": "split"}, tmp_path, split=True, jobs=jobs)
+
+    source_dir = tmp_path / "src" / "split"
+    assert changed == [
+        source_dir / "_base.py",
+        source_dir / "_other.py",
+        source_dir / "__init__.py",
+        tmp_path / "pyproject.toml",
+    ]
+
+    base_module = (source_dir / "_base.py").read_text()
+    assert "class Holder(BaseModel):" in base_module
+    assert "class Other" not in base_module
+    assert "def load(" not in base_module
+
+    init = (source_dir / "__init__.py").read_text()
+    assert "from ._base import AnyBase, Base, Derived, Holder" in init
+    assert "from ._other import Other" in init
+    assert "def load(" in init
+
+    # the definitions are rendered like in a single module
+    py_gen.generate_python(idl, {"package": "split"}, tmp_path / "single.py")
+    definitions = base_module[base_module.index("class Base") :].rstrip()
+    assert definitions in (tmp_path / "single.py").read_text()
+
+    assert py_gen.generate_python_package(idl, {"package": "split"}, tmp_path, split=True, jobs=jobs) == []
+
+
+def test_generate_python_package_split_is_lazy(tmp_path: Path) -> None:
+    idl = _validate_and_parse_ir(
+        """
+dictionary Base { int a; };
+dictionary Derived : Base { sequence<int> values; };
+dictionary Other { string name; };
+"""
+    )
+    py_gen.generate_python_package(idl, {"package": "lazy_split"}, tmp_path, split=True, codecs=True)
+
+    script = """
+import sys
+import cbor2
+import lazy_split
+
+def loaded():
+    return sorted(name for name in sys.modules if name.startswith("lazy_split."))
+
+assert loaded() == [], loaded()
+assert lazy_split.load.__name__ == "load"
+assert loaded() == [], loaded()
+assert lazy_split.Other(name="x").name == "x"
+assert loaded() == ["lazy_split._other"], loaded()
+assert "Derived" in dir(lazy_split)
+assert isinstance(lazy_split.Derived(a=1, values=[]), lazy_split.Base)
+try:
+    lazy_split.Missing
+except AttributeError:
+    pass
+else:
+    raise AssertionError
+
+lazy_split.save("derived.cbor", lazy_split.Derived(a=1, values=[2]))
+assert open("derived.cbor", "rb").read() == cbor2.dumps(lazy_split.Derived(a=1, values=[2]).model_dump())
+assert lazy_split.load(lazy_split.Base, "derived.cbor", validate=False) == lazy_split.Derived(a=1, values=[2])
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path / "src", check=True)
+
+
 def test_generate_python_package_errors(tmp_path: Path) -> None:
     file = tmp_path / "test.file"
 
@@ -606,9 +772,7 @@ def test_render_template_struct_with_empty_type_default() -> None:
     for match in matches:
         struct_body = match[2]
         if match[0] == "Data":
-            assert 'base: Optional[Annotated[Union["Foo", "Bar", "Base"],Field(discriminator="type")]] = Foo()'.replace(
-                " ", ""
-            ) in struct_body.replace(" ", "")
+            assert 'base: Optional["AnyBase"] = Foo()'.replace(" ", "") in struct_body.replace(" ", "")
         elif match[0] == "Base":
             assert 'type: Literal["Base"] = "Base"'.replace(" ", "") in struct_body.replace(" ", "")
         elif match[0] == "Foo":
@@ -664,7 +828,9 @@ dictionary Collector {
     matches = pattern.findall(result)
     assert len(matches) == 6
 
-    pattern = re.compile(r"Optional\[Annotated\[Union\[(.*?)\],.*\]")
+    assert 'a1: Optional["AnyA1"]'.replace(" ", "") in result.replace(" ", "")
+
+    pattern = re.compile(r'AnyA1 = TypeAliasType\("AnyA1", Annotated\[Union\[(.*?)\],.*\]')
     matches = pattern.findall(result)
     assert len(matches) == 1
     allowed_types = matches[0].replace(" ", "").split(",")
@@ -673,3 +839,67 @@ dictionary Collector {
     assert "A1" in allowed_types
     assert "B1" in allowed_types
     assert "B2" in allowed_types
+
+
+def test__render_template_deep_poly_inheritance() -> None:
+    idl = """
+dictionary Base {
+};
+dictionary A1 : Base {
+};
+dictionary B1 : A1 {
+};
+dictionary C1 : B1 {
+};
+dictionary Collector {
+    Base base;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "foo"})
+
+    assert 'base: Optional["AnyBase"]'.replace(" ", "") in result.replace(" ", "")
+    assert (
+        'AnyBase = TypeAliasType("AnyBase", Annotated[Union["A1", "B1", "C1", "Base"],Field(discriminator="type")])'.replace(
+            " ", ""
+        )
+        in result.replace(" ", "")
+    )
+
+
+def test__render_template_poly_alias_is_shared() -> None:
+    idl = """
+dictionary Base {
+};
+dictionary Derived : Base {
+};
+dictionary Collector {
+    Base single;
+    sequence<Base> many;
+    record<ByteString, Base> named;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "foo"})
+
+    assert result.count('Field(discriminator="type")') == 1
+    assert 'single: Optional["AnyBase"]' in result
+    assert 'many: Optional[List["AnyBase"]]' in result
+    assert 'named: Optional[Dict[str, "AnyBase"]]' in result
+
+
+def test__render_template_poly_alias_already_defined() -> None:
+    idl = """
+dictionary Base {
+};
+dictionary Derived : Base {
+};
+dictionary AnyBase {
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    with pytest.raises(ValueError, match="Type alias AnyBase for the polymorphic struct Base is already defined"):
+        py_gen._render_template(parsed_idl, {"package": "foo"})
@@ -1,4 +1,9 @@
+import sys
 import types
+from pathlib import Path
+
+import cbor2
+import pytest
 
 from poly_scribe_code_gen import py_gen
 from poly_scribe_code_gen.parse_idl import _validate_and_parse
@@ -9,6 +14,8 @@ from poly_scribe_code_gen.parse_idl import _validate_and_parse
 def import_code(code: str, name: str) -> types.ModuleType:
     # create blank module
     module = types.ModuleType(name)
+    # register it like an import does, deferred models resolve their references in the module namespace
+    sys.modules[name] = module
     # populate the module with code
     exec(code, module.__dict__)  # noqa: S102
     return module
@@ -183,3 +190,166 @@ dictionary Container {
     assert isinstance(container.poly, module.Base)
     assert isinstance(container.union_test_1, str)
     assert container.union_test_1 == "test"
+
+
+def test_python_gen_schemas_are_deferred() -> None:
+    idl = """
+dictionary Base {
+    int member;
+};
+
+dictionary Derived : Base {
+};
+
+dictionary Container {
+    Base poly;
+};
+
+dictionary Unused {
+    Container container;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "foo"})
+
+    module = import_code(result, "foobar_deferred")
+
+    assert not any(getattr(module, name).__pydantic_complete__ for name in ("Base", "Derived", "Container", "Unused"))
+
+    container = module.Container.model_validate({"poly": {"type": "Derived", "member": 1}})
+
+    assert isinstance(container.poly, module.Derived)
+    assert module.Container.__pydantic_complete__
+    assert not module.Unused.__pydantic_complete__
+
+
+def test_python_gen_shared_polymorphic_alias_works() -> None:
+    idl = """
+dictionary Base {
+    int member;
+};
+
+dictionary Derived : Base {
+};
+
+dictionary Container {
+    Base single;
+    sequence<Base> many;
+    record<ByteString, Base> named;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "foo"})
+
+    module = import_code(result, "foobar_alias")
+
+    container = module.Container.model_validate(
+        {
+            "single": {"type": "Derived", "member": 1},
+            "many": [{"type": "Base"}, {"type": "Derived"}],
+            "named": {"a": {"type": "Derived"}},
+        }
+    )
+
+    assert isinstance(container.single, module.Derived)
+    assert [type(item) for item in container.many] == [module.Base, module.Derived]
+    assert isinstance(container.named["a"], module.Derived)
+    assert "AnyBase" in module.Container.model_json_schema()["$defs"]
+
+
+def test_python_gen_codecs_work(tmp_path: Path) -> None:
+    idl = """
+enum Color { "RED", "GREEN" };
+
+typedef sequence<double> Values;
+
+dictionary Base {
+    required double scale;
+};
+
+dictionary Derived : Base {
+    Color color;
+};
+
+dictionary Leaf {
+    int id;
+};
+
+dictionary Container {
+    record<ByteString, Base> named;
+    sequence<Base> many;
+    Values values;
+    (int or Leaf) leaf_or_id;
+    Leaf leaf;
+    string label = "default";
+};
+
+dictionary Ambiguous {
+    (Color or string) color_or_name;
+};
+"""
+    parsed_idl = _validate_and_parse(idl)
+
+    result = py_gen._render_template(parsed_idl, {"package": "foo"}, codecs=True)
+
+    module = import_code(result, "foobar_codecs")
+
+    container = module.Container(
+        named={"a": module.Derived(scale=1, color="GREEN"), "b": module.Base(scale=2.5)},
+        many=[module.Base(scale=3)],
+        values=[1, 2.5],
+        leaf_or_id=module.Leaf(id=4),
+        leaf=None,
+    )
+
+    for suffix in (".json", ".cbor"):
+        file = tmp_path / f"container{suffix}"
+        module.save(file, container)
+
+        # the encoders write the same files as pydantic
+        if suffix == ".cbor":
+            assert file.read_bytes() == cbor2.dumps(container.model_dump())
+
+        decoded = module.load(module.Container, file, validate=False)
+
+        assert decoded == module.load(module.Container, file)
+        assert isinstance(decoded.named["a"], module.Derived)
+        assert decoded.named["a"].color is module.Color.GREEN
+        assert type(decoded.named["a"].scale) is float
+        assert type(decoded.many[0]) is module.Base
+        assert decoded.values == [1.0, 2.5]
+        assert isinstance(decoded.leaf_or_id, module.Leaf)
+        assert decoded.leaf is None
+        assert decoded.label == "default"
+
+    # a base dispatches on the discriminator, like the validation of the polymorphic alias
+    derived_file = tmp_path / "derived.cbor"
+    module.save(derived_file, module.Derived(scale=1.5, color="RED"))
+    decoded = module.load(module.Base, derived_file, validate=False)
+    assert type(decoded) is module.Derived
+    assert decoded == module.load(module.Derived, derived_file)
+    base_file = tmp_path / "base.cbor"
+    module.save(base_file, module.Base(scale=2))
+    assert module.load(module.Base, base_file, validate=False) == module.Base(scale=2)
+
+    # missing members get the defaults of the model and are not marked as set
+    partial = {"named": {}, "many": [], "values": [], "leaf_or_id": 1, "leaf": {}}
+    decoded = module._DECODERS["Container"](partial)
+    validated = module.Container.model_validate(partial)
+    assert decoded == validated
+    assert decoded.model_fields_set == validated.model_fields_set
+
+    # required members are checked, like by the validation
+    (tmp_path / "empty.cbor").write_bytes(cbor2.dumps({}))
+    with pytest.raises(ValueError, match="Base requires the member 'scale'"):
+        module.load(module.Base, tmp_path / "empty.cbor", validate=False)
+
+    # enumerations in unions cannot be told apart from strings without validation, so they are validated
+    assert "return Ambiguous.model_validate(data)" in result
+    ambiguous_file = tmp_path / "ambiguous.json"
+    module.save(ambiguous_file, module.Ambiguous(color_or_name="RED"))
+    assert module.load(module.Ambiguous, ambiguous_file, validate=False) == module.load(
+        module.Ambiguous, ambiguous_file
+    )
@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import Any
+
+import jinja2
+
+from poly_scribe_code_gen import _templates
+
+
+def test_environment_is_shared() -> None:
+    assert _templates.environment() is _templates.environment()
+
+
+def test_templates_are_compiled_once(mocker: Any) -> None:
+    template = _templates.get_template("reflect.jinja")
+    compile_spy = mocker.spy(_templates.environment(), "compile")
+
+    assert _templates.get_template("reflect.jinja") is template
+    compile_spy.assert_not_called()
+
+
+def test_templates_are_not_escaped() -> None:
+    for name in ("reflect.jinja", "python.jinja", "pyproject.jinja", "matlab.jinja"):
+        assert _templates.environment().autoescape(name) is False  # type: ignore[operator]
+
+
+def test_use_bytecode_cache(tmp_path: Path, mocker: Any) -> None:
+    env = _templates.environment()
+    mocker.patch.object(env, "bytecode_cache", None)
+    mocker.patch.object(env, "cache", {})
+
+    _templates.use_bytecode_cache(tmp_path / "templates")
+    bytecode_cache = env.bytecode_cache
+
+    _templates.get_template("pyproject.jinja")
+
+    assert isinstance(bytecode_cache, jinja2.FileSystemBytecodeCache)
+    assert len(list((tmp_path / "templates").iterdir())) == 1
+
+    _templates.use_bytecode_cache(tmp_path / "templates")
+
+    assert env.bytecode_cache is bytecode_cache